@@ -1,58 +1,112 @@
 import os
-import sys
+import time
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from typing import Union
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, Security
+from fastapi import FastAPI, Depends, Security, Request, Response
 from fastapi.security.api_key import APIKeyHeader, APIKey
 
 from app.classes.controller import APIController
+from app.classes.logs import SampledLogging
+from app.classes.metrics import Metrics, MetricsMiddleware
+from app.classes.streaming import DuplexStreamingResponse
 from app.classes.data_types import InputData, OutputData, BatchInputData, \
     BatchOutputData
 
 from app.utils import load_api_config
 
-app = FastAPI()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(levelname)s:%(name)s: %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+# Load configurations
+API_CONFIG = load_api_config()
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Load configurations
-API_CONFIG = load_api_config()
-
 # Load API token
 load_dotenv(verbose=True)
 API_KEY = os.getenv("API_TOKEN")
 if not API_KEY:
     raise ValueError("API_TOKEN not found in environment variables")
 
-app = FastAPI()
-api_controller = APIController(API_CONFIG)
+# Shared by the metrics middleware and the controller
+api_metrics = Metrics.from_config(API_CONFIG.get('metrics', {}))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the logging, load the model and warm it up in the background when
+    the API starts, and release them when it stops.
+
+    Importing the module loads nothing, so the controller is stored on
+    ``app.state`` and the warm-up task can be awaited from there.
+    """
+    # Records are written by a background thread and the per-request ones
+    # are sampled
+    sampled_logging = SampledLogging(
+        API_CONFIG.get('logging', {}), metrics=api_metrics
+    )
+    sampled_logging.start()
+    controller = APIController(API_CONFIG, metrics=api_metrics)
+    app.state.controller = controller
+    app.state.warm_up_task = asyncio.create_task(controller.warm_up())
+    app.state.warm_up_task.add_done_callback(controller.on_warm_up_done)
+    try:
+        yield
+    finally:
+        app.state.warm_up_task.cancel()
+        await controller.close()
+        sampled_logging.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+if api_metrics is not None:
+    app.add_middleware(MetricsMiddleware, metrics=api_metrics)
 
 
-async def get_api_key(api_key_header: str = Security(api_key_header)):
+def get_controller(request: Request) -> APIController:
+    """Controller created when the API started."""
+    return request.app.state.controller
+
+
+async def get_api_key(
+    api_key_header: str = Security(api_key_header),
+    controller: APIController = Depends(get_controller)
+):
     """Validate the API key."""
-    return await api_controller.get_api_key(api_key_header, API_KEY)
+    return await controller.get_api_key(api_key_header, API_KEY)
 
 
 @app.get("/")
-async def welcome():
+async def welcome(controller: APIController = Depends(get_controller)):
     """Return a welcome message."""
-    return await api_controller.welcome()
+    return await controller.welcome()
+
+
+@app.get("/ready")
+async def ready(controller: APIController = Depends(get_controller)):
+    """Report whether the API is ready to receive traffic."""
+    return await controller.ready()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Expose the API metrics in the Prometheus text format."""
+    if api_metrics is None:
+        return Response(status_code=404)
+    return Response(
+        content=api_metrics.render(), media_type=api_metrics.content_type
+    )
 
 
 @app.post("/predict", response_model=Union[OutputData, BatchOutputData])
 async def predict(
+    request: Request,
     input_data: Union[InputData, BatchInputData],
-    api_key: APIKey = Depends(get_api_key)
+    api_key: APIKey = Depends(get_api_key),
+    controller: APIController = Depends(get_controller)
 ):
     """
     Make predictions based on input data.
@@ -61,11 +115,76 @@ async def predict(
     It requires a valid API key for authentication.
 
     Args:
+        request: Request, whose state records the stage times.
         input_data: Either a single InputData object or a BatchInputData
         object.
         api_key: API key for authentication.
+        controller: Controller of the API.
+
+    Returns:
+        Prediction results as either OutputData or BatchOutputData. Batch
+        results are encoded by the controller and returned as is.
+    """
+    request.state.handler_start = time.perf_counter()
+    output = await controller.predict(input_data, encode=True)
+    request.state.handler_end = time.perf_counter()
+    return output
+
+
+@app.post("/predict/stream")
+async def predict_stream(
+    request: Request,
+    api_key: APIKey = Depends(get_api_key),
+    controller: APIController = Depends(get_controller)
+):
+    """
+    Make predictions for a stream of newline-delimited JSON records.
+
+    Each line of the request body is an InputData object. Records are
+    validated and scored in chunks, and the results are streamed back as
+    newline-delimited OutputData objects in the same order.
+
+    Args:
+        request: Request whose body is read as a stream.
+        api_key: API key for authentication.
+        controller: Controller of the API.
+
+    Returns:
+        Streaming NDJSON response with one result per record.
+    """
+    return DuplexStreamingResponse(
+        controller.predict_stream(request.stream()),
+        media_type="application/x-ndjson"
+    )
+
+
+@app.get("/admin/models")
+async def list_models(
+    api_key: APIKey = Depends(get_api_key),
+    controller: APIController = Depends(get_controller)
+):
+    """List the registered model versions and the one being served."""
+    return await controller.list_models()
+
+
+@app.post("/admin/models/{version}/activate")
+async def activate_model(
+    version: str,
+    api_key: APIKey = Depends(get_api_key),
+    controller: APIController = Depends(get_controller)
+):
+    """
+    Swap the served model to a registered version without downtime.
+
+    The new version is loaded and warmed up in the background while the
+    current one keeps serving; requests already in flight finish on it.
+
+    Args:
+        version: Version number, ``latest`` or ``active``.
+        api_key: API key for authentication.
+        controller: Controller of the API.
 
     Returns:
-        Prediction results as either OutputData or BatchOutputData.
+        Version and artifact now served.
     """
-    return await api_controller.predict(input_data)
+    return await controller.activate_model(version)
@@ -0,0 +1,184 @@
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item requests into vectorized batches.
+
+    Items submitted while a batch is being collected are held in an asyncio
+    queue for at most ``max_wait_ms`` milliseconds or until
+    ``max_batch_size`` items are available. The whole group is then
+    processed with a single call to ``process_batch`` and every caller
+    receives its own result.
+
+    Up to ``max_concurrency`` batches are processed at the same time, each
+    in its own task, so that a slow batch does not hold back the next ones
+    and every worker of the inference executor gets work. While all of them
+    are busy, new items keep queueing and form larger batches.
+    """
+
+    def __init__(
+            self,
+            process_batch: Callable[[List[Any]], List[Any]],
+            max_batch_size: int = 64,
+            max_wait_ms: float = 5.0,
+            max_concurrency: int = 1
+    ):
+        """
+        Initialize the MicroBatcher.
+
+        Args:
+            process_batch (Callable[[List[Any]], List[Any]]): Function that
+            receives a list of items and returns one result per item, in the
+            same order. It may also be a coroutine function.
+            max_batch_size (int): Maximum number of items per batch.
+            max_wait_ms (float): Maximum time in milliseconds that the first
+            item of a batch waits for more items.
+            max_concurrency (int): Maximum number of batches processed at
+            the same time, e.g. the number of workers of the executor.
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+        self.queue: Optional[asyncio.Queue] = None
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    def _ensure_worker(self) -> None:
+        """
+        Start the background worker in the running event loop.
+        """
+        if self.worker is None or self.worker.done():
+            self.queue = asyncio.Queue()
+            self.slots = asyncio.Semaphore(self.max_concurrency)
+            self.worker = asyncio.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue an item and wait for its result.
+
+        Args:
+            item (Any): Item to process.
+
+        Returns:
+            Any: Result of processing the item.
+
+        Raises:
+            Exception: Any exception raised while processing its batch.
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[Any]:
+        """
+        Wait for the first item and gather more until the batch is full or
+        the waiting window expires.
+
+        Returns:
+            List[Any]: List of (item, future) pairs.
+        """
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(
+                    await asyncio.wait_for(self.queue.get(), timeout)
+                )
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        """
+        Collect batches and start a task for each of them until the worker
+        is cancelled. A batch is only collected once a slot is free.
+        """
+        while True:
+            await self.slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self.slots.release()
+                raise
+            task = asyncio.create_task(self._dispatch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """
+        Process a batch, resolve the future of every caller and free its
+        slot.
+
+        Args:
+            batch (List[Tuple[Any, asyncio.Future]]): List of (item, future)
+            pairs.
+        """
+        try:
+            items = [item for item, _ in batch]
+            results, error = await self._process(items)
+            if error is not None:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+
+            logger.debug(f"Processed micro-batch of {len(items)} items")
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            # Callers of a cancelled batch do not wait forever
+            for _, future in batch:
+                future.cancel()
+            self.slots.release()
+
+    async def _process(
+            self,
+            items: List[Any]
+    ) -> Tuple[List[Any], Exception]:
+        """
+        Process a batch, returning the error instead of raising it.
+
+        The exception is caught outside the worker coroutine so that its
+        traceback does not reference the suspended worker frame, which
+        would be finalized if a caller clears the traceback frames.
+
+        Args:
+            items (List[Any]): Items to process.
+
+        Returns:
+            Tuple[List[Any], Exception]: Results and the raised error, if
+            any.
+        """
+        try:
+            results = self.process_batch(items)
+            if inspect.isawaitable(results):
+                results = await results
+            return results, None
+        except Exception as e:
+            return None, e
+
+    async def close(self) -> None:
+        """
+        Stop the background worker and the batches being processed.
+        """
+        tasks = list(self.tasks)
+        if self.worker is not None:
+            tasks.append(self.worker)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.worker = None
@@ -1,37 +1,157 @@
+import json
+import time
+import asyncio
 import logging
-import pandas as pd
-from typing import Union, Dict, Any
+from typing import Union, Dict, Any, List, AsyncIterator, Optional
 from fastapi import HTTPException
-from starlette.status import HTTP_403_FORBIDDEN
+from starlette.status import HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND, \
+    HTTP_503_SERVICE_UNAVAILABLE
 from pydantic import ValidationError
 
-from src.data.data import Data, load_config as load_data_config
+from src.data.data import PreprocessingPipeline, \
+    load_config as load_data_config
 from src.model.engine import ModelEngine
+from app.classes.batcher import MicroBatcher
+from app.classes.executor import InferenceExecutor, ExecutorBusyError
+from app.classes.features import FeatureAssembler
+from app.classes.logs import request_sampler
+from app.classes.metrics import Metrics
+from app.classes.responses import BatchOutputResponse
+from app.classes.streaming import iter_lines, iter_chunks
 from app.classes.data_types import InputData, OutputData, BatchInputData, \
-    BatchOutputData
+    BatchOutputData, Neighbourhood, RoomType
 
 logger = logging.getLogger(__name__)
 
+# Controller of each inference process worker
+worker_controller = None
+
+
+def init_worker(api_config: Dict[str, Any]) -> None:
+    """
+    Load the model once in an inference process worker.
+
+    Args:
+        api_config (Dict[str, Any]): Configuration dictionary for the API.
+    """
+    global worker_controller
+    worker_config = dict(api_config, executor={'type': 'none'})
+    worker_config['batching'] = {'enabled': False}
+    # Stages measured in the workers would not reach the served metrics
+    worker_config['metrics'] = {'enabled': False}
+    worker_controller = APIController(worker_config)
+
+
+def predict_in_worker(items: List[InputData]) -> List[str]:
+    """
+    Predict the price categories in an inference process worker.
+    """
+    return worker_controller.predict_categories(items)
+
 
 class APIController:
     """
     Controller class for handling API requests and predictions.
     """
 
-    def __init__(self, api_config: Dict[str, Any]):
+    def __init__(
+            self,
+            api_config: Dict[str, Any],
+            metrics: Optional[Metrics] = None
+    ):
         """
         Initialize the APIController.
 
         Args:
             api_config (Dict[str, Any]): Configuration dictionary for the API.
+            metrics (Metrics, optional): Metrics to record, e.g. shared with
+            the metrics middleware. Built from the ``metrics`` section of the
+            configuration if not given.
         """
         self.api_config = api_config
         config_data = load_data_config()
-        self.preprocessing_pipeline = (
-            Data(config_data).get_preprocessing_pipeline()
-        )
+        self.preprocessing_pipeline = PreprocessingPipeline(config_data)
+        self.is_ready = False
+        self.warm_up_failed = False
         self.model = ModelEngine()
-        self.model.load_model(api_config['model_to_use'])
+        self.registry = self.model.get_registry()
+        self.swap_lock = asyncio.Lock()
+
+        # A registry version, if configured, takes precedence over the file
+        model_version = api_config.get('model_version')
+        if model_version is not None:
+            if self.registry is None:
+                raise ValueError("model_version needs the model registry")
+            entry = self.registry.get(model_version)
+            self.model_version = entry['version']
+            self.model_file = self.registry.get_artifact(entry)
+            model_path = str(self.registry.get_artifact_path(entry))
+        else:
+            self.model_version = None
+            self.model_file = api_config['model_to_use']
+            model_path = self.model_file
+        self.model.load_model(model_path)
+
+        self.feature_assembler = FeatureAssembler(
+            self.model.get_features_names(),
+            {
+                'room_type': self.preprocessing_pipeline.mapping_room_type,
+                'neighbourhood': (
+                    self.preprocessing_pipeline.mapping_neighbourhood
+                ),
+            }
+        )
+        self.executor = self.build_executor(model_path)
+
+        if metrics is None:
+            metrics = Metrics.from_config(api_config.get('metrics', {}))
+        self.metrics = metrics
+
+        batching_config = api_config.get('batching', {})
+        if batching_config.get('enabled', False):
+            # One batch in flight per worker of the executor; without one,
+            # batches run on the event loop one at a time anyway
+            max_concurrency = 1
+            if self.executor is not None:
+                max_concurrency = api_config['executor'].get('max_workers', 4)
+            self.batcher = MicroBatcher(
+                self.run_prediction,
+                max_batch_size=batching_config.get('max_batch_size', 64),
+                max_wait_ms=batching_config.get('max_wait_ms', 5),
+                max_concurrency=max_concurrency
+            )
+        else:
+            self.batcher = None
+
+    def build_executor(self, model_file: str) -> InferenceExecutor:
+        """
+        Build the inference executor configured under ``executor``.
+
+        Args:
+            model_file (str): Model loaded by the process workers, as given
+            to ``ModelEngine.load_model``.
+
+        Returns:
+            InferenceExecutor: The executor, or None if predictions run on
+            the event loop.
+        """
+        executor_config = self.api_config.get('executor', {})
+        executor_type = executor_config.get('type', 'none')
+        if executor_type == 'none':
+            return None
+
+        process_mode = executor_type == 'process'
+        worker_config = dict(
+            self.api_config, model_to_use=model_file, model_version=None
+        )
+        return InferenceExecutor(
+            predict_in_worker if process_mode else self.predict_categories,
+            executor_type=executor_type,
+            max_workers=executor_config.get('max_workers', 4),
+            max_queue_size=executor_config.get('max_queue_size', 256),
+            initializer=init_worker if process_mode else None,
+            initargs=(worker_config,) if process_mode else ()
+        )
 
     async def get_api_key(self, api_key_header: str, api_key: str):
         """
@@ -56,62 +176,120 @@ class APIController:
                 detail="Could not validate credentials"
             )
 
+    def predict_categories(self, items: List[InputData]) -> List[str]:
+        """
+        Predict the price category names of a list of input items.
+
+        Args:
+            items (List[InputData]): Input items for prediction.
+
+        Returns:
+            List[str]: Predicted price category of each item.
+        """
+        # Read the model once, so that a swap does not affect this call
+        model = self.model
+        start = time.perf_counter()
+        X = self.feature_assembler.assemble(items)
+        assembled = time.perf_counter()
+        preds = model.predict(X).astype(int)
+        if self.metrics is not None:
+            self.metrics.observe_stage('features', assembled - start)
+            self.metrics.observe_stage(
+                'inference', time.perf_counter() - assembled
+            )
+        return [
+            self.preprocessing_pipeline.get_category_name(pred)
+            for pred in preds
+        ]
+
+    async def run_prediction(self, items: List[InputData]) -> List[str]:
+        """
+        Predict the price categories on the inference executor, if any, so
+        that the event loop is not blocked.
+
+        Args:
+            items (List[InputData]): Input items for prediction.
+
+        Returns:
+            List[str]: Predicted price category of each item.
+        """
+        if self.executor is None:
+            return self.predict_categories(items)
+        return await self.executor.run(items)
+
     async def predict(
             self,
-            input_data: Union[InputData, BatchInputData]
-    ) -> Union[OutputData, BatchOutputData]:
+            input_data: Union[InputData, BatchInputData],
+            encode: bool = False
+    ) -> Union[OutputData, BatchOutputData, BatchOutputResponse]:
         """
         Make predictions based on input data.
 
+        When batching is enabled in the API configuration, concurrent single
+        requests are coalesced into one vectorized prediction.
+
         Args:
             input_data (Union[dict, Dict[str, List[dict]]]): Input data for
             prediction.
+            encode (bool): Whether to return batch results as a JSON response
+            encoded directly from the predictions, instead of building one
+            ``OutputData`` per row.
 
         Returns:
-            Union[OutputData, BatchOutputData]: Prediction results.
+            Union[OutputData, BatchOutputData, BatchOutputResponse]:
+            Prediction results.
 
         Raises:
             HTTPException: If there's a validation error or internal server
             error.
         """
-        logger.info("Prediction request received")
+        request_sampler.info(logger, "Prediction request received")
         try:
+            start = time.perf_counter()
             is_batch = isinstance(input_data, BatchInputData)
-            input_df = pd.DataFrame(
-                [data.dict() for
-                    data in (input_data.data if is_batch else [input_data])]
-            )
-
-            preprocessed_df = (
-                self.preprocessing_pipeline.map_categorical_features(input_df)
-            )
-            features = self.model.get_features_names()
-            X = preprocessed_df[features]
-
-            preds = self.model.predict(X).astype(int)
-            predictions = [
-                self.preprocessing_pipeline.get_category_name(pred)
-                for pred in preds
-            ]
+            if is_batch:
+                predictions = await self.run_prediction(input_data.data)
+            elif self.batcher is not None:
+                predictions = [await self.batcher.submit(input_data)]
+            else:
+                predictions = await self.run_prediction([input_data])
+            predicted = time.perf_counter()
 
             if is_batch:
-                results = [
-                    OutputData(id=data.id, price_category=pred)
-                    for data, pred in zip(input_data.data, predictions)
-                ]
-
-                n = len(results)
-                logger.info(
-                    f"Batch prediction completed for {n} predictions"
+                if encode:
+                    output = BatchOutputResponse(
+                        [data.id for data in input_data.data], predictions
+                    )
+                else:
+                    output = BatchOutputData(results=[
+                        OutputData(id=data.id, price_category=pred)
+                        for data, pred in zip(input_data.data, predictions)
+                    ])
+
+                n = len(predictions)
+                request_sampler.info(
+                    logger, f"Batch prediction completed for {n} predictions"
                 )
-                return BatchOutputData(results=results)
             else:
-                logger.info("Individual prediction completed")
-                return OutputData(
+                request_sampler.info(logger, "Individual prediction completed")
+                output = OutputData(
                     id=input_data.id,
                     price_category=predictions[0]
                 )
 
+            if self.metrics is not None:
+                self.metrics.observe_stage('prediction', predicted - start)
+                self.metrics.observe_stage(
+                    'response', time.perf_counter() - predicted
+                )
+                self.metrics.observe_batch(len(predictions))
+            return output
+
+        except ExecutorBusyError as eb:
+            raise HTTPException(
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Service unavailable: {str(eb)}"
+            )
         except ValidationError as ve:
             logger.error(f"Validation error: {str(ve)}")
             raise HTTPException(
@@ -125,6 +303,292 @@ class APIController:
                 detail=f"Internal server error: {str(e)}"
             )
 
+    async def predict_stream(
+            self,
+            stream: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        """
+        Score newline-delimited JSON records in fixed-size chunks and stream
+        the results back as they are computed.
+
+        Only one chunk of records is held in memory at a time. Records that
+        fail validation or are longer than ``streaming.max_line_size`` bytes
+        produce an error line with their line number instead of a result; an
+        error while scoring ends the stream with a final error line.
+
+        Args:
+            stream (AsyncIterator[bytes]): Chunks of the request body, with
+            one ``InputData`` JSON object per line.
+
+        Yields:
+            bytes: One NDJSON line per record, either an ``OutputData``
+            object or an error object.
+        """
+        streaming_config = self.api_config.get('streaming', {})
+        chunk_size = streaming_config.get('chunk_size', 1000)
+        max_line_size = streaming_config.get('max_line_size', 65536)
+        n = 0
+        request_sampler.info(
+            logger, "Streaming prediction request received"
+        )
+        lines = iter_lines(stream, max_line_size)
+        async for chunk in iter_chunks(lines, chunk_size):
+            items, output = [], []
+            for line_number, line in chunk:
+                if line is None:
+                    output.append(json.dumps({
+                        'line': line_number,
+                        'error': f"Line longer than {max_line_size} bytes"
+                    }))
+                    continue
+                try:
+                    items.append(InputData.model_validate_json(line))
+                    output.append(None)
+                except ValidationError as ve:
+                    output.append(json.dumps(
+                        {'line': line_number, 'error': str(ve)}
+                    ))
+
+            try:
+                # A chunk of invalid records has nothing to score
+                predictions = iter(
+                    await self.run_prediction(items) if items else []
+                )
+            except Exception as e:
+                logger.exception(f"Exception during prediction: {str(e)}")
+                yield json.dumps({'error': str(e)}).encode() + b'\n'
+                return
+
+            items = iter(items)
+            for i, line in enumerate(output):
+                if line is None:
+                    line = OutputData(
+                        id=next(items).id,
+                        price_category=next(predictions)
+                    ).model_dump_json()
+                output[i] = line
+            n += len(output)
+            yield ('\n'.join(output) + '\n').encode()
+
+        request_sampler.info(
+            logger, f"Streaming prediction completed for {n} records"
+        )
+
+    def build_warm_up_items(self, n: int, start: int = 0) -> List[InputData]:
+        """
+        Build synthetic input items covering every neighbourhood and room
+        type.
+
+        Every item has a different number of bathrooms, off the grid of the
+        lookup table, so that it is evaluated by the model and not answered
+        from the lookup table or the prediction cache.
+
+        Args:
+            n (int): Number of items.
+            start (int): Id of the first item. Items with different ids have
+            different features.
+
+        Returns:
+            List[InputData]: Input items for the warm-up pass.
+        """
+        neighbourhoods = list(Neighbourhood)
+        room_types = list(RoomType)
+        return [
+            InputData(
+                id=i,
+                neighbourhood=neighbourhoods[i % len(neighbourhoods)],
+                room_type=room_types[i % len(room_types)],
+                accommodates=1 + i % 6,
+                bathrooms=1.25 + i * 1e-6,
+                bedrooms=1 + i % 3,
+                beds=1 + i % 3,
+                tv=i % 2,
+                elevator=i % 2,
+                internet=1,
+                latitude=40.7,
+                longitude=-73.9
+            )
+            for i in range(start, start + n)
+        ]
+
+    async def warm_up(self):
+        """
+        Run synthetic batches through the prediction path so that pools,
+        buffers and caches are ready before real traffic arrives, then mark
+        the controller as ready.
+        """
+        warm_up_config = self.api_config.get('warm_up', {})
+        if warm_up_config.get('enabled', True):
+            logger.info("Starting warm-up")
+            batch_size = warm_up_config.get('batch_size', 64)
+            # One concurrent batch per worker, so that every worker of the
+            # executor loads its model
+            n_workers = self.api_config.get('executor', {}).get(
+                'max_workers', 1
+            )
+            start = 0
+            for _ in range(warm_up_config.get('repetitions', 3)):
+                batches = []
+                for _ in range(n_workers):
+                    batches.append(self.build_warm_up_items(batch_size, start))
+                    start += batch_size
+                await asyncio.gather(
+                    *[self.run_prediction(items) for items in batches]
+                )
+            logger.info("Warm-up completed")
+        self.is_ready = True
+
+    def on_warm_up_done(self, task: asyncio.Task) -> None:
+        """
+        Done callback of the warm-up task started with the API: log its
+        error, if any, and mark the warm-up as failed so that the API never
+        reports itself as ready.
+
+        Args:
+            task (asyncio.Task): Task running ``warm_up``.
+        """
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.error("Warm-up failed", exc_info=error)
+            self.warm_up_failed = True
+
+    async def swap_model(self, version: Union[int, str]) -> Dict[str, Any]:
+        """
+        Load a registered model version in the background, warm it up and
+        make it the model used for new predictions.
+
+        Predictions that are already running finish with the previous model.
+        In process mode a new pool is started with the new model and the old
+        one is shut down once its pending calls complete.
+
+        Args:
+            version (Union[int, str]): Version number, ``latest`` or
+            ``active``.
+
+        Returns:
+            Dict[str, Any]: Version and artifact now served.
+
+        Raises:
+            ValueError: If the version is not in the registry.
+            FileNotFoundError: If the artifact of the version is missing.
+        """
+        if self.registry is None:
+            raise ValueError("The model registry is disabled")
+
+        async with self.swap_lock:
+            entry = self.registry.get(version)
+            model_file = self.registry.get_artifact(entry)
+            # Artifacts are relative to the folder of the manifest
+            model_path = str(self.registry.get_artifact_path(entry))
+            logger.info(f"Swapping to model version {entry['version']}")
+
+            loop = asyncio.get_running_loop()
+            model = ModelEngine()
+            await loop.run_in_executor(None, model.load_model, model_path)
+
+            warm_up_config = self.api_config.get('warm_up', {})
+            batch_size = warm_up_config.get('batch_size', 64)
+            repetitions = warm_up_config.get('repetitions', 3)
+            executor = None
+            if self.api_config.get('executor', {}).get('type') == 'process':
+                executor = self.build_executor(model_path)
+                n_workers = self.api_config['executor'].get('max_workers', 1)
+                try:
+                    for repetition in range(repetitions):
+                        start = repetition * n_workers * batch_size
+                        await asyncio.gather(*[
+                            executor.run(self.build_warm_up_items(
+                                batch_size, start + worker * batch_size
+                            ))
+                            for worker in range(n_workers)
+                        ])
+                except BaseException:
+                    # The current model keeps serving; stop the new workers
+                    executor.shutdown()
+                    raise
+            else:
+                def warm_up_model():
+                    for repetition in range(repetitions):
+                        items = self.build_warm_up_items(
+                            batch_size, repetition * batch_size
+                        )
+                        model.predict(self.feature_assembler.assemble(items))
+
+                await loop.run_in_executor(None, warm_up_model)
+
+            # Swap the references used by new predictions
+            self.model = model
+            if executor is not None:
+                old_executor, self.executor = self.executor, executor
+                old_executor.shutdown(cancel_futures=False)
+            self.model_version = entry['version']
+            self.model_file = model_file
+            self.registry.set_active(entry['version'])
+            logger.info(f"Model version {entry['version']} is now served")
+            return {'version': self.model_version, 'model': model_file}
+
+    async def activate_model(self, version: str) -> Dict[str, Any]:
+        """
+        Swap to a registered model version.
+
+        Raises:
+            HTTPException: If the version is not in the registry or its
+            artifact is missing.
+        """
+        try:
+            return await self.swap_model(version)
+        except (ValueError, FileNotFoundError) as e:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(e))
+
+    async def list_models(self) -> Dict[str, Any]:
+        """
+        List the registered model versions and the one being served.
+        """
+        manifest = (
+            self.registry.load() if self.registry is not None
+            else {'active': None, 'versions': []}
+        )
+        return {
+            'serving': {
+                'version': self.model_version, 'model': self.model_file
+            },
+            'active': manifest['active'],
+            'versions': manifest['versions'],
+        }
+
+    async def ready(self):
+        """
+        Report whether the API has completed its warm-up.
+
+        Returns:
+            Dict[str, str]: Readiness status.
+
+        Raises:
+            HTTPException: If the warm-up failed or has not completed yet.
+        """
+        if self.warm_up_failed:
+            raise HTTPException(
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Warm-up failed"
+            )
+        if not self.is_ready:
+            raise HTTPException(
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Warming up"
+            )
+        return {"status": "ready"}
+
+    async def close(self):
+        """
+        Release the resources held by the controller.
+        """
+        if self.batcher is not None:
+            await self.batcher.close()
+        if self.executor is not None:
+            self.executor.shutdown()
+
     async def welcome(self):
         """
         Generate a welcome message for the API.
@@ -132,6 +596,6 @@ class APIController:
         Returns:
             Dict[str, str]: A dictionary containing the welcome message.
         """
-        logger.info("Welcome request received")
+        request_sampler.info(logger, "Welcome request received")
         msg = "Hello! Welcome to the Airbnb price prediction API."
         return {"message": msg}
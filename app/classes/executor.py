@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusyError(Exception):
+    """Raised when the inference queue is full."""
+
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound inference on a thread or process pool so that the event
+    loop keeps serving other requests while a batch is evaluated.
+
+    At most ``max_workers`` calls run at the same time and at most
+    ``max_queue_size`` more wait for a free worker; further calls are
+    rejected with ``ExecutorBusyError``.
+    """
+
+    def __init__(
+            self,
+            function: Callable,
+            executor_type: str = 'thread',
+            max_workers: int = 4,
+            max_queue_size: int = 256,
+            initializer: Callable = None,
+            initargs: Tuple = ()
+    ):
+        """
+        Initialize the InferenceExecutor.
+
+        Args:
+            function (Callable): Function to run in the pool. In process mode
+            it must be picklable (defined at module level).
+            executor_type (str): Either ``thread`` or ``process``.
+            max_workers (int): Number of workers of the pool.
+            max_queue_size (int): Maximum number of calls waiting for a
+            worker.
+            initializer (Callable): Function run once when each process
+            worker starts, e.g. to load the model.
+            initargs (Tuple): Arguments of the initializer.
+
+        Raises:
+            ValueError: If the executor type is not supported.
+        """
+        self.function = function
+        self.max_pending = max_workers + max_queue_size
+        self.pending = 0
+
+        if executor_type == 'thread':
+            self.pool = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='inference'
+            )
+        elif executor_type == 'process':
+            self.pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=initializer,
+                initargs=initargs
+            )
+        else:
+            logger.error(f"Executor type {executor_type} not supported")
+            raise ValueError(f'Executor type {executor_type} not supported')
+
+        logger.info(
+            f"Inference executor initialized: {executor_type} pool with "
+            f"{max_workers} workers"
+        )
+
+    async def run(self, *args: Any) -> Any:
+        """
+        Run the function in the pool without blocking the event loop.
+
+        Args:
+            *args (Any): Arguments of the function.
+
+        Returns:
+            Any: Result of the function.
+
+        Raises:
+            ExecutorBusyError: If the queue of pending calls is full.
+        """
+        if self.pending >= self.max_pending:
+            logger.warning("Inference queue is full")
+            raise ExecutorBusyError("Inference queue is full")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, self.function, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self, cancel_futures: bool = True) -> None:
+        """
+        Stop the pool without waiting for it.
+
+        Args:
+            cancel_futures (bool): Whether to cancel the calls that have not
+            started instead of letting the pool complete them.
+        """
+        self.pool.shutdown(wait=False, cancel_futures=cancel_futures)
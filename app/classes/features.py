@@ -0,0 +1,107 @@
+import threading
+import numpy as np
+from enum import Enum
+from typing import Any, Dict, List, Type
+
+from app.classes.data_types import InputData, Neighbourhood, RoomType
+
+
+class FeatureAssembler:
+    """
+    Builds the model feature matrix directly from validated input items.
+
+    Categorical enums are encoded through precomputed lookups and values
+    are written column by column into a preallocated, feature-ordered
+    buffer, producing the same matrix as building a DataFrame, mapping the
+    categorical features and selecting the feature columns.
+    """
+
+    enums: Dict[str, Type[Enum]] = {
+        'neighbourhood': Neighbourhood,
+        'room_type': RoomType,
+    }
+
+    def __init__(
+            self,
+            features: List[str],
+            categorical_mapping: Dict[str, Dict[str, int]],
+            initial_size: int = 64
+    ):
+        """
+        Initialize the FeatureAssembler.
+
+        Args:
+            features (List[str]): Names of the model features, in order.
+            categorical_mapping (Dict[str, Dict[str, int]]): Integer code of
+            every category, by feature.
+            initial_size (int): Initial number of rows of the buffers.
+        """
+        self.features = list(features)
+        self.initial_size = initial_size
+        self.encoders = {
+            name: self.build_encoder(name, mapping)
+            for name, mapping in categorical_mapping.items()
+            if name in self.features
+        }
+        self.local = threading.local()
+
+    def build_encoder(
+            self,
+            name: str,
+            mapping: Dict[str, int]
+    ) -> Dict[Any, float]:
+        """
+        Build the lookup from category to code, accepting both the enum
+        members and their string values as keys.
+        """
+        encoder = {value: float(code) for value, code in mapping.items()}
+        enum = self.enums.get(name)
+        if enum is not None:
+            for member in enum:
+                if member.value in mapping:
+                    encoder[member] = float(mapping[member.value])
+        return encoder
+
+    def get_buffer(self, n_rows: int) -> np.ndarray:
+        """
+        Return a buffer of at least ``n_rows`` rows owned by the current
+        thread, growing it if needed.
+        """
+        buffer = getattr(self.local, 'buffer', None)
+        if buffer is None or buffer.shape[0] < n_rows:
+            size = max(n_rows, self.initial_size)
+            buffer = np.empty((size, len(self.features)), dtype=np.float64)
+            self.local.buffer = buffer
+        return buffer[:n_rows]
+
+    def assemble(self, items: List[InputData]) -> np.ndarray:
+        """
+        Build the feature matrix of a list of input items.
+
+        The returned array is a view of a per-thread buffer that is reused
+        by the next call from the same thread, so it must be consumed (or
+        copied) before assembling another batch.
+
+        Args:
+            items (List[InputData]): Validated input items.
+
+        Returns:
+            np.ndarray: Float matrix with one row per item and one column per
+            feature, in model order.
+
+        Raises:
+            ValueError: If a categorical value has no mapping.
+        """
+        x = self.get_buffer(len(items))
+        for column, feature in enumerate(self.features):
+            values = [getattr(item, feature) for item in items]
+            encoder = self.encoders.get(feature)
+            if encoder is not None:
+                try:
+                    values = [encoder[value] for value in values]
+                except KeyError as e:
+                    raise ValueError(
+                        f"Unknown category {e.args[0]} for {feature}"
+                    )
+            x[:, column] = values
+        return x
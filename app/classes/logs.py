@@ -0,0 +1,213 @@
+import sys
+import queue
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional, TextIO
+
+from app.classes.metrics import Metrics, bucket_quantile
+
+
+class LogSampler:
+    """
+    Samples the log records emitted once per request before they are
+    created, since building a record costs more than writing it through a
+    queue, and counts how many of them were seen and kept by logger.
+    Warnings and errors are logged directly and never sampled.
+    """
+
+    def __init__(self, rate: float = 1.0, seed: int = None):
+        """
+        Initialize the LogSampler.
+
+        Args:
+            rate (float): Fraction of the per-request records that are kept.
+            seed (int, optional): Seed of the random generator.
+        """
+        self.rate = rate
+        self.random = random.Random(seed).random
+        self.counts: Dict[str, List[int]] = {}
+        self.lock = threading.Lock()
+
+    def sample(self, logger: logging.Logger) -> bool:
+        if not logger.isEnabledFor(logging.INFO):
+            return False
+        keep = self.random() < self.rate
+        with self.lock:
+            counts = self.counts.setdefault(logger.name, [0, 0])
+            counts[0] += 1
+            counts[1] += keep
+        return keep
+
+    def info(self, logger: logging.Logger, message: str) -> None:
+        """
+        Log a per-request message at INFO level if it is sampled.
+        """
+        if self.sample(logger):
+            logger.info(message, stacklevel=2)
+
+    def pop_counts(self) -> Dict[str, List[int]]:
+        """
+        Records seen and kept by logger since the previous call.
+        """
+        with self.lock:
+            counts, self.counts = self.counts, {}
+        return counts
+
+
+# Sampler of the per-request log records of the API
+request_sampler = LogSampler()
+
+
+class SampledLogging:
+    """
+    Logging configuration of the API: records are put on a queue by the
+    request handlers and written to stdout by a background thread, per-request
+    records are sampled and a summary of them is logged periodically.
+
+    Since most per-request records are dropped, the summary also reports the
+    number of requests, errors and their latency, taken from the metrics.
+
+    The background threads run between ``start`` and ``stop``; before and
+    after, records are written directly by the stream handler.
+    """
+
+    def __init__(
+            self,
+            config: Dict[str, Any],
+            stream: TextIO = None,
+            metrics: Metrics = None
+    ):
+        """
+        Configure the root logger to write records directly to the stream.
+
+        Args:
+            config (Dict[str, Any]): ``logging`` section of the API
+            configuration, with the ``level``, ``format``, ``sample_rate``
+            of the per-request records and ``summary_interval_s``.
+            stream (TextIO, optional): Stream the records are written to.
+            Defaults to stdout.
+            metrics (Metrics, optional): Metrics of the API, from which the
+            request aggregates of the summary are computed. Without them,
+            the summary only counts the per-request records.
+        """
+        self.summary_interval = config.get('summary_interval_s', 60)
+        self.sampler = request_sampler
+        self.sampler.rate = config.get('sample_rate', 1.0)
+        self.metrics = metrics
+        self.request_totals = metrics.request_totals() if metrics else None
+
+        self.stream_handler = logging.StreamHandler(stream or sys.stdout)
+        self.stream_handler.setFormatter(logging.Formatter(
+            config.get('format', '%(levelname)s:%(name)s: %(message)s')
+        ))
+        self.queue_handler = QueueHandler(queue.SimpleQueue())
+        # The message, with any traceback, is rendered before being queued
+        # and the stream handler adds the level and logger name
+        self.queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        self.listener = QueueListener(
+            self.queue_handler.queue, self.stream_handler
+        )
+
+        logging.basicConfig(
+            level=config.get('level', 'INFO'),
+            handlers=[self.stream_handler],
+            force=True
+        )
+        self.stopped = threading.Event()
+        self.reporter = None
+
+    def start(self) -> None:
+        """
+        Start writing the records through the queue and logging the
+        summaries. Does nothing if already started.
+        """
+        if self.reporter is not None:
+            return
+        self.listener.start()
+        root = logging.getLogger()
+        root.addHandler(self.queue_handler)
+        root.removeHandler(self.stream_handler)
+
+        self.stopped.clear()
+        self.reporter = threading.Thread(
+            target=self.report, name='log-summary', daemon=True
+        )
+        self.reporter.start()
+
+    def report(self) -> None:
+        while not self.stopped.wait(self.summary_interval):
+            self.log_summary()
+
+    def log_summary(self) -> None:
+        """
+        Log how many per-request records every logger emitted and how many
+        were written, and the requests, errors and latency, since the
+        previous summary.
+        """
+        logger = logging.getLogger(__name__)
+        counts = self.sampler.pop_counts()
+        if counts:
+            summary = ', '.join(
+                f"{name}: {seen} ({kept} written)"
+                for name, (seen, kept) in sorted(counts.items())
+            )
+            logger.info(
+                f"Per-request log records since the last summary: {summary}"
+            )
+
+        requests = self.summarize_requests()
+        if requests:
+            logger.info(f"Requests since the last summary: {requests}")
+
+    def summarize_requests(self) -> Optional[str]:
+        """
+        Requests, errors and latency since the previous call, or None if
+        there are no metrics or no requests.
+        """
+        if self.metrics is None:
+            return None
+        totals = self.metrics.request_totals()
+        last, self.request_totals = self.request_totals, totals
+
+        n_requests = int(totals['requests'] - last['requests'])
+        if n_requests <= 0:
+            return None
+        errors = int(totals['errors'] - last['errors'])
+        counts = [
+            count - last_count for count, last_count
+            in zip(totals['duration_counts'], last['duration_counts'])
+        ]
+        mean_ms = (
+            (totals['duration_sum'] - last['duration_sum'])
+            / n_requests * 1000
+        )
+        buckets = self.metrics.request_duration.buckets
+        p50_ms, p99_ms = (
+            bucket_quantile(buckets, counts, quantile) * 1000
+            for quantile in (0.5, 0.99)
+        )
+        return (
+            f"{n_requests} ({errors} errors, {errors / n_requests:.2%}), "
+            f"latency mean {mean_ms:.2f} ms, p50 <= {p50_ms:g} ms, "
+            f"p99 <= {p99_ms:g} ms"
+        )
+
+    def stop(self) -> None:
+        """
+        Log the last summary, write the queued records and go back to
+        writing records directly. Does nothing if not started.
+        """
+        if self.reporter is None:
+            return
+        self.stopped.set()
+        self.reporter.join()
+        self.reporter = None
+        self.log_summary()
+
+        root = logging.getLogger()
+        root.addHandler(self.stream_handler)
+        root.removeHandler(self.queue_handler)
+        self.listener.stop()
+        self.stream_handler.flush()
@@ -0,0 +1,314 @@
+import time
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DURATION_BUCKETS = [
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+]
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000,
+                      10000]
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', r'\\').replace('"', r'\"')
+        pairs.append(f'{name}="{value}"'.replace('\n', r'\n'))
+    return '{' + ','.join(pairs) + '}'
+
+
+def sort_key(item: Tuple) -> Tuple[str, ...]:
+    # Label values may mix types, e.g. status codes and strings
+    return tuple(map(str, item[0]))
+
+
+def bucket_quantile(
+        buckets: List[float],
+        counts: List[int],
+        quantile: float
+) -> float:
+    """
+    Upper bound of the histogram bucket that contains the quantile, or
+    ``inf`` if it is in the +Inf bucket.
+    """
+    rank = quantile * sum(counts)
+    cumulative = 0
+    for bound, count in zip(buckets + [float('inf')], counts):
+        cumulative += count
+        if count and cumulative >= rank:
+            return bound
+    return float('inf')
+
+
+class Counter:
+    """
+    Monotonic counter, with one series per combination of label values.
+    """
+
+    def __init__(self, name: str, description: str, labels: Tuple = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.series: Dict[Tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, value: float = 1, labels: Tuple = ()) -> None:
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + value
+
+    def total(self) -> float:
+        """
+        Sum of all the series.
+        """
+        with self.lock:
+            return sum(self.series.values())
+
+    def render(self) -> List[str]:
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} counter',
+        ]
+        with self.lock:
+            series = sorted(self.series.items(), key=sort_key)
+        for values, total in series:
+            lines.append(
+                f'{self.name}{format_labels(self.labels, values)} {total}'
+            )
+        return lines
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets, with one series per combination of label
+    values.
+
+    Observations only increment the count of their bucket; the cumulative
+    counts of the Prometheus format are computed when rendering.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            description: str,
+            buckets: List[float],
+            labels: Tuple = ()
+    ):
+        self.name = name
+        self.description = description
+        self.buckets = sorted(buckets)
+        self.labels = tuple(labels)
+        # Count of every bucket, plus the +Inf one, and sum of every series
+        self.series: Dict[Tuple, List] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple = ()) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def merged(self) -> Tuple[List[int], float]:
+        """
+        Count of every bucket and sum of all the series together.
+        """
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        with self.lock:
+            for series_counts, series_total in self.series.values():
+                counts = [a + b for a, b in zip(counts, series_counts)]
+                total += series_total
+        return counts, total
+
+    def render(self) -> List[str]:
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            series = sorted(
+                ((values, (list(counts), total))
+                 for values, (counts, total) in self.series.items()),
+                key=sort_key
+            )
+        names = self.labels + ('le',)
+        bounds = [repr(float(bound)) for bound in self.buckets] + ['+Inf']
+        for values, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                label = format_labels(names, values + (bound,))
+                lines.append(f'{self.name}_bucket{label} {cumulative}')
+            label = format_labels(self.labels, values)
+            lines.append(f'{self.name}_sum{label} {total}')
+            lines.append(f'{self.name}_count{label} {cumulative}')
+        return lines
+
+
+class Metrics:
+    """
+    Counters and histograms of the API, rendered in the Prometheus text
+    format.
+    """
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(
+            self,
+            duration_buckets: List[float] = None,
+            batch_size_buckets: List[float] = None
+    ):
+        """
+        Initialize the Metrics.
+
+        Args:
+            duration_buckets (List[float], optional): Upper bounds, in
+            seconds, of the latency histogram buckets.
+            batch_size_buckets (List[float], optional): Upper bounds of the
+            batch size histogram buckets.
+        """
+        duration_buckets = duration_buckets or DURATION_BUCKETS
+        self.requests = Counter(
+            'api_requests_total',
+            'Requests by endpoint and status code.',
+            ('endpoint', 'status')
+        )
+        self.errors = Counter(
+            'api_errors_total',
+            'Requests answered with an error status code.',
+            ('status',)
+        )
+        self.rows = Counter(
+            'api_predicted_rows_total', 'Rows predicted by /predict.'
+        )
+        self.request_duration = Histogram(
+            'api_request_duration_seconds',
+            'Time from receiving a request to sending its response.',
+            duration_buckets,
+            ('endpoint',)
+        )
+        self.stage_duration = Histogram(
+            'api_stage_duration_seconds',
+            'Time spent in every stage of the prediction path.',
+            duration_buckets,
+            ('stage',)
+        )
+        self.batch_size = Histogram(
+            'api_batch_size',
+            'Rows of every /predict request.',
+            batch_size_buckets or BATCH_SIZE_BUCKETS
+        )
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['Metrics']:
+        """
+        Build the metrics of the ``metrics`` section of the API
+        configuration, or None if they are disabled.
+        """
+        if not config.get('enabled', False):
+            return None
+        return cls(
+            config.get('duration_buckets'), config.get('batch_size_buckets')
+        )
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        self.stage_duration.observe(seconds, (stage,))
+
+    def observe_batch(self, n_rows: int) -> None:
+        self.rows.inc(n_rows)
+        self.batch_size.observe(n_rows)
+
+    def observe_request(
+            self,
+            endpoint: str,
+            status: int,
+            seconds: float
+    ) -> None:
+        self.requests.inc(1, (endpoint, status))
+        if status >= 400:
+            self.errors.inc(1, (status,))
+        self.request_duration.observe(seconds, (endpoint,))
+
+    def request_totals(self) -> Dict[str, Any]:
+        """
+        Requests, errors and request latency histogram over all endpoints
+        since the start, from which the logging summary computes the
+        aggregates of every interval.
+        """
+        counts, total = self.request_duration.merged()
+        return {
+            'requests': self.requests.total(),
+            'errors': self.errors.total(),
+            'duration_counts': counts,
+            'duration_sum': total,
+        }
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.requests, self.errors, self.rows,
+                       self.request_duration, self.stage_duration,
+                       self.batch_size):
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records the latency and status code of every
+    request.
+
+    Endpoints that store ``handler_start`` and ``handler_end`` times
+    (``time.perf_counter``) in the request state also get their validation
+    stage, from receiving the request to entering the endpoint, and their
+    serialization stage, from leaving the endpoint to sending the last
+    byte of the response, recorded.
+    """
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        end = None
+
+        async def send_wrapper(message):
+            nonlocal status, end
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif not message.get('more_body', False):
+                end = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = end or time.perf_counter()
+            # The router sets the matched endpoint in the scope
+            endpoint = scope.get('endpoint')
+            name = getattr(endpoint, '__name__', 'unmatched')
+            self.metrics.observe_request(name, status, end - start)
+
+            state = scope.get('state', {})
+            if 'handler_end' in state:
+                self.metrics.observe_stage(
+                    'validation', state['handler_start'] - start
+                )
+                self.metrics.observe_stage(
+                    'serialization', end - state['handler_end']
+                )
@@ -0,0 +1,55 @@
+import json
+from typing import List
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    """
+    Encode an object as compact JSON, with orjson if it is installed.
+
+    Both encoders produce the same bytes as FastAPI's ``JSONResponse``.
+    Content that orjson cannot encode, e.g. integers that do not fit in 64
+    bits, is encoded with the standard library.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(content)
+        except (orjson.JSONEncodeError, TypeError):
+            pass
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+class BatchOutputResponse(Response):
+    """
+    JSON response with the ``BatchOutputData`` format, encoded directly
+    from the ids and the predicted price categories.
+
+    No ``OutputData`` model is built per row, and FastAPI returns the
+    response as is instead of validating and encoding it again against the
+    ``response_model``.
+    """
+
+    media_type = 'application/json'
+
+    def __init__(self, ids: List[int], price_categories: List[str]):
+        """
+        Initialize the BatchOutputResponse.
+
+        Args:
+            ids (List[int]): Id of every input item.
+            price_categories (List[str]): Predicted price category of every
+            input item.
+        """
+        super().__init__(content=dumps({
+            'results': [
+                {'id': id_, 'price_category': price_category}
+                for id_, price_category in zip(ids, price_categories)
+            ]
+        }))
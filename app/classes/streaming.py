@@ -0,0 +1,98 @@
+from typing import AsyncIterator, List, Optional, Tuple
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Streaming response whose body is produced while the request body is
+    still being read.
+
+    ``StreamingResponse`` listens for client disconnection on ``receive``
+    while it streams, which would consume the request body messages. This
+    response leaves ``receive`` to the request stream, which raises
+    ``ClientDisconnect`` if the client goes away.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(
+        stream: AsyncIterator[bytes],
+        max_line_size: int = 65536
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a stream of byte chunks into lines, keeping only the current
+    incomplete line in memory.
+
+    The pieces of an incomplete line are joined once the line ends. A line
+    longer than ``max_line_size`` bytes is discarded as it is read and
+    yielded as None, so a line without newlines cannot exhaust memory.
+
+    Args:
+        stream (AsyncIterator[bytes]): Chunks of the request body.
+        max_line_size (int): Maximum size of a line in bytes.
+
+    Yields:
+        Tuple[int, Optional[bytes]]: Line number (starting at 1) and content
+        of every non-empty line, or None if the line is too long.
+    """
+    pending = []
+    pending_size = 0
+    too_long = False
+    line_number = 0
+    async for chunk in stream:
+        pieces = chunk.split(b'\n')
+        last = pieces.pop()
+        for piece in pieces:
+            line_number += 1
+            if too_long or pending_size + len(piece) > max_line_size:
+                yield line_number, None
+            else:
+                line = b''.join(pending) + piece if pending else piece
+                if line.strip():
+                    yield line_number, line
+            pending, pending_size, too_long = [], 0, False
+
+        if too_long or not last:
+            continue
+        if pending_size + len(last) > max_line_size:
+            pending, pending_size, too_long = [], 0, True
+        else:
+            pending.append(last)
+            pending_size += len(last)
+
+    if too_long:
+        yield line_number + 1, None
+    elif pending:
+        line = b''.join(pending)
+        if line.strip():
+            yield line_number + 1, line
+
+
+async def iter_chunks(
+        lines: AsyncIterator[Tuple[int, Optional[bytes]]],
+        chunk_size: int
+) -> AsyncIterator[List[Tuple[int, Optional[bytes]]]]:
+    """
+    Group lines into lists of at most ``chunk_size`` lines.
+
+    Args:
+        lines (AsyncIterator[Tuple[int, Optional[bytes]]]): Numbered
+        lines.
+        chunk_size (int): Maximum number of lines per chunk.
+
+    Yields:
+        List[Tuple[int, Optional[bytes]]]: Chunks of numbered lines.
+    """
+    chunk = []
+    async for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
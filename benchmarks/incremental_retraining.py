@@ -0,0 +1,68 @@
+import sys
+import time
+import logging
+from pathlib import Path
+
+# Add the project root directory to PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sklearn.model_selection import train_test_split  # noqa: E402
+
+from src.data.data import Data, load_config  # noqa: E402
+from src.model.engine import ModelEngine  # noqa: E402
+
+BASE_MODEL = 'simple_classifier.pkl'
+# Share of the training listings that changed since the base model
+CHANGED_FRACTION = 0.1
+
+
+def run_benchmark():
+    logging.disable(logging.INFO)
+    engine = ModelEngine()
+    data = Data(load_config()).load_clean(map_categorical_features=True)
+    data = data.dropna(axis=0)
+
+    x = data[engine.get_features_names()]
+    y = data[engine.get_target_name()]
+    x_train, x_test, y_train, y_test = train_test_split(
+        x,
+        y,
+        test_size=engine.train_config['test_size'],
+        random_state=engine.train_config['random_state']
+    )
+    x_changed = x_train.sample(frac=CHANGED_FRACTION, random_state=0)
+    y_changed = y_train.loc[x_changed.index]
+
+    incremental_config = engine.config.get('incremental', {})
+    n_new_trees = incremental_config.get('n_new_trees', 50)
+    drop_oldest = incremental_config.get('drop_oldest', True)
+
+    rows = []
+
+    start = time.perf_counter()
+    engine.train(x_train, y_train)
+    rows.append(('full retrain', len(x_train), time.perf_counter() - start,
+                 engine.test(x_test, y_test), len(engine.model.estimators_)))
+
+    engine.load_model(BASE_MODEL)
+    rows.append(('base model', 0, 0.0, engine.test(x_test, y_test),
+                 len(engine.model.estimators_)))
+
+    start = time.perf_counter()
+    engine.grow(
+        x_changed, y_changed, n_new_trees, drop_oldest=drop_oldest,
+        class_weight_target=y_train
+    )
+    rows.append(('incremental', len(x_changed), time.perf_counter() - start,
+                 engine.test(x_test, y_test), len(engine.model.estimators_)))
+
+    print(f"{'mode':<14} | {'rows':>6} | {'trees':>5} | {'wall time':>9} | "
+          f"{'accuracy':>8} | {'roc auc':>7}")
+    for mode, n_rows, elapsed, results, n_trees in rows:
+        print(f"{mode:<14} | {n_rows:>6} | {n_trees:>5} | {elapsed:>8.2f}s | "
+              f"{results['accuracy']:>8.4f} | {results['roc_auc']:>7.4f}")
+
+
+if __name__ == '__main__':
+    run_benchmark()
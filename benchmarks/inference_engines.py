@@ -0,0 +1,62 @@
+import sys
+import time
+import logging
+import numpy as np
+from pathlib import Path
+
+# Add the project root directory to PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.data.data import Data, load_config  # noqa: E402
+from src.model.engine import ModelEngine  # noqa: E402
+from src.model.compiled import CompiledForest  # noqa: E402
+
+MODEL_NAME = 'simple_classifier.pkl'
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+REPETITIONS = 20
+
+
+def time_predict(predict, x, repetitions=REPETITIONS):
+    """
+    Measure the latency of a predict function.
+
+    Returns:
+        Tuple[float, float]: Median and p99 latency in milliseconds.
+    """
+    predict(x)
+    times = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        predict(x)
+        times.append((time.perf_counter() - start) * 1000)
+    return np.median(times), np.percentile(times, 99)
+
+
+def run_benchmark():
+    engine = ModelEngine()
+    engine.load_model(MODEL_NAME)
+    compiled = CompiledForest.from_sklearn(engine.model)
+
+    data = Data(load_config()).load_clean(map_categorical_features=True)
+    x = data[engine.get_features_names()].dropna()
+
+    same = np.array_equal(compiled.predict(x), engine.model.predict(x))
+    print(f"Identical predictions on {len(x)} rows: {same}")
+
+    print(f"{'batch':>6} | {'sklearn p50':>11} | {'sklearn p99':>11} | "
+          f"{'compiled p50':>12} | {'compiled p99':>12} | speedup")
+    for batch_size in BATCH_SIZES:
+        batch = x.sample(batch_size, replace=True, random_state=0)
+        repetitions = max(3, min(REPETITIONS, 2000 // batch_size))
+        sk_p50, sk_p99 = time_predict(
+            engine.model.predict, batch, repetitions
+        )
+        c_p50, c_p99 = time_predict(compiled.predict, batch, repetitions)
+        print(f"{batch_size:>6} | {sk_p50:>9.2f}ms | {sk_p99:>9.2f}ms | "
+              f"{c_p50:>10.2f}ms | {c_p99:>10.2f}ms | {sk_p50 / c_p50:.1f}x")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    run_benchmark()
@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import contextlib
+import logging
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+from dotenv import load_dotenv
+
+# Add the project root directory to PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.serving import build_items, load_listings  # noqa: E402
+
+PERCENTILES = [50, 95, 99]
+
+
+def load_payloads(path: Path) -> List[Dict[str, Any]]:
+    """
+    Read request bodies from a JSONL file, one InputData or BatchInputData
+    object per line.
+    """
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def generate_payloads(
+        n_requests: int,
+        batch_ratio: float,
+        batch_size: int,
+        seed: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Build request bodies from random clean listings.
+
+    Args:
+        n_requests (int): Number of bodies.
+        batch_ratio (float): Fraction of the bodies that are batches.
+        batch_size (int): Number of items of every batch.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        List[Dict[str, Any]]: Single and batch request bodies.
+    """
+    rng = np.random.default_rng(seed)
+    items = [
+        item.model_dump(mode='json') for item in build_items(load_listings())
+    ]
+    payloads = []
+    for _ in range(n_requests):
+        if rng.random() < batch_ratio:
+            rows = rng.integers(0, len(items), batch_size)
+            payloads.append({'data': [items[row] for row in rows]})
+        else:
+            payloads.append(items[rng.integers(0, len(items))])
+    return payloads
+
+
+def count_rows(payload: Dict[str, Any]) -> int:
+    return len(payload['data']) if 'data' in payload else 1
+
+
+async def run_load(
+        client: httpx.AsyncClient,
+        payloads: List[Dict[str, Any]],
+        concurrency: int,
+        rate: float = None,
+        duration: float = None
+) -> List[Dict[str, Any]]:
+    """
+    Send the payloads to ``/predict`` in order, cycling through them until
+    the duration is over or, without a duration, once.
+
+    ``concurrency`` workers send requests at the same time. With a rate, the
+    n-th request is scheduled at ``n / rate`` seconds and its latency counts
+    from that time, so delays of the generator when the API falls behind are
+    included instead of hidden.
+
+    Args:
+        client (httpx.AsyncClient): Client bound to the API.
+        payloads (List[Dict[str, Any]]): Request bodies.
+        concurrency (int): Maximum number of requests in flight.
+        rate (float): Requests per second, or None to send as fast as the
+        workers allow.
+        duration (float): Seconds to run for, or None to send every payload
+        once.
+
+    Returns:
+        List[Dict[str, Any]]: Completion time, latency, status code and rows
+        of every request. The status code is 0 if no response was received.
+    """
+    records = []
+    counter = iter(range(sys.maxsize if duration else len(payloads)))
+    start = time.perf_counter()
+
+    async def worker():
+        for i in counter:
+            scheduled = start + i / rate if rate else None
+            if scheduled is not None:
+                if duration and scheduled - start >= duration:
+                    return
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            sent = time.perf_counter()
+            if duration and sent - start >= duration:
+                return
+
+            payload = payloads[i % len(payloads)]
+            try:
+                response = await client.post('/predict', json=payload)
+                status = response.status_code
+            except Exception as e:
+                # Any failure, including an exception raised by the app
+                # through the ASGI transport, counts as an error and the
+                # worker keeps going
+                logging.debug(f"Request {i} failed: {e!r}")
+                status = 0
+            end = time.perf_counter()
+            records.append({
+                'time': end - start,
+                'latency': end - (scheduled or sent),
+                'status': status,
+                'rows': count_rows(payload),
+            })
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return records
+
+
+def summarize(records: List[Dict[str, Any]], elapsed: float) -> Dict:
+    """
+    Throughput, latency percentiles and error rate of a set of requests.
+    """
+    if not records:
+        return {'requests': 0}
+    latencies = np.array([record['latency'] for record in records]) * 1000
+    statuses = [record['status'] for record in records]
+    errors = sum(status != 200 for status in statuses)
+    summary = {
+        'requests': len(records),
+        'requests_per_second': len(records) / elapsed,
+        'rows_per_second': sum(record['rows'] for record in records) / elapsed,
+        'error_rate': errors / len(records),
+        'statuses': {
+            str(status): statuses.count(status) for status in set(statuses)
+        },
+    }
+    for percentile in PERCENTILES:
+        summary[f'p{percentile}_ms'] = float(
+            np.percentile(latencies, percentile)
+        )
+    summary['max_ms'] = float(latencies.max())
+    return summary
+
+
+def build_report(records: List[Dict[str, Any]], interval: float) -> Dict:
+    """
+    Summary of the whole run and of every interval of it, by completion time.
+    """
+    elapsed = max((record['time'] for record in records), default=0.0)
+    n_intervals = int(np.ceil(elapsed / interval)) or 1
+    windows = [[] for _ in range(n_intervals)]
+    for record in records:
+        windows[min(int(record['time'] // interval), n_intervals - 1)].append(
+            record
+        )
+    timeline = []
+    for i, window in enumerate(windows):
+        length = min(interval, elapsed - i * interval) or interval
+        timeline.append({'start': i * interval, **summarize(window, length)})
+    return {'total': summarize(records, elapsed or 1.0), 'timeline': timeline}
+
+
+def check_error_rate(report: Dict, max_error_rate: float) -> int:
+    """
+    Exit code of the run: 1 if the error rate is above the maximum or no
+    request completed, 0 otherwise.
+    """
+    error_rate = report['total'].get('error_rate', 1.0)
+    if error_rate > max_error_rate:
+        print(f"Error rate {error_rate:.1%} above {max_error_rate:.1%}")
+        return 1
+    return 0
+
+
+def print_report(report: Dict) -> None:
+    print(f"{'window':>8} | {'req/s':>8} | {'rows/s':>9} | {'p50 ms':>8} | "
+          f"{'p95 ms':>8} | {'p99 ms':>8} | {'max ms':>8} | {'errors':>6}")
+    rows = [
+        (f"{window['start']:.0f}s", window)
+        for window in report['timeline']
+    ]
+    for label, stats in rows + [('total', report['total'])]:
+        if not stats['requests']:
+            print(f"{label:>8} | {'-':>8}")
+            continue
+        print(f"{label:>8} | {stats['requests_per_second']:>8.1f} | "
+              f"{stats['rows_per_second']:>9.0f} | {stats['p50_ms']:>8.2f} | "
+              f"{stats['p95_ms']:>8.2f} | {stats['p99_ms']:>8.2f} | "
+              f"{stats['max_ms']:>8.2f} | {stats['error_rate']:>6.1%}")
+
+
+async def run(args: argparse.Namespace, payloads: List[Dict]) -> Dict:
+    headers = {'X-API-Key': os.getenv('API_TOKEN', '')}
+    timeout = httpx.Timeout(args.timeout)
+    async with contextlib.AsyncExitStack() as stack:
+        if args.url:
+            client = httpx.AsyncClient(
+                base_url=args.url, headers=headers, timeout=timeout,
+                limits=httpx.Limits(max_connections=args.concurrency)
+            )
+        else:
+            # The ASGI transport does not run the lifespan of the app, so it
+            # is entered here and the load starts once the model is warm
+            import api
+
+            await stack.enter_async_context(
+                api.app.router.lifespan_context(api.app)
+            )
+            await api.app.state.warm_up_task
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api.app),
+                base_url='http://api', headers=headers, timeout=timeout
+            )
+
+        async with client:
+            records = await run_load(
+                client, payloads, args.concurrency, args.rate, args.duration
+            )
+    return build_report(records, args.interval)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Load test the /predict endpoint of the API."
+    )
+    parser.add_argument(
+        '--url',
+        help="Base URL of a running API, e.g. http://localhost:8000. The "
+             "app is driven in-process through ASGI if not given."
+    )
+    parser.add_argument(
+        '--payloads', type=Path,
+        help="JSONL file of request bodies to replay. Generated from the "
+             "clean listings if not given."
+    )
+    parser.add_argument('--save-payloads', type=Path)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--batch-ratio', type=float, default=0.1)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument(
+        '--rate', type=float, help="Requests per second; unlimited if not set."
+    )
+    parser.add_argument(
+        '--duration', type=float,
+        help="Seconds to replay the payloads for; each is sent once if not "
+             "set."
+    )
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--output', type=Path)
+    parser.add_argument(
+        '--max-error-rate', type=float, default=0.0,
+        help="Error rate above which the run fails."
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    if args.payloads is not None:
+        payloads = load_payloads(args.payloads)
+    else:
+        payloads = generate_payloads(
+            args.requests, args.batch_ratio, args.batch_size
+        )
+    if args.save_payloads is not None:
+        with open(args.save_payloads, 'w') as f:
+            f.writelines(json.dumps(payload) + '\n' for payload in payloads)
+
+    report = asyncio.run(run(args, payloads))
+    print_report(report)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+    return check_error_rate(report, args.max_error_rate)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
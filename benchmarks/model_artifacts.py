@@ -0,0 +1,82 @@
+import sys
+import time
+import logging
+import multiprocessing
+from pathlib import Path
+
+# Add the project root directory to PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.model.engine import ModelEngine  # noqa: E402
+
+ARTIFACTS = ['simple_classifier.pkl', 'simple_classifier.mmap']
+N_WORKERS = 4
+
+
+def read_memory():
+    """
+    Read the resident memory of the current process from /proc (Linux).
+
+    Returns:
+        Dict[str, float]: Total, private (anonymous) and file-backed resident
+        memory in MB. File-backed pages of a memory-mapped artifact are
+        shared between all the processes that map it.
+    """
+    fields = {}
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'RssAnon', 'RssFile'):
+                fields[key] = int(value.split()[0]) / 1024
+    return fields
+
+
+def load_worker(name, queue):
+    logging.disable(logging.INFO)
+    engine = ModelEngine()
+    before = read_memory()
+    start = time.perf_counter()
+    engine.load_model(name)
+    # Read every node array once so that all the pages are resident
+    for array in ('feature', 'threshold', 'children', 'value'):
+        getattr(engine.compiled_model, array).sum()
+    load_time = time.perf_counter() - start
+    after = read_memory()
+    queue.put({
+        'load_time': load_time,
+        'rss': after['VmRSS'] - before['VmRSS'],
+        'private': after['RssAnon'] - before['RssAnon'],
+        'shared': after['RssFile'] - before['RssFile'],
+    })
+
+
+def run_benchmark():
+    context = multiprocessing.get_context('spawn')
+    print(f"{'artifact':<26} | {'load time':>9} | {'RSS':>8} | "
+          f"{'private':>8} | {'file-backed':>11}")
+    for name in ARTIFACTS:
+        queue = context.Queue()
+        workers = [
+            context.Process(target=load_worker, args=(name, queue))
+            for _ in range(N_WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        mean = {
+            key: sum(result[key] for result in results) / N_WORKERS
+            for key in results[0]
+        }
+        print(f"{name:<26} | {mean['load_time']:>8.2f}s | "
+              f"{mean['rss']:>6.1f}MB | {mean['private']:>6.1f}MB | "
+              f"{mean['shared']:>9.1f}MB")
+    print(f"Averages over {N_WORKERS} concurrent workers; private memory is "
+          "paid by every worker, file-backed pages are shared.")
+
+
+if __name__ == '__main__':
+    run_benchmark()
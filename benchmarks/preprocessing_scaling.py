@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import logging
+import tempfile
+import pandas as pd
+from pathlib import Path
+
+# Add the project root directory to PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.data.data import Data, load_config  # noqa: E402
+
+WORKERS = [1, 2, 4, 8]
+SCALE = 10
+REPETITIONS = 3
+
+
+def build_enlarged_raw(data: Data, scale: int) -> pd.DataFrame:
+    """
+    Build a synthetic listings file ``scale`` times larger than the raw
+    data by repeating it.
+    """
+    raw = data.load_raw()
+    return pd.concat([raw] * scale, ignore_index=True)
+
+
+def run_benchmark():
+    logging.disable(logging.INFO)
+    data = Data(load_config())
+    pipeline = data.preprocessing_pipeline
+    raw = build_enlarged_raw(data, SCALE)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'listings.csv'
+        raw.to_csv(path, index=False)
+        size = path.stat().st_size / 1024 ** 2
+        print(f"Synthetic listings: {len(raw)} rows, {size:.0f} MB, "
+              f"{os.cpu_count()} CPUs")
+
+        expected = None
+        print(f"{'workers':>7} | {'clean':>8} | {'read + clean':>12} | "
+              f"{'speedup':>7}")
+        for n_workers in WORKERS:
+            clean_times, total_times = [], []
+            for _ in range(REPETITIONS):
+                start = time.perf_counter()
+                df = pd.read_csv(path)
+                read_time = time.perf_counter() - start
+                result = pipeline.clean_parallel(df, n_workers)
+                total_times.append(time.perf_counter() - start)
+                clean_times.append(total_times[-1] - read_time)
+
+            if expected is None:
+                expected = result
+                baseline = min(clean_times)
+            pd.testing.assert_frame_equal(result, expected)
+            print(f"{n_workers:>7} | {min(clean_times):>7.2f}s | "
+                  f"{min(total_times):>11.2f}s | "
+                  f"{baseline / min(clean_times):>6.2f}x")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,376 @@
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Set
+
+# Add the project root directory to PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.classes.controller import APIController  # noqa: E402
+from app.classes.data_types import InputData, BatchInputData, \
+    RoomType  # noqa: E402
+from app.utils import load_api_config  # noqa: E402
+from src.data.data import Data, load_config  # noqa: E402
+from src.model.engine import ModelEngine  # noqa: E402
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+# Maximum number of rows predicted per measurement, to bound the run time
+ROWS_PER_MEASUREMENT = 20000
+# Latency statistics compared against the baseline
+COMPARED_STATS = ['p50_ms', 'p99_ms']
+# Inference shortcuts of model.yaml that can be disabled
+SHORTCUTS = ['cache', 'lookup_table']
+
+
+def summarize(timings: List[float], batch_size: int) -> Dict[str, float]:
+    """
+    Latency statistics of a list of timings in seconds.
+    """
+    timings = np.asarray(timings) * 1000
+    return {
+        'n': len(timings),
+        'mean_ms': float(timings.mean()),
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'rows_per_second': float(batch_size / timings.mean() * 1000),
+    }
+
+
+def measure_allocations(call: Callable[[], Any]) -> Dict[str, float]:
+    """
+    Memory allocated by one call, measured with tracemalloc.
+    """
+    tracemalloc.start()
+    try:
+        call()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'peak_alloc_kb': peak / 1024, 'retained_kb': current / 1024}
+
+
+def disable_shortcuts(engine: ModelEngine, disabled: Set[str]) -> None:
+    """
+    Disable the prediction cache and/or the lookup table of a loaded engine,
+    so that every row is evaluated by the model.
+    """
+    if 'cache' in disabled:
+        engine.cache = None
+    if 'lookup_table' in disabled:
+        engine.lookup_config = {}
+        engine.lookup_table = None
+
+
+def load_listings() -> pd.DataFrame:
+    """
+    Clean listings whose features are accepted by the API.
+    """
+    data = Data(load_config()).load_clean().dropna(axis=0)
+    room_types = [room_type.value for room_type in RoomType]
+    return data[data['room_type'].isin(room_types)].reset_index(drop=True)
+
+
+def build_items(listings: pd.DataFrame) -> List[InputData]:
+    return [
+        InputData(
+            id=int(row.id),
+            neighbourhood=row.neighbourhood,
+            room_type=row.room_type,
+            accommodates=int(row.accommodates),
+            bathrooms=float(row.bathrooms),
+            bedrooms=int(row.bedrooms),
+            beds=int(row.beds),
+            tv=int(row.TV),
+            elevator=int(row.Elevator),
+            internet=int(row.Internet),
+            latitude=float(row.latitude),
+            longitude=float(row.longitude)
+        )
+        for row in listings.itertuples()
+    ]
+
+
+class EngineTarget:
+    """
+    Measures ``ModelEngine.predict`` on the model features, with the
+    inference configuration of ``model.yaml`` (engine, cache and lookup
+    table) minus the disabled shortcuts.
+    """
+
+    name = 'engine'
+
+    def __init__(
+            self,
+            model_name: str,
+            listings: pd.DataFrame,
+            disabled: Set[str] = frozenset()
+    ):
+        self.model_name = model_name
+        self.disabled = disabled
+        self.pipeline = Data(load_config()).get_preprocessing_pipeline()
+        self.engine = None
+        features = ModelEngine().get_features_names()
+        x = self.pipeline.map_categorical_features(listings.copy())
+        self.x = x[features].to_numpy(dtype=np.float64)
+
+    def start(self) -> None:
+        self.engine = ModelEngine()
+        self.engine.load_model(self.model_name)
+        disable_shortcuts(self.engine, self.disabled)
+
+    def batch(self, rows: np.ndarray) -> Any:
+        return self.x[rows]
+
+    def call(self, batch: Any) -> Callable[[], Any]:
+        return lambda: self.engine.predict(batch)
+
+    def stop(self) -> None:
+        self.engine = None
+
+
+class ControllerTarget:
+    """
+    Measures ``APIController.predict`` on validated input items, with the
+    API configuration (executor, batching) of ``api.yaml``.
+
+    The shortcuts are disabled in the engine of the controller; process
+    workers load their own engine and keep the ones of ``model.yaml``.
+    """
+
+    name = 'controller'
+
+    def __init__(
+            self,
+            model_name: str,
+            listings: pd.DataFrame,
+            disabled: Set[str] = frozenset()
+    ):
+        self.api_config = dict(load_api_config(), model_to_use=model_name)
+        self.disabled = disabled
+        executor_type = self.api_config.get('executor', {}).get('type')
+        if disabled and executor_type == 'process':
+            logging.warning(
+                "The process workers keep the cache and lookup table of "
+                "model.yaml"
+            )
+        self.items = build_items(listings)
+        self.loop = asyncio.new_event_loop()
+        self.controller = None
+
+    def start(self) -> None:
+        self.controller = APIController(self.api_config)
+        disable_shortcuts(self.controller.model, self.disabled)
+
+    def warm_up(self) -> None:
+        self.loop.run_until_complete(self.controller.warm_up())
+
+    def batch(self, rows: np.ndarray) -> Any:
+        if len(rows) == 1:
+            return self.items[rows[0]]
+        return BatchInputData(data=[self.items[row] for row in rows])
+
+    def call(self, batch: Any) -> Callable[[], Any]:
+        return lambda: self.loop.run_until_complete(
+            self.controller.predict(batch)
+        )
+
+    def stop(self) -> None:
+        self.loop.run_until_complete(self.controller.close())
+        self.controller = None
+
+
+def run_target(
+        target: Any,
+        batch_sizes: List[int],
+        n_rows: int,
+        seed: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Measure a target in cold and warm state at every batch size.
+
+    The cold measurement is the first call after loading the model; the
+    warm measurements follow the API warm-up. Every call predicts a
+    different random batch of listings. Results are labelled ``uncached``
+    if the target has shortcuts disabled and ``cached`` otherwise.
+    """
+    caches = 'uncached' if target.disabled else 'cached'
+    rng = np.random.default_rng(seed)
+    results = []
+    for batch_size in batch_sizes:
+        def new_batch():
+            return target.batch(rng.integers(0, n_rows, batch_size))
+
+        target.start()
+        batch = new_batch()
+        start = time.perf_counter()
+        target.call(batch)()
+        cold = summarize([time.perf_counter() - start], batch_size)
+        if hasattr(target, 'warm_up'):
+            target.warm_up()
+
+        repetitions = max(5, min(200, ROWS_PER_MEASUREMENT // batch_size))
+        timings = []
+        for _ in range(repetitions):
+            call = target.call(new_batch())
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+        warm = summarize(timings, batch_size)
+        warm.update(measure_allocations(target.call(new_batch())))
+        target.stop()
+
+        for state, stats in (('cold', cold), ('warm', warm)):
+            results.append({
+                'target': target.name,
+                'caches': caches,
+                'state': state,
+                'batch_size': batch_size,
+                **stats,
+            })
+            alloc = stats.get('peak_alloc_kb')
+            alloc = '-' if alloc is None else f'{alloc:.0f}'
+            print(f"{target.name:<10} | {caches:<8} | {state:<4} | "
+                  f"{batch_size:>6} | "
+                  f"{stats['mean_ms']:>9.2f} | {stats['p50_ms']:>9.2f} | "
+                  f"{stats['p99_ms']:>9.2f} | "
+                  f"{stats['rows_per_second']:>10.0f} | {alloc:>9}")
+    return results
+
+
+def compare(
+        results: List[Dict[str, Any]],
+        baseline: List[Dict[str, Any]],
+        tolerance: float
+) -> List[str]:
+    """
+    Find the latencies that regressed by more than the tolerance.
+
+    Only uncached results are compared: with the prediction cache or the
+    lookup table, latency depends on how many of the random rows repeat.
+    Results stored without a ``caches`` label were measured with the
+    configuration of ``model.yaml`` and count as cached.
+
+    Args:
+        results (List[Dict[str, Any]]): Current results.
+        baseline (List[Dict[str, Any]]): Stored results.
+        tolerance (float): Allowed relative increase, e.g. 0.25 for 25%.
+
+    Returns:
+        List[str]: Description of every regression.
+    """
+    def key(result):
+        return (
+            result['target'], result.get('caches', 'cached'),
+            result['state'], result['batch_size']
+        )
+
+    stored = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = stored.get(key(result))
+        # A single cold call is too noisy to compare
+        if (
+            reference is None or result['state'] == 'cold'
+            or result['caches'] != 'uncached'
+        ):
+            continue
+        for stat in COMPARED_STATS:
+            limit = reference[stat] * (1 + tolerance)
+            if result[stat] > limit:
+                regressions.append(
+                    f"{'/'.join(map(str, key(result)))} {stat}: "
+                    f"{result[stat]:.2f} > {limit:.2f} "
+                    f"(baseline {reference[stat]:.2f})"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark ModelEngine.predict and APIController.predict."
+    )
+    parser.add_argument('--model', default='simple_classifier.pkl')
+    parser.add_argument(
+        '--targets', nargs='+', default=['engine', 'controller'],
+        choices=['engine', 'controller']
+    )
+    parser.add_argument(
+        '--batch-sizes', nargs='+', type=int, default=BATCH_SIZES
+    )
+    parser.add_argument(
+        '--disable-cache', action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Disable the prediction cache in the uncached measurements."
+    )
+    parser.add_argument(
+        '--disable-lookup-table', action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Disable the lookup table in the uncached measurements."
+    )
+    parser.add_argument(
+        '--cached', action='store_true',
+        help="Also measure with the cache and lookup table of model.yaml. "
+             "These results are reported but not compared."
+    )
+    parser.add_argument(
+        '--output', type=Path, help="JSON file where results are saved."
+    )
+    parser.add_argument(
+        '--baseline', type=Path,
+        help="JSON results to compare against; regressions fail the run. "
+             "Latencies depend on the machine, so save them with --output "
+             "from the reference commit on the machine that runs the check."
+    )
+    parser.add_argument(
+        '--tolerance', type=float, default=0.25,
+        help="Allowed relative latency increase over the baseline."
+    )
+    args = parser.parse_args(argv)
+
+    listings = load_listings()
+    targets = {'engine': EngineTarget, 'controller': ControllerTarget}
+    disabled = {
+        shortcut for shortcut in SHORTCUTS
+        if getattr(args, f'disable_{shortcut}')
+    }
+    runs = [disabled]
+    if args.cached and disabled:
+        runs.append(set())
+
+    print(f"{'target':<10} | {'caches':<8} | {'state':<4} | {'batch':>6} | "
+          f"{'mean ms':>9} | {'p50 ms':>9} | {'p99 ms':>9} | {'rows/s':>10} | "
+          f"{'alloc KB':>9}")
+    results = []
+    for name in args.targets:
+        for run in runs:
+            target = targets[name](args.model, listings, run)
+            results += run_target(target, args.batch_sizes, len(listings))
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'model': args.model, 'results': results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions over {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import json
+import logging
+import numpy as np
+import pandas as pd
+from typing import Any, Iterable, List, Tuple
+
+
+def decode_token(token: str) -> str:
+    try:
+        return json.loads(f'"{token}"')
+    except json.JSONDecodeError:
+        return token
+
+
+def explode_amenities(
+        amenities: pd.Series
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    Split every amenity list into its tokens in a single vectorized pass.
+
+    The lists are JSON arrays of strings, as in the raw ``amenities``
+    column. They are split on the item separator and only the distinct
+    tokens are JSON-decoded.
+
+    Args:
+        amenities (pd.Series): Raw ``amenities`` column.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, List[str]]: Row position and token
+        code of every distinct (row, token) pair, and the token of every
+        code.
+    """
+    lists = pd.Series(amenities.to_numpy(), dtype=object)
+    lists = lists.where(lists.map(lambda value: isinstance(value, str)))
+    tokens = lists.str.strip().str.slice(2, -2).str.split('", "').explode()
+    tokens = tokens[tokens.notna() & (tokens != '')]
+    if tokens.empty:
+        return np.empty(0, np.int64), np.empty(0, np.int64), []
+
+    codes, uniques = pd.factorize(tokens)
+    decoded, codes_decoded = np.unique(
+        [decode_token(token) for token in uniques], return_inverse=True
+    )
+    codes = codes_decoded[codes]
+
+    # Drop repeated amenities of the same listing
+    rows = tokens.index.to_numpy(dtype=np.int64)
+    pairs = np.unique(rows * len(decoded) + codes)
+    return pairs // len(decoded), pairs % len(decoded), decoded.tolist()
+
+
+class AmenityEncoder:
+    """
+    Multi-hot encoder of the amenity lists.
+
+    The amenity lists are split into tokens once and the tokens are matched
+    exactly against the vocabulary, so ``TV`` does not match ``Cable TV``
+    and the cost does not grow with the size of the vocabulary.
+    """
+
+    def __init__(
+            self,
+            vocabulary: List[str] = None,
+            top_n: int = None,
+            sparse: bool = True
+    ):
+        """
+        Initialize the AmenityEncoder.
+
+        Args:
+            vocabulary (List[str]): Fixed amenities to encode, which ``fit``
+            keeps. If not given, the vocabulary is learnt by ``fit``.
+            top_n (int): Number of most frequent amenities kept by ``fit``
+            when the vocabulary is not fixed. All of them are kept if not
+            given.
+            sparse (bool): Whether ``transform`` returns a SciPy CSR matrix
+            instead of a dense array.
+        """
+        self.top_n = top_n
+        self.sparse = sparse
+        self.vocabulary = None
+        self.fixed_vocabulary = vocabulary is not None
+        if self.fixed_vocabulary:
+            self.set_vocabulary(vocabulary)
+
+    def set_vocabulary(self, vocabulary: Iterable[str]) -> None:
+        self.vocabulary = list(vocabulary)
+        self.index = {token: i for i, token in enumerate(self.vocabulary)}
+
+    def fit(self, amenities: pd.Series):
+        """
+        Learn the most frequent amenities, unless the vocabulary is fixed.
+
+        Args:
+            amenities (pd.Series): Raw ``amenities`` column.
+
+        Returns:
+            AmenityEncoder: The fitted encoder.
+        """
+        if self.fixed_vocabulary:
+            return self
+
+        _, codes, tokens = explode_amenities(amenities)
+        counts = np.bincount(codes, minlength=len(tokens))
+        # Sort by decreasing frequency and then by name to be deterministic
+        ranked = [tokens[i] for i in np.lexsort((tokens, -counts))]
+        self.set_vocabulary(ranked[:self.top_n])
+        logging.info(f"Amenity vocabulary with {len(self.vocabulary)} items")
+        return self
+
+    def transform(self, amenities: pd.Series) -> Any:
+        """
+        Encode the amenity lists.
+
+        Args:
+            amenities (pd.Series): Raw ``amenities`` column.
+
+        Returns:
+            Any: ``uint8`` matrix with one row per listing and one column per
+            amenity of the vocabulary, sparse or dense depending on
+            ``sparse``.
+
+        Raises:
+            ValueError: If the encoder has no vocabulary.
+        """
+        if self.vocabulary is None:
+            logging.error("Amenity encoder used before fitting")
+            raise ValueError("The amenity encoder has no vocabulary")
+
+        rows, codes, tokens = explode_amenities(amenities)
+        lookup = np.array(
+            [self.index.get(token, -1) for token in tokens], dtype=np.int32
+        )
+        columns = lookup[codes] if len(codes) else np.empty(0, np.int32)
+        known = columns >= 0
+        rows, columns = rows[known], columns[known]
+
+        # CSR order: by row and then by column
+        order = np.lexsort((columns, rows))
+        rows, indices = rows[order], columns[order]
+        shape = (len(amenities), len(self.vocabulary))
+        indptr = np.zeros(shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=shape[0]), out=indptr[1:])
+
+        if self.sparse:
+            from scipy.sparse import csr_matrix
+            data = np.ones(len(indices), dtype=np.uint8)
+            return csr_matrix((data, indices, indptr), shape=shape)
+
+        matrix = np.zeros(shape, dtype=np.uint8)
+        matrix[rows, indices] = 1
+        return matrix
+
+    def fit_transform(self, amenities: pd.Series) -> Any:
+        return self.fit(amenities).transform(amenities)
+
+    def get_feature_names(self) -> List[str]:
+        return [token.replace(' ', '_') for token in self.vocabulary]
@@ -0,0 +1,174 @@
+import os
+import json
+import yaml
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Bump when the cache layout or the meaning of the cleaning stages changes
+CACHE_VERSION = 1
+
+
+def compute_fingerprint(path: Path, config: Dict[str, Any]) -> str:
+    """
+    Compute the fingerprint of a clean dataset from its inputs.
+
+    Args:
+        path (Path): Raw data file.
+        config (Dict[str, Any]): Preprocessing configuration.
+
+    Returns:
+        str: SHA-256 of the cache version, the configuration and the content
+        of the raw file.
+    """
+    digest = hashlib.sha256()
+    digest.update(f'{CACHE_VERSION}\n'.encode())
+    digest.update(yaml.safe_dump(config, sort_keys=True).encode())
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parquet_available() -> bool:
+    for engine in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(engine)
+            return True
+        except ImportError:
+            pass
+    return False
+
+
+def save_npz(df: pd.DataFrame, path: Path) -> None:
+    """
+    Save a DataFrame as a ``.npz`` file of one array per column.
+
+    Categorical and object columns are stored as integer codes plus their
+    categories, so no array needs pickling.
+    """
+    arrays = {'index': df.index.to_numpy()}
+    columns = []
+    for i, (name, column) in enumerate(df.items()):
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            kind = 'category'
+            values = column.cat
+        elif column.dtype == object:
+            kind = 'object'
+            values = column.astype('category').cat
+        else:
+            kind = 'numeric'
+            arrays[f'column_{i}'] = column.to_numpy()
+
+        if kind != 'numeric':
+            arrays[f'column_{i}'] = values.codes.to_numpy()
+            categories = values.categories.to_numpy()
+            if categories.dtype == object:
+                categories = categories.astype(str)
+            arrays[f'categories_{i}'] = categories
+            if kind == 'category':
+                arrays[f'ordered_{i}'] = np.asarray(values.ordered)
+        columns.append({'name': name, 'kind': kind})
+
+    arrays['columns'] = np.asarray(json.dumps(columns))
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def load_npz(path: Path) -> pd.DataFrame:
+    """
+    Load a DataFrame saved with ``save_npz``.
+    """
+    with np.load(path) as data:
+        series = {}
+        for i, column in enumerate(json.loads(str(data['columns']))):
+            values = data[f'column_{i}']
+            if column['kind'] != 'numeric':
+                values = pd.Categorical.from_codes(
+                    values,
+                    data[f'categories_{i}'],
+                    ordered=bool(data.get(f'ordered_{i}', False))
+                )
+                if column['kind'] == 'object':
+                    values = np.asarray(values, dtype=object)
+            series[column['name']] = values
+        return pd.DataFrame(series, index=data['index'])
+
+
+class CleanDataCache:
+    """
+    On-disk cache of the clean dataset, keyed by the fingerprint of the raw
+    file and the preprocessing configuration.
+
+    The frame is stored as Parquet when a Parquet engine is installed and as
+    ``.npz`` otherwise. Entries with another fingerprint are removed when a
+    new one is saved.
+    """
+
+    def __init__(self, directory: Path, file_format: str = 'auto'):
+        """
+        Initialize the CleanDataCache.
+
+        Args:
+            directory (Path): Folder of the cache files.
+            file_format (str): ``parquet``, ``npz`` or ``auto`` to use
+            Parquet when available.
+
+        Raises:
+            ValueError: If the format is not supported.
+        """
+        if file_format == 'auto':
+            file_format = 'parquet' if parquet_available() else 'npz'
+        if file_format not in ('parquet', 'npz'):
+            logging.error(f"Cache format {file_format} not supported")
+            raise ValueError(f'Cache format {file_format} not supported')
+
+        self.directory = Path(directory)
+        self.file_format = file_format
+
+    def get_path(self, fingerprint: str) -> Path:
+        return self.directory / f'clean_{fingerprint}.{self.file_format}'
+
+    def load(self, fingerprint: str) -> Optional[pd.DataFrame]:
+        """
+        Load the clean dataset with the given fingerprint.
+
+        Returns:
+            Optional[pd.DataFrame]: Cached DataFrame, or None on a miss.
+        """
+        path = self.get_path(fingerprint)
+        if not path.exists():
+            return None
+
+        try:
+            if self.file_format == 'parquet':
+                df = pd.read_parquet(path)
+            else:
+                df = load_npz(path)
+        except Exception as e:
+            logging.warning(f"Could not read the clean data cache {path}: {e}")
+            return None
+
+        logging.info(f"Clean data loaded from cache {path}")
+        return df
+
+    def save(self, df: pd.DataFrame, fingerprint: str) -> None:
+        """
+        Atomically save the clean dataset and remove stale entries.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.get_path(fingerprint)
+        tmp_path = path.with_name(path.name + '.tmp')
+        if self.file_format == 'parquet':
+            df.to_parquet(tmp_path)
+        else:
+            save_npz(df, tmp_path)
+        os.replace(tmp_path, path)
+
+        for stale in self.directory.glob('clean_*'):
+            if stale != path:
+                stale.unlink()
+        logging.info(f"Clean data saved to cache {path}")
@@ -1,11 +1,16 @@
 import yaml
 import logging
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 
 
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Tuple
+
+from src.data.amenities import AmenityEncoder
+from src.data.cache import CleanDataCache, compute_fingerprint
+from src.data.profiling import columns_memory, profile_stages
 
 
 def load_config() -> Dict[str, Any]:
@@ -57,6 +62,10 @@ class PreprocessingPipeline:
         self.bins_names = self.config['bins_names']
 
         self.amenities_to_drop = self.config['amenities_to_drop']
+        self.amenities_encoding = self.config.get('amenities_encoding', {})
+
+        self.dtype_plan = dict(self.config.get('dtype_plan', {}))
+        self.amenity_flags_dtype = self.dtype_plan.pop('amenity_flags', int)
 
         categorical_mapping = self.config['categorical_mapping']
 
@@ -98,6 +107,73 @@ class PreprocessingPipeline:
     def drop_nans(self, df: pd.DataFrame) -> pd.DataFrame:
         return df.dropna(axis=0)
 
+    def apply_dtype_plan(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Cast the columns of the DataFrame to the compact dtypes of
+        ``dtype_plan``.
+
+        Columns that are not in the DataFrame are ignored. A column is left
+        unchanged if it cannot be represented exactly with its integer
+        dtype.
+
+        Args:
+            df (pd.DataFrame): Input DataFrame.
+
+        Returns:
+            pd.DataFrame: DataFrame with compact dtypes.
+        """
+        dtypes = {}
+        for column, dtype in self.dtype_plan.items():
+            if column not in df.columns or df[column].dtype == dtype:
+                continue
+            if dtype != 'category' and np.dtype(dtype).kind in 'iu':
+                values = df[column]
+                # Text columns are cast once they have been parsed
+                if not pd.api.types.is_numeric_dtype(values):
+                    continue
+                info = np.iinfo(dtype)
+                if (
+                    values.isna().any()
+                    or (values % 1 != 0).any()
+                    or values.min() < info.min
+                    or values.max() > info.max
+                ):
+                    logging.warning(
+                        f"Column {column} does not fit in {dtype}, keeping "
+                        f"{values.dtype}"
+                    )
+                    continue
+            dtypes[column] = dtype
+        return df.astype(dtypes)
+
+    def concat_chunks(self, chunks: List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Concatenate clean chunks, merging the categories of the categorical
+        columns so that they keep their dtype.
+
+        Args:
+            chunks (List[pd.DataFrame]): Clean chunks, in order.
+
+        Returns:
+            pd.DataFrame: Concatenated DataFrame.
+        """
+        chunks = list(chunks)
+        for column, dtype in chunks[0].dtypes.items():
+            if not isinstance(dtype, pd.CategoricalDtype) or all(
+                chunk[column].dtype == dtype for chunk in chunks
+            ):
+                continue
+            categories = pd.api.types.union_categoricals(
+                [chunk[column] for chunk in chunks], sort_categories=True
+            ).categories
+            chunks = [
+                chunk.assign(
+                    **{column: chunk[column].cat.set_categories(categories)}
+                )
+                for chunk in chunks
+            ]
+        return pd.concat(chunks)
+
     def clean_target(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Clean and convert the 'price' column to the specified data type.
@@ -163,11 +239,42 @@ class PreprocessingPipeline:
         for amenity in self.amenities_to_drop:
             amenity_name = amenity.replace(' ', '_')
             check = df['amenities'].str.contains(amenity)
-            df[amenity_name] = check.astype(int)
+            df[amenity_name] = check.astype(self.amenity_flags_dtype)
 
         df = df.drop(columns=['amenities'])
         return df
 
+    def get_amenity_encoder(self) -> AmenityEncoder:
+        """
+        Build the multi-hot amenity encoder configured under
+        ``amenities_encoding``.
+        """
+        return AmenityEncoder(
+            vocabulary=self.amenities_encoding.get('vocabulary'),
+            top_n=self.amenities_encoding.get('top_n'),
+            sparse=self.amenities_encoding.get('sparse', True)
+        )
+
+    def encode_amenities(
+            self,
+            df: pd.DataFrame,
+            encoder: AmenityEncoder = None
+    ) -> Any:
+        """
+        Encode the 'amenities' column as a multi-hot matrix in a single pass.
+
+        Args:
+            df (pd.DataFrame): DataFrame with the raw 'amenities' column.
+            encoder (AmenityEncoder): Fitted encoder. If not given, a new one
+            is built from the configuration and fitted on ``df``.
+
+        Returns:
+            Any: Matrix aligned with the rows of ``df``.
+        """
+        if encoder is None:
+            encoder = self.get_amenity_encoder().fit(df['amenities'])
+        return encoder.transform(df['amenities'])
+
     def clean(
             self,
             df: pd.DataFrame,
@@ -175,21 +282,195 @@ class PreprocessingPipeline:
     ) -> pd.DataFrame:
 
         logging.info("Starting data cleaning process")
-        df = self.num_bathroom_from_text(df)
-        df = self.select_columns(df)
-        df = self.rename_columns(df)
-        df = self.drop_nans(df)
-        df = self.clean_target(df)
-        df = self.filter_price(df)
-        df = self.categorize_price(df)
-        df = self.preprocess_amenities(df)
+        if not logging.getLogger().isEnabledFor(logging.DEBUG):
+            df = self.clean_chunk(df, map_categorical_features)
+            logging.info("Data cleaning process completed")
+            return df
+
+        # Deep memory measurements are slow on the text columns, so the
+        # saving of the dtype plan is only reported at debug level
+        saved = 0
+        for name, stage in self.get_stages(map_categorical_features):
+            if stage != self.apply_dtype_plan:
+                df = stage(df)
+                continue
+            # Footprint of the columns the plan casts, right before and
+            # after the cast
+            columns = [
+                column for column in self.dtype_plan if column in df.columns
+            ]
+            memory_before = columns_memory(df, columns)
+            df = stage(df)
+            memory_after = columns_memory(df, columns)
+            logging.debug(
+                f"Stage {name}: {memory_before / 1024 ** 2:.1f} MB -> "
+                f"{memory_after / 1024 ** 2:.1f} MB"
+            )
+            saved += memory_before - memory_after
+        logging.info(
+            "Data cleaning process completed: the dtype plan saved "
+            f"{saved / 1024 ** 2:.1f} MB"
+        )
+        return df
 
-        if map_categorical_features:
-            df = self.map_categorical_features(df)
+    def clean_chunk(
+            self,
+            df: pd.DataFrame,
+            map_categorical_features: bool = False
+    ) -> pd.DataFrame:
+        """
+        Run every cleaning stage on a DataFrame. All the stages are
+        row-local, so they can be applied to any partition of the raw data.
 
-        logging.info("Data cleaning process completed")
+        Args:
+            df (pd.DataFrame): Raw DataFrame or chunk of it.
+            map_categorical_features (bool): Whether to map features.
+
+        Returns:
+            pd.DataFrame: Clean DataFrame.
+        """
+        for _, stage in self.get_stages(map_categorical_features):
+            df = stage(df)
         return df
 
+    def get_stages(
+            self,
+            map_categorical_features: bool = False
+    ) -> List[Tuple[str, Callable[[pd.DataFrame], pd.DataFrame]]]:
+        """
+        Name and method of every cleaning stage, in order.
+
+        Args:
+            map_categorical_features (bool): Whether to map features.
+
+        Returns:
+            List[Tuple[str, Callable]]: Stages of ``clean_chunk``.
+        """
+        stages = [
+            ('num_bathroom_from_text', self.num_bathroom_from_text),
+            ('select_columns', self.select_columns),
+            ('rename_columns', self.rename_columns),
+            ('drop_nans', self.drop_nans),
+            ('apply_dtype_plan', self.apply_dtype_plan),
+            ('clean_target', self.clean_target),
+            ('filter_price', self.filter_price),
+            ('categorize_price', self.categorize_price),
+            ('preprocess_amenities', self.preprocess_amenities),
+            ('apply_final_dtype_plan', self.apply_dtype_plan),
+        ]
+        if map_categorical_features:
+            stages.append(
+                ('map_categorical_features', self.map_categorical_features)
+            )
+        return stages
+
+    def profile(
+            self,
+            df: pd.DataFrame,
+            map_categorical_features: bool = False,
+            trace_memory: bool = False
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Clean a DataFrame measuring the wall time, rows and memory of the
+        frame before and after every stage.
+
+        Args:
+            df (pd.DataFrame): Raw DataFrame.
+            map_categorical_features (bool): Whether to map features.
+            trace_memory (bool): Whether to also trace the peak memory
+            allocated by every stage with tracemalloc.
+
+        Returns:
+            Tuple[pd.DataFrame, Dict[str, Any]]: Clean DataFrame, identical
+            to the output of ``clean``, and the profiling report.
+        """
+        df, report = profile_stages(
+            df, self.get_stages(map_categorical_features), trace_memory
+        )
+        for result in report['stages']:
+            logging.info(
+                f"Stage {result['stage']}: {result['seconds']:.3f} s, "
+                f"{result['rows_in']} -> {result['rows_out']} rows"
+            )
+        return df, report
+
+    def clean_parallel(
+            self,
+            df: pd.DataFrame,
+            n_workers: int,
+            map_categorical_features: bool = False
+    ) -> pd.DataFrame:
+        """
+        Clean a DataFrame on a pool of processes.
+
+        The DataFrame is split into one contiguous partition per worker.
+        Every partition is cleaned independently, which is valid because all
+        the stages are row-local and the price bins have fixed edges. The
+        results are concatenated in partition order, so the output is
+        identical to ``clean``.
+
+        Args:
+            df (pd.DataFrame): Raw DataFrame.
+            n_workers (int): Number of worker processes.
+            map_categorical_features (bool): Whether to map features.
+
+        Returns:
+            pd.DataFrame: Clean DataFrame.
+        """
+        if n_workers <= 1 or len(df) < n_workers:
+            return self.clean(df, map_categorical_features)
+
+        logging.info(
+            f"Starting parallel data cleaning process with {n_workers} "
+            "workers"
+        )
+        bounds = np.linspace(0, len(df), n_workers + 1).astype(int)
+        partitions = [
+            df.iloc[start:end] for start, end in zip(bounds, bounds[1:])
+        ]
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            chunks = list(pool.map(
+                self.clean_chunk,
+                partitions,
+                [map_categorical_features] * n_workers
+            ))
+        logging.info("Parallel data cleaning process completed")
+        return self.concat_chunks(chunks)
+
+    def clean_chunks(
+            self,
+            chunks: Iterable[pd.DataFrame],
+            map_categorical_features: bool = False
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Clean raw data chunk by chunk, keeping only one chunk in memory.
+
+        Concatenating the yielded chunks with ``concat_chunks`` gives the
+        same DataFrame as ``clean`` on the whole raw data. ``pd.concat`` is
+        not enough: the categorical columns of every chunk only have the
+        categories of that chunk, and would fall back to ``object``.
+        A single chunk may have an integer dtype where the whole DataFrame
+        has a float one, if the missing values of that column fall in other
+        chunks.
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): Chunks of the raw data.
+            map_categorical_features (bool): Whether to map features.
+
+        Yields:
+            pd.DataFrame: Non-empty clean chunks.
+        """
+        logging.info("Starting chunked data cleaning process")
+        n_rows = 0
+        for chunk in chunks:
+            chunk = self.clean_chunk(chunk, map_categorical_features)
+            if len(chunk):
+                n_rows += len(chunk)
+                yield chunk
+        logging.info(
+            f"Chunked data cleaning process completed: {n_rows} rows"
+        )
+
     def map_categorical_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Map categorical features to numeric values.
@@ -200,8 +481,12 @@ class PreprocessingPipeline:
         Returns:
             pd.DataFrame: DataFrame with mapped categorical features.
         """
-        df['room_type'] = df['room_type'].map(self.mapping_room_type)
-        df['neighbourhood'] = df['neighbourhood'].map(
+        # Map the values and not the categories of categorical columns, so
+        # that the codes get the same dtype either way
+        df['room_type'] = df['room_type'].astype(object).map(
+            self.mapping_room_type
+        )
+        df['neighbourhood'] = df['neighbourhood'].astype(object).map(
             self.mapping_neighbourhood
         )
         return df
@@ -222,26 +507,110 @@ class Data:
         self.base_path = Path(__file__).parent.parent.parent
         self.path_raw = self.base_path / config['paths']['raw']
         self.path_clean = self.base_path / config['paths']['clean']
+        self.chunk_size = config.get('chunk_size', 10000)
+        self.n_workers = config.get('n_workers', 1)
         self.preprocessing_pipeline = PreprocessingPipeline(config)
 
+        cache_config = config.get('cache', {})
+        self.cache = None
+        if cache_config.get('enabled', False):
+            self.cache = CleanDataCache(
+                self.base_path / cache_config['dir'],
+                cache_config.get('format', 'auto')
+            )
+
     def load_raw(self) -> pd.DataFrame:
         return pd.read_csv(self.path_raw)
 
+    def get_fingerprint(self) -> str:
+        return compute_fingerprint(
+            self.path_raw, self.preprocessing_pipeline.config
+        )
+
     def load_clean(
             self,
-            map_categorical_features: bool = False
+            map_categorical_features: bool = False,
+            use_cache: bool = True
     ) -> pd.DataFrame:
         """
         Load and clean the data.
 
+        If the cache is enabled, the clean data is read from it when the raw
+        file and the preprocessing configuration have not changed, and saved
+        to it otherwise.
+
         Args:
             map_categorical_features (bool): Whether to map features.
+            use_cache (bool): Whether to use the clean data cache.
 
         Returns:
             pd.DataFrame: DataFrame with clean and processed data.
         """
-        df = pd.read_csv(self.path_raw)
-        return self.preprocessing_pipeline.clean(df, map_categorical_features)
+        if self.cache is None or not use_cache:
+            return self.preprocessing_pipeline.clean_parallel(
+                self.load_raw(), self.n_workers, map_categorical_features
+            )
+
+        fingerprint = self.get_fingerprint()
+        df = self.cache.load(fingerprint)
+        if df is None:
+            df = self.preprocessing_pipeline.clean_parallel(
+                self.load_raw(), self.n_workers
+            )
+            self.cache.save(df, fingerprint)
+
+        if map_categorical_features:
+            df = self.preprocessing_pipeline.map_categorical_features(df)
+        return df
+
+    def load_raw_chunks(
+            self,
+            chunk_size: int = None
+    ) -> Iterator[pd.DataFrame]:
+        return pd.read_csv(
+            self.path_raw, chunksize=chunk_size or self.chunk_size
+        )
+
+    def load_clean_chunks(
+            self,
+            map_categorical_features: bool = False,
+            chunk_size: int = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Load and clean the data in chunks, with peak memory proportional to
+        the chunk size instead of the size of the raw file.
+
+        Args:
+            map_categorical_features (bool): Whether to map features.
+            chunk_size (int): Number of raw rows per chunk. Defaults to
+            ``chunk_size`` in the configuration.
+
+        Yields:
+            pd.DataFrame: Clean chunks.
+        """
+        return self.preprocessing_pipeline.clean_chunks(
+            self.load_raw_chunks(chunk_size), map_categorical_features
+        )
+
+    def save_clean(self, path: Path, chunk_size: int = None) -> int:
+        """
+        Clean the raw data chunk by chunk and append every clean chunk to a
+        CSV file.
+
+        Args:
+            path (Path): Destination CSV file.
+            chunk_size (int): Number of raw rows per chunk. Defaults to
+            ``chunk_size`` in the configuration.
+
+        Returns:
+            int: Number of clean rows written.
+        """
+        n_rows = 0
+        for chunk in self.load_clean_chunks(chunk_size=chunk_size):
+            chunk.to_csv(path, mode='a' if n_rows else 'w', header=not n_rows)
+            n_rows += len(chunk)
+        logging.info(f"Saved {n_rows} clean rows to {path}")
+        return n_rows
 
     def get_preprocessing_pipeline(self):
         return self.preprocessing_pipeline
@@ -0,0 +1,152 @@
+import sys
+import json
+import time
+import logging
+import argparse
+import tracemalloc
+import pandas as pd
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def columns_memory(df: pd.DataFrame, columns: List[str]) -> int:
+    return int(df[columns].memory_usage(deep=True, index=False).sum())
+
+
+def profile_stages(
+        df: pd.DataFrame,
+        stages: List[Tuple[str, Callable[[pd.DataFrame], pd.DataFrame]]],
+        trace_memory: bool = False
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Run a sequence of DataFrame stages, measuring every one of them.
+
+    Args:
+        df (pd.DataFrame): Input of the first stage.
+        stages (List[Tuple[str, Callable]]): Name and function of every
+        stage, in order.
+        trace_memory (bool): Whether to trace the peak memory allocated by
+        every stage with tracemalloc. Tracing slows the stages down, so their
+        wall times are then only comparable with each other.
+
+    Returns:
+        Tuple[pd.DataFrame, Dict[str, Any]]: Output of the last stage and
+        the report, with the wall time, rows and memory of the frame before
+        and after every stage, and their totals.
+    """
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+
+    report = {'stages': []}
+    rows_in, memory_in = len(df), frame_memory(df)
+    try:
+        for name, stage in stages:
+            if trace_memory:
+                tracemalloc.reset_peak()
+                traced_before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            df = stage(df)
+            elapsed = time.perf_counter() - start
+
+            result = {
+                'stage': name,
+                'seconds': elapsed,
+                'rows_in': rows_in,
+                'rows_out': len(df),
+                'memory_in': memory_in,
+                'memory_out': frame_memory(df),
+            }
+            if trace_memory:
+                result['peak_allocated'] = (
+                    tracemalloc.get_traced_memory()[1] - traced_before
+                )
+            report['stages'].append(result)
+            rows_in, memory_in = result['rows_out'], result['memory_out']
+    finally:
+        if tracing:
+            tracemalloc.stop()
+
+    stages_report = report['stages']
+    report['total'] = {
+        'seconds': sum(result['seconds'] for result in stages_report),
+        'rows_in': stages_report[0]['rows_in'] if stages_report else len(df),
+        'rows_out': len(df),
+        'memory_in': (
+            stages_report[0]['memory_in'] if stages_report else memory_in
+        ),
+        'memory_out': memory_in,
+    }
+    if trace_memory:
+        report['total']['peak_allocated'] = max(
+            (result['peak_allocated'] for result in stages_report), default=0
+        )
+    return df, report
+
+
+def save_report(report: Dict[str, Any], path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logging.info(f"Profiling report saved to {path}")
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Render a profiling report as a table, one line per stage.
+    """
+    traced = 'peak_allocated' in report['total']
+    header = (
+        f"{'stage':<24} | {'seconds':>8} | {'share':>6} | {'rows in':>8} | "
+        f"{'rows out':>8} | {'MB in':>7} | {'MB out':>7}"
+    )
+    if traced:
+        header += f" | {'peak MB':>7}"
+    lines = [header]
+    total_seconds = report['total']['seconds'] or 1.0
+    for result in report['stages'] + [dict(report['total'], stage='total')]:
+        line = (
+            f"{result['stage']:<24} | {result['seconds']:>8.3f} | "
+            f"{result['seconds'] / total_seconds:>6.1%} | "
+            f"{result['rows_in']:>8} | {result['rows_out']:>8} | "
+            f"{result['memory_in'] / 1024 ** 2:>7.1f} | "
+            f"{result['memory_out'] / 1024 ** 2:>7.1f}"
+        )
+        if traced:
+            line += f" | {result['peak_allocated'] / 1024 ** 2:>7.1f}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    from src.data.data import Data, load_config
+
+    parser = argparse.ArgumentParser(
+        description="Profile every stage of the preprocessing pipeline."
+    )
+    parser.add_argument(
+        '--output', type=Path, help="JSON file where the report is saved."
+    )
+    parser.add_argument(
+        '--trace-memory', action='store_true',
+        help="Trace the peak allocation of every stage with tracemalloc."
+    )
+    parser.add_argument('--map-categorical-features', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    data = Data(load_config())
+    _, report = data.preprocessing_pipeline.profile(
+        data.load_raw(),
+        map_categorical_features=args.map_categorical_features,
+        trace_memory=args.trace_memory
+    )
+    print(format_report(report))
+    if args.output is not None:
+        save_report(report, args.output)
+    sys.exit(0)
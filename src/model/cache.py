@@ -0,0 +1,99 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class PredictionCache:
+    """
+    Size-bounded LRU cache of predictions with optional time to live.
+
+    Keys are the encoded feature tuples given to the model, so different
+    listings that share the same features reuse the same prediction.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = None):
+        """
+        Initialize the PredictionCache class.
+
+        Args:
+            max_size (int): Maximum number of cached predictions.
+            ttl (Optional[float]): Seconds after which an entry expires. If
+            None, entries only leave the cache when evicted.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(
+            self,
+            keys: List[Hashable]
+    ) -> Tuple[Dict[int, Any], List[int]]:
+        """
+        Look up several keys at once.
+
+        Args:
+            keys (List[Hashable]): Keys to look up.
+
+        Returns:
+            Tuple[Dict[int, Any], List[int]]: Cached values by position of
+            their key, and positions of the keys that were not found.
+        """
+        found, missing = {}, []
+        now = time.monotonic()
+        with self.lock:
+            for i, key in enumerate(keys):
+                entry = self.entries.get(key)
+                if entry is not None and (
+                        entry[1] is None or entry[1] > now):
+                    self.entries.move_to_end(key)
+                    found[i] = entry[0]
+                else:
+                    if entry is not None:
+                        del self.entries[key]
+                    missing.append(i)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put_many(self, keys: List[Hashable], values: List[Any]) -> None:
+        """
+        Store several values, evicting the least recently used entries if
+        the cache is full.
+
+        Args:
+            keys (List[Hashable]): Keys of the values.
+            values (List[Any]): Values to store.
+        """
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self.lock:
+            for key, value in zip(keys, values):
+                self.entries[key] = (value, expires)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Remove all the entries, e.g. when the model changes.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Hit, miss and eviction counters and current size.
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.entries),
+            }
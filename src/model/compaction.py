@@ -0,0 +1,251 @@
+import sys
+import time
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from src.model.compiled import CompiledForest
+from src.model.engine import select_rows
+
+
+def score(proba: np.ndarray, y: np.ndarray, classes: np.ndarray) -> Dict:
+    """
+    Accuracy and ROC AUC of class probabilities, as in ``ModelEngine.test``.
+    """
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    return {
+        'accuracy': accuracy_score(y, classes[np.argmax(proba, axis=1)]),
+        'roc_auc': roc_auc_score(y, proba, multi_class='ovr'),
+    }
+
+
+def tree_probabilities(forest: CompiledForest, x: Any) -> np.ndarray:
+    """
+    Class probabilities of every tree of the forest.
+
+    Returns:
+        np.ndarray: Array of shape (n_trees, n_rows, n_classes).
+    """
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    return forest.value.take(forest.apply(x), axis=0)
+
+
+def select_trees(
+        probabilities: np.ndarray,
+        y: np.ndarray,
+        classes: np.ndarray,
+        target: Dict[str, float],
+        validation: Tuple[np.ndarray, np.ndarray, Dict[str, float]]
+) -> Tuple[List[int], Dict[str, float]]:
+    """
+    Greedily select trees until the ensemble reaches the target scores on
+    both the selection and the validation rows.
+
+    At every step the tree that most reduces the log loss of the ensemble on
+    the selection rows is added; the log loss of every candidate is
+    evaluated at once.
+
+    Args:
+        probabilities (np.ndarray): Class probabilities of every tree on the
+        selection rows.
+        y (np.ndarray): Labels of the selection rows.
+        classes (np.ndarray): Class labels of the forest.
+        target (Dict[str, float]): Minimum accuracy and ROC AUC on the
+        selection rows.
+        validation (Tuple[np.ndarray, np.ndarray, Dict[str, float]]): Tree
+        probabilities, labels and target scores of the validation rows.
+
+    Returns:
+        Tuple[List[int], Dict[str, float]]: Selected trees, in selection
+        order, and their scores on the validation rows.
+    """
+    probabilities_val, y_val, target_val = validation
+    n_trees, n_rows, _ = probabilities.shape
+    label = np.searchsorted(classes, y)
+    # Probability that every tree assigns to the true class of every row
+    true_class = probabilities[:, np.arange(n_rows), label]
+
+    selected = []
+    available = np.ones(n_trees, dtype=bool)
+    total = np.zeros(n_rows)
+    while available.any():
+        mean = (total[np.newaxis, :] + true_class) / (len(selected) + 1)
+        log_loss = -np.log(np.maximum(mean, 1e-15)).mean(axis=1)
+        log_loss[~available] = np.inf
+        tree = int(np.argmin(log_loss))
+
+        selected.append(tree)
+        available[tree] = False
+        total += true_class[tree]
+        scores = score(probabilities[selected].mean(axis=0), y, classes)
+        if reaches(scores, target) and reaches(
+            score(probabilities_val[selected].mean(axis=0), y_val, classes),
+            target_val
+        ):
+            break
+    return selected, score(
+        probabilities_val[selected].mean(axis=0), y_val, classes
+    )
+
+
+def reaches(scores: Dict[str, float], target: Dict[str, float]) -> bool:
+    return all(scores[name] >= target[name] for name in target)
+
+
+def measure_latency(
+        forest: CompiledForest,
+        x: np.ndarray,
+        repetitions: int = 200
+) -> float:
+    """
+    99th percentile latency, in milliseconds, of single-row predictions.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    timings = []
+    for i in range(repetitions):
+        row = x[i % len(x)][np.newaxis, :]
+        start = time.perf_counter()
+        forest.predict(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.percentile(timings, 99) * 1000)
+
+
+def artifact_size(path: Path) -> int:
+    path = Path(path)
+    if path.is_dir():
+        return sum(file.stat().st_size for file in path.iterdir())
+    return path.stat().st_size
+
+
+def compact(
+        engine: Any,
+        x: Any,
+        y: Any,
+        accuracy_tolerance: float = 0.005,
+        auc_tolerance: float = 0.005,
+        max_depth: int = None
+) -> Tuple[CompiledForest, Dict[str, Any]]:
+    """
+    Find the smallest subset of the trees of the loaded model whose scores
+    on a held-out set stay within the tolerances of the full model.
+
+    Args:
+        engine (Any): ``ModelEngine`` with the model loaded.
+        x (Any): Held-out features.
+        y (Any): Held-out labels.
+        accuracy_tolerance (float): Maximum loss of accuracy.
+        auc_tolerance (float): Maximum loss of ROC AUC.
+        max_depth (int): Maximum depth of the selected trees, or None to
+        keep them whole.
+
+    Returns:
+        Tuple[CompiledForest, Dict[str, Any]]: The compact forest and the
+        scores before and after on the validation half of the held-out set.
+    """
+    forest = engine.compiled_model or CompiledForest.from_sklearn(
+        engine.model, chunk_size=engine.chunk_size
+    )
+    x_test = x
+    x = np.asarray(x, dtype=np.float32)
+    y = np.asarray(y)
+
+    # Trees are selected on half of the rows and the tolerances are also
+    # checked on the other half, so that the selection does not overfit
+    rows = np.random.default_rng(engine.seed).permutation(len(y))
+    halves = np.array_split(rows, 2)
+    baseline = [
+        engine.test(select_rows(x_test, half), y[half]) for half in halves
+    ]
+    targets = [
+        {
+            'accuracy': scores['accuracy'] - accuracy_tolerance,
+            'roc_auc': scores['roc_auc'] - auc_tolerance,
+        }
+        for scores in baseline
+    ]
+
+    if max_depth is not None:
+        forest = forest.subset(range(forest.n_estimators), max_depth)
+    probabilities = [tree_probabilities(forest, x[half]) for half in halves]
+    trees, scores = select_trees(
+        probabilities[0],
+        y[halves[0]],
+        forest.classes_,
+        targets[0],
+        validation=(probabilities[1], y[halves[1]], targets[1])
+    )
+    if not reaches(scores, targets[1]):
+        logging.warning(
+            f"The forest cut at depth {max_depth} does not reach the "
+            f"target scores {targets[1]}"
+        )
+
+    compact_forest = forest.subset(trees)
+    logging.info(
+        f"Compacted {forest.n_estimators} trees into {len(trees)}: "
+        f"{baseline[1]} -> {scores}"
+    )
+    return compact_forest, {'before': baseline[1], 'after': scores}
+
+
+if __name__ == '__main__':
+    from sklearn.model_selection import train_test_split
+
+    from src.data.data import Data, load_config
+    from src.model.engine import ModelEngine
+
+    logging.basicConfig(level=logging.INFO)
+    name = sys.argv[1]
+    engine = ModelEngine()
+    compaction_config = engine.config.get('compaction', {})
+
+    # The held-out set is the test split the model was evaluated on
+    data = Data(load_config()).load_clean(map_categorical_features=True)
+    data = data.dropna(axis=0)
+    _, x_test, _, y_test = train_test_split(
+        data[engine.get_features_names()],
+        data[engine.get_target_name()],
+        test_size=engine.train_config['test_size'],
+        random_state=engine.train_config['random_state']
+    )
+
+    model_dir = engine.base_path / engine.config['paths']['model']
+    start = time.perf_counter()
+    engine.load_model(name)
+    load_time = time.perf_counter() - start
+    full_forest = engine.compiled_model or CompiledForest.from_sklearn(
+        engine.model
+    )
+
+    compact_forest, scores = compact(
+        engine,
+        x_test,
+        y_test,
+        accuracy_tolerance=compaction_config.get('accuracy_tolerance', 0.005),
+        auc_tolerance=compaction_config.get('auc_tolerance', 0.005),
+        max_depth=compaction_config.get('max_depth')
+    )
+    compact_name = f'{Path(name).stem}_compact.mmap'
+    compact_forest.save(model_dir / compact_name)
+
+    start = time.perf_counter()
+    engine.load_model(compact_name)
+    compact_load_time = time.perf_counter() - start
+
+    x_sample = x_test.to_numpy()
+    report = [
+        (name, full_forest, model_dir / name, load_time, scores['before']),
+        (compact_name, compact_forest, model_dir / compact_name,
+         compact_load_time, scores['after']),
+    ]
+    print(f"{'artifact':<36} | {'trees':>5} | {'nodes':>8} | {'size':>8} | "
+          f"{'load':>7} | {'p99':>8} | {'accuracy':>8} | {'roc auc':>7}")
+    for artifact, forest, path, load, result in report:
+        print(f"{artifact:<36} | {forest.n_estimators:>5} | "
+              f"{forest.feature.shape[0]:>8} | "
+              f"{artifact_size(path) / 1024 ** 2:>6.1f}MB | "
+              f"{load:>6.2f}s | "
+              f"{measure_latency(forest, x_sample):>6.2f}ms | "
+              f"{result['accuracy']:>8.4f} | {result['roc_auc']:>7.4f}")
@@ -0,0 +1,339 @@
+import sys
+import json
+import hashlib
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Any
+
+ARTIFACT_VERSION = 1
+ARTIFACT_ARRAYS = ['feature', 'threshold', 'children', 'value', 'roots']
+
+
+class CompiledForest:
+    """
+    Array-based inference engine for tree ensembles.
+
+    All the trees of a fitted sklearn forest are flattened into contiguous
+    NumPy arrays (split feature, threshold, children and normalized leaf
+    class distributions) and whole batches are evaluated level by level
+    with vectorized traversal, avoiding sklearn's per-call validation and
+    joblib dispatch.
+    """
+
+    def __init__(
+            self,
+            feature: np.ndarray,
+            threshold: np.ndarray,
+            children: np.ndarray,
+            value: np.ndarray,
+            roots: np.ndarray,
+            classes: np.ndarray,
+            max_depth: int,
+            chunk_size: int = 512
+    ):
+        """
+        Initialize the CompiledForest class.
+
+        Nodes are laid out so that the two children of a split are adjacent:
+        the left child is ``children[node]`` and the right child is
+        ``children[node] + 1``. Leaves point to themselves and have an
+        infinite threshold, so rows that reach a leaf stay there.
+
+        Args:
+            feature (np.ndarray): Split feature of every node.
+            threshold (np.ndarray): Split threshold of every node.
+            children (np.ndarray): Global index of the left child of every
+            node.
+            value (np.ndarray): Class distribution of every node, normalized
+            as sklearn does in ``predict_proba``.
+            roots (np.ndarray): Global index of the root of every tree.
+            classes (np.ndarray): Class labels of the forest.
+            max_depth (int): Maximum depth among all the trees.
+            chunk_size (int): Number of rows evaluated at once.
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = max_depth
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def _sibling_order(tree: Any) -> np.ndarray:
+        """
+        Breadth-first order of the nodes of a tree in which the children of
+        every split get consecutive positions.
+
+        Args:
+            tree (Any): sklearn ``Tree`` object.
+
+        Returns:
+            np.ndarray: Original node indices in their new order.
+        """
+        order = [np.zeros(1, dtype=np.intp)]
+        frontier = order[0]
+        while frontier.size:
+            frontier = frontier[tree.children_left[frontier] != -1]
+            frontier = np.stack(
+                [tree.children_left[frontier], tree.children_right[frontier]],
+                axis=1
+            ).ravel()
+            order.append(frontier)
+        return np.concatenate(order)
+
+    @classmethod
+    def from_sklearn(cls, model: Any, chunk_size: int = 512):
+        """
+        Flatten a fitted sklearn forest classifier.
+
+        Args:
+            model (Any): Fitted ``RandomForestClassifier``.
+            chunk_size (int): Number of rows evaluated at once.
+
+        Returns:
+            CompiledForest: Compiled version of the forest.
+        """
+        n_classes = len(model.classes_)
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            order = cls._sibling_order(tree)
+            position = np.empty_like(order)
+            position[order] = np.arange(order.size)
+
+            left = tree.children_left[order]
+            is_leaf = left == -1
+            child = np.where(is_leaf, np.arange(order.size), position[left])
+
+            value = tree.value[order, 0, :n_classes].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature[order]))
+            thresholds.append(
+                np.where(is_leaf, np.inf, tree.threshold[order])
+            )
+            children.append(child + offset)
+            values.append(value / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+
+        max_depth = max(e.tree_.max_depth for e in model.estimators_)
+        logging.info(
+            f"Compiled forest with {len(roots)} trees and {offset} nodes"
+        )
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(model.classes_),
+            max_depth=int(max_depth),
+            chunk_size=chunk_size
+        )
+
+    def save(self, path: Path) -> None:
+        """
+        Save the forest as a directory of raw ``.npy`` node arrays plus a
+        ``manifest.json`` file, so that it can be memory-mapped.
+
+        Args:
+            path (Path): Destination directory.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        checksum = hashlib.sha256()
+        for name in ARTIFACT_ARRAYS:
+            array = np.ascontiguousarray(getattr(self, name))
+            np.save(path / f'{name}.npy', array)
+            checksum.update(array.tobytes())
+
+        manifest = {
+            'version': ARTIFACT_VERSION,
+            'checksum': checksum.hexdigest(),
+            'n_estimators': self.n_estimators,
+            'n_nodes': int(self.feature.shape[0]),
+            'max_depth': self.max_depth,
+            'classes': self.classes_.tolist(),
+        }
+        with open(path / 'manifest.json', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        logging.info(f"Compiled forest saved to {path}")
+
+    @classmethod
+    def load(cls, path: Path, mmap_mode: str = 'r', chunk_size: int = 512):
+        """
+        Load a forest saved with ``save``. By default the node arrays are
+        memory-mapped read-only, so every process that loads the same
+        artifact shares its pages.
+
+        Args:
+            path (Path): Directory of the artifact.
+            mmap_mode (str): Memory-map mode of ``np.load``, or None to read
+            the arrays into memory.
+            chunk_size (int): Number of rows evaluated at once.
+
+        Returns:
+            CompiledForest: Loaded forest.
+
+        Raises:
+            ValueError: If the artifact version is not supported.
+        """
+        path = Path(path)
+        with open(path / 'manifest.json', 'r') as f:
+            manifest = json.load(f)
+        if manifest['version'] != ARTIFACT_VERSION:
+            raise ValueError(
+                f"Artifact version {manifest['version']} not supported"
+            )
+
+        arrays = {
+            name: np.load(path / f'{name}.npy', mmap_mode=mmap_mode)
+            for name in ARTIFACT_ARRAYS
+        }
+        logging.info(f"Compiled forest loaded from {path}")
+        return cls(
+            classes=np.asarray(manifest['classes']),
+            max_depth=manifest['max_depth'],
+            chunk_size=chunk_size,
+            **arrays
+        )
+
+    def subset(self, trees: Any, max_depth: int = None):
+        """
+        Build a forest with some of the trees, optionally cut at a maximum
+        depth.
+
+        Nodes are stored tree by tree in breadth-first order, so the nodes up
+        to a given depth are a prefix of the nodes of every tree. Splits at
+        the maximum depth become leaves that predict their class
+        distribution.
+
+        Args:
+            trees (Any): Indices of the trees to keep, in order.
+            max_depth (int): Maximum depth of the trees, or None to keep them
+            whole.
+
+        Returns:
+            CompiledForest: The smaller forest, with its arrays in memory.
+        """
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        depth = 0
+        for tree in np.asarray(trees, dtype=np.intp):
+            # Count the nodes level by level, up to the maximum depth
+            root = self.roots[tree]
+            level = np.array([root])
+            size = 0
+            tree_depth = 0
+            while True:
+                size += level.size
+                level = level[np.isfinite(self.threshold[level])]
+                if not level.size or tree_depth == max_depth:
+                    break
+                left = self.children[level]
+                level = np.stack([left, left + 1], axis=1).ravel()
+                tree_depth += 1
+
+            nodes = np.arange(root, root + size)
+            threshold = np.array(self.threshold[nodes])
+            child = self.children[nodes] - root
+            # Splits whose children were cut become leaves
+            cut = child >= size
+            threshold[cut] = np.inf
+            child[cut] = np.arange(size)[cut]
+            feature = np.where(np.isfinite(threshold), self.feature[nodes], 0)
+
+            features.append(feature)
+            thresholds.append(threshold)
+            children.append(child + offset)
+            values.append(np.asarray(self.value[nodes]))
+            roots.append(offset)
+            offset += size
+            depth = max(depth, tree_depth)
+
+        return CompiledForest(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=self.classes_,
+            max_depth=int(depth),
+            chunk_size=self.chunk_size
+        )
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    def apply(self, x: np.ndarray) -> np.ndarray:
+        """
+        Find the leaf reached by every row in every tree.
+
+        Args:
+            x (np.ndarray): Features as a 2D float32 array.
+
+        Returns:
+            np.ndarray: Array of shape (n_trees, n_rows) with leaf indices.
+        """
+        n_rows, n_features = x.shape
+        flat_x = x.ravel()
+        row_offset = np.arange(n_rows, dtype=np.intp) * n_features
+        node = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            x_node = flat_x.take(row_offset + self.feature.take(node))
+            go_right = x_node > self.threshold.take(node)
+            node = self.children.take(node) + go_right
+        return node
+
+    def predict_proba(self, x: Any) -> np.ndarray:
+        """
+        Args:
+            x (Any): Array-like containing features for prediction.
+
+        Returns:
+            np.ndarray: Array of class probabilities.
+        """
+        # sklearn evaluates the trees on float32 inputs
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if np.isnan(x).any():
+            raise ValueError("Input X contains NaN.")
+        proba = np.empty((x.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, x.shape[0], self.chunk_size):
+            end = start + self.chunk_size
+            leaves = self.apply(x[start:end])
+            # Summing over the leading axis adds the trees sequentially, in
+            # the same order as sklearn does.
+            proba[start:end] = self.value.take(leaves, axis=0).sum(axis=0)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, x: Any) -> np.ndarray:
+        """
+        Args:
+            x (Any): Array-like containing features for prediction.
+
+        Returns:
+            np.ndarray: Array of predictions.
+        """
+        proba = self.predict_proba(x)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0)
+
+
+if __name__ == '__main__':
+    from src.model.engine import ModelEngine
+
+    # Convert a pickled model into the memory-mappable artifact format
+    logging.basicConfig(level=logging.INFO)
+    engine = ModelEngine()
+    engine.load_model(sys.argv[1])
+    model_dir = engine.base_path / engine.config['paths']['model']
+    CompiledForest.from_sklearn(engine.model).save(
+        model_dir / f'{Path(sys.argv[1]).stem}.mmap'
+    )
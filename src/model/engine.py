@@ -1,14 +1,18 @@
+import json
 import yaml
 import pickle
+import hashlib
 import logging
 import numpy as np
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, List
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, roc_auc_score
-from sklearn.model_selection import train_test_split
+
+from src.model.cache import PredictionCache
+from src.model.compiled import CompiledForest
+from src.model.lookup import LookupTable
+from src.model.registry import ModelRegistry
 
 
 def load_config() -> Dict[str, Any]:
@@ -37,6 +41,13 @@ def load_config() -> Dict[str, Any]:
     )
 
 
+def select_rows(x: Any, rows: Any) -> Any:
+    """
+    Select rows by position from a DataFrame or an array.
+    """
+    return x.iloc[rows] if hasattr(x, 'iloc') else x[rows]
+
+
 class ModelEngine:
     """
     Class for managing the machine learning model operations.
@@ -51,39 +62,188 @@ class ModelEngine:
         self.model_name = self.config['model']['type']
         self.train_config = self.config['train_config']
 
-        if self.model_name == 'random_forest':
-            self.model = RandomForestClassifier(
-                **self.config['model']['params']
-            )
-        else:
+        if self.model_name != 'random_forest':
             logging.error(
                 f"Model type {self.config['model']['type']} not supported"
             )
             raise ValueError(
                 f'Model type {self.config["model"]["type"]} not supported'
             )
+        # The estimator is built on the first training so that serving a
+        # saved model does not need to import the training libraries
+        self.model = None
+
+        inference_config = self.config.get('inference', {})
+        self.inference_engine = inference_config.get('engine', 'sklearn')
+        self.chunk_size = inference_config.get('chunk_size', 512)
+        self.compiled_max_batch_size = inference_config.get(
+            'compiled_max_batch_size', 512
+        )
+        if self.inference_engine not in ('sklearn', 'compiled'):
+            logging.error(
+                f"Inference engine {self.inference_engine} not supported"
+            )
+            raise ValueError(
+                f'Inference engine {self.inference_engine} not supported'
+            )
+        self.compiled_model = None
+
+        cache_config = inference_config.get('cache', {})
+        if cache_config.get('enabled', False):
+            self.cache = PredictionCache(
+                max_size=cache_config.get('max_size', 10000),
+                ttl=cache_config.get('ttl_seconds')
+            )
+        else:
+            self.cache = None
+
+        self.lookup_config = inference_config.get('lookup_table', {})
+        self.lookup_table = None
+        self.model_file = None
+        self.model_fingerprint = None
 
         self.seed = self.config['seed']
         logging.info("ModelEngine initialized")
 
+    def build_model(self) -> Any:
+        """
+        Build a new, untrained estimator from the configuration.
+
+        Returns:
+            Any: The estimator.
+        """
+        from sklearn.ensemble import RandomForestClassifier
+
+        return RandomForestClassifier(**self.config['model']['params'])
+
     def get_features_names(self) -> List[str]:
         return self.config['features']
 
     def get_target_name(self) -> str:
         return self.config['target']
 
+    def prepare_inference(self) -> None:
+        """
+        Refresh the inference state after the model changes: build the
+        array-based engine when it is enabled in the configuration and
+        invalidate the prediction cache.
+        """
+        if self.cache is not None:
+            self.cache.clear()
+
+        if isinstance(self.model, CompiledForest):
+            self.compiled_model = self.model
+        elif self.inference_engine == 'compiled':
+            self.compiled_model = CompiledForest.from_sklearn(
+                self.model, chunk_size=self.chunk_size
+            )
+        else:
+            self.compiled_model = None
+
+        if self.lookup_config.get('enabled', False):
+            self.lookup_table = self.load_lookup_table()
+        else:
+            self.lookup_table = None
+
+    def get_model_path(self, name: str) -> Path:
+        # Absolute paths, e.g. of registry artifacts, are used as they are
+        return self.base_path / self.config['paths']['model'] / name
+
+    def get_lookup_table_path(self, name: str) -> Path:
+        # Keyed on the full artifact name, since the pickle and mmap
+        # artifacts of a model share their stem
+        model_path = self.get_model_path(name)
+        return model_path.with_name(f'{model_path.name}.lut.npz')
+
+    def load_lookup_table(self) -> LookupTable:
+        """
+        Load the lookup table of the current model file, checking that it was
+        built from the same model.
+
+        Returns:
+            LookupTable: The table, or None if it is missing or stale.
+        """
+        if self.model_file is None:
+            return None
+
+        path = self.get_lookup_table_path(self.model_file)
+        if not path.exists():
+            logging.warning(f"Lookup table not found at {path}")
+            return None
+
+        table = LookupTable.load(path)
+        if table.fingerprint != self.model_fingerprint:
+            logging.warning(
+                f"Lookup table at {path} does not match the loaded model"
+            )
+            return None
+        if table.features != self.get_features_names():
+            logging.warning(
+                f"Lookup table at {path} does not match the model features"
+            )
+            return None
+
+        logging.info(f"Lookup table loaded from {path}")
+        return table
+
+    def build_lookup_table(self, name: str) -> LookupTable:
+        """
+        Score every point of the feature grid configured in
+        ``inference.lookup_table.grid`` and save the table next to the model.
+
+        Args:
+            name (str): File name of the loaded model.
+
+        Returns:
+            LookupTable: The built table.
+
+        Raises:
+            ValueError: If the current model was not loaded from ``name``.
+        """
+        if self.model_file != name:
+            raise ValueError(f"Model {name} must be loaded first")
+
+        table = LookupTable.build(
+            self.predict_model,
+            self.get_features_names(),
+            self.lookup_config['grid'],
+            self.model_fingerprint
+        )
+        table.save(self.get_lookup_table_path(name))
+        self.lookup_table = table
+        return table
+
     def load_model(self, name) -> None:
         """
         Load a pre-trained model from a file.
 
+        If ``name`` is a directory saved in the ``mmap`` artifact format, its
+        node arrays are memory-mapped read-only and shared between all the
+        processes that load it.
+
+        Args:
+            name (str): File name in the ``paths.model`` folder, or absolute
+            path of the model.
+
         Raises:
             FileNotFoundError: If the model file is not found.
         """
-        model_path = self.base_path / self.config['paths']['model'] / name
+        model_path = self.get_model_path(name)
         try:
-            with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
+            if model_path.is_dir():
+                with open(model_path / 'manifest.json', 'rb') as f:
+                    content = f.read()
+                self.model = CompiledForest.load(
+                    model_path, chunk_size=self.chunk_size
+                )
+            else:
+                with open(model_path, 'rb') as f:
+                    content = f.read()
+                self.model = pickle.loads(content)
+            self.model_file = name
+            self.model_fingerprint = hashlib.sha256(content).hexdigest()
             logging.info(f"Model loaded from {model_path}")
+            self.prepare_inference()
         except FileNotFoundError:
             logging.error(f"Model file not found at {model_path}")
             raise
@@ -97,9 +257,99 @@ class ModelEngine:
             y (np.ndarray): Training labels.
         """
         logging.info("Starting model training")
+        if self.model is None:
+            self.model = self.build_model()
         self.model.fit(x, y)
+        self.model_file = None
+        self.model_fingerprint = None
+        self.prepare_inference()
         logging.info("Model training completed")
 
+    def grow(
+            self,
+            x: np.ndarray,
+            y: np.ndarray,
+            n_new_trees: int,
+            drop_oldest: bool = False,
+            class_weight_target: np.ndarray = None,
+            random_state: int = None
+    ) -> None:
+        """
+        Add trees trained on new data to the current forest (warm start).
+
+        With a ``balanced`` class weight, the new trees are weighted with the
+        class distribution of the full training target instead of that of
+        the new data.
+
+        Args:
+            x (np.ndarray): Features of the new or changed data.
+            y (np.ndarray): Labels of the new or changed data.
+            n_new_trees (int): Number of trees to add.
+            drop_oldest (bool): Whether to drop as many of the oldest trees
+            as were added, keeping the size of the forest.
+            class_weight_target (np.ndarray, optional): Labels of the full
+            training data, from which balanced class weights are computed.
+            Defaults to ``y``.
+            random_state (int, optional): Random state of the new trees.
+            Defaults to that of the model. With warm start, sklearn skips as
+            many seeds as there are trees, so a forest that keeps its size
+            would otherwise reuse the same seeds on every run.
+
+        Raises:
+            ValueError: If there is no trained estimator to grow or the new
+            data does not contain every class of the model.
+        """
+        if self.model is None or isinstance(self.model, CompiledForest):
+            logging.error("Incremental training needs a trained estimator")
+            raise ValueError(
+                "Incremental training needs a trained sklearn model, load a "
+                "pickled model first"
+            )
+        classes = np.unique(y)
+        if not np.array_equal(classes, self.model.classes_):
+            logging.error(f"New data has classes {classes}")
+            raise ValueError(
+                f"New data has classes {classes} but the model has "
+                f"{self.model.classes_}"
+            )
+
+        logging.info(f"Growing the model with {n_new_trees} trees")
+        n_trees = len(self.model.estimators_)
+        warm_start = self.model.warm_start
+        class_weight = self.model.class_weight
+        model_random_state = self.model.random_state
+        if random_state is not None:
+            self.model.set_params(random_state=random_state)
+        if class_weight in ('balanced', 'balanced_subsample'):
+            from sklearn.utils.class_weight import compute_class_weight
+
+            target = y if class_weight_target is None else class_weight_target
+            weights = compute_class_weight(
+                'balanced', classes=self.model.classes_, y=np.asarray(target)
+            )
+            self.model.set_params(
+                class_weight=dict(zip(self.model.classes_, weights))
+            )
+        self.model.set_params(
+            warm_start=True, n_estimators=n_trees + n_new_trees
+        )
+        self.model.fit(x, y)
+
+        if drop_oldest:
+            self.model.estimators_ = self.model.estimators_[n_new_trees:]
+        self.model.set_params(
+            warm_start=warm_start,
+            class_weight=class_weight,
+            random_state=model_random_state,
+            n_estimators=len(self.model.estimators_)
+        )
+        self.model_file = None
+        self.model_fingerprint = None
+        self.prepare_inference()
+        logging.info(
+            f"Model growth completed: {len(self.model.estimators_)} trees"
+        )
+
     def test(self, x: np.ndarray, y: np.ndarray) -> Dict[str, float]:
         """
         Args:
@@ -110,6 +360,8 @@ class ModelEngine:
             Dict[str, float]: Dictionary containing accuracy and ROC AUC
             scores.
         """
+        from sklearn.metrics import accuracy_score, roc_auc_score
+
         logging.info("Starting model testing")
         y_pred = self.model.predict(x)
         y_proba = self.model.predict_proba(x)
@@ -122,15 +374,97 @@ class ModelEngine:
 
     def predict(self, x: np.ndarray) -> np.ndarray:
         """
+        Rows on the grid of the lookup table are answered from it, rows whose
+        features are in the prediction cache are answered from the cache and
+        only the remaining rows are evaluated by the model.
+
         Args:
             x (np.ndarray): Array containing features for prediction.
 
         Returns:
             np.ndarray: Array of predictions.
         """
-        logging.info("Making predictions")
-        predictions = self.model.predict(x)
-        logging.info("Predictions completed")
+        # Debug level, since the API calls it once per request
+        logging.debug("Making predictions")
+        if self.lookup_table is None:
+            predictions = self.predict_forest(x)
+        else:
+            predictions, in_grid = self.lookup_table.lookup(x)
+            if not in_grid.all():
+                rows = np.flatnonzero(~in_grid)
+                predictions[rows] = self.predict_forest(select_rows(x, rows))
+        logging.debug("Predictions completed")
+        return predictions
+
+    def predict_forest(self, x: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the model through the prediction cache, if enabled.
+
+        Args:
+            x (np.ndarray): Array containing features for prediction.
+
+        Returns:
+            np.ndarray: Array of predictions.
+        """
+        if self.cache is None:
+            return self.predict_model(x)
+        return self.predict_cached(x)
+
+    def predict_model(self, x: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the model without going through the cache.
+
+        Batches up to ``compiled_max_batch_size`` rows are evaluated with the
+        compiled engine when it is enabled; larger batches are sent to
+        sklearn, whose compiled tree traversal is faster at that size.
+
+        Args:
+            x (np.ndarray): Array containing features for prediction.
+
+        Returns:
+            np.ndarray: Array of predictions.
+        """
+        use_compiled = (
+            self.compiled_model is not None
+            and len(x) <= self.compiled_max_batch_size
+        )
+        if use_compiled:
+            return self.compiled_model.predict(x)
+        if not hasattr(x, 'iloc'):
+            # Keep the feature names the model was fitted with
+            x = pd.DataFrame(x, columns=self.get_features_names())
+        return self.model.predict(x)
+
+    def predict_cached(self, x: np.ndarray) -> np.ndarray:
+        """
+        Split a batch into cache hits and misses, evaluate the misses once
+        per distinct feature vector and store their predictions.
+
+        Args:
+            x (np.ndarray): Array containing features for prediction.
+
+        Returns:
+            np.ndarray: Array of predictions.
+        """
+        keys = list(map(tuple, np.asarray(x, dtype=np.float64).tolist()))
+        found, missing = self.cache.get_many(keys)
+
+        predictions = np.empty(len(keys), dtype=self.model.classes_.dtype)
+        if found:
+            positions = np.fromiter(found.keys(), dtype=np.intp)
+            predictions[positions] = list(found.values())
+
+        if missing:
+            unique_rows = {}
+            for i in missing:
+                unique_rows.setdefault(keys[i], i)
+            rows = list(unique_rows.values())
+            values = self.predict_model(select_rows(x, rows))
+
+            value_by_key = dict(zip(unique_rows.keys(), values))
+            predictions[missing] = [value_by_key[keys[i]] for i in missing]
+            self.cache.put_many(list(unique_rows.keys()), values.tolist())
+
         return predictions
 
     def retrain_and_save(self, data: pd.DataFrame) -> Dict[str, float]:
@@ -144,6 +478,8 @@ class ModelEngine:
             Dict[str, float]: Dictionary containing accuracy and ROC AUC
             scores.
         """
+        from sklearn.model_selection import train_test_split
+
         logging.info("Starting model retraining process")
         x = data[self.get_features_names()]
         y = data[self.get_target_name()]
@@ -161,13 +497,172 @@ class ModelEngine:
         logging.info("Model retraining and saving completed")
         return results
 
-    def save_model(self, results: Dict[str, float] = None) -> None:
+    def tune(
+            self,
+            data: pd.DataFrame,
+            retrain: bool = True,
+            results_path: Path = None
+    ) -> Dict[str, Any]:
+        """
+        Search the hyperparameters configured under ``tuning`` in
+        ``model.yaml`` with k-fold cross-validation on a process pool.
+
+        Every candidate is scored by its ROC AUC and by the latency of a
+        prediction with the configured inference engine. The best candidate
+        within ``latency_budget_ms`` becomes the model configuration and,
+        if ``retrain`` is set, is retrained and saved.
+
+        Args:
+            data (pd.DataFrame): The dataset to use for the search.
+            retrain (bool): Whether to retrain and save the selected model.
+            results_path (Path, optional): File where the results are saved
+            as JSON. Defaults to a dated file in the models folder.
+
+        Returns:
+            Dict[str, Any]: Results of every candidate and the selected one.
+        """
+        from src.model.tuning import expand_search_space, search, select_best
+
+        tuning_config = self.config['tuning']
+        x = data[self.get_features_names()].to_numpy(dtype=np.float64)
+        y = data[self.get_target_name()].to_numpy(dtype=np.int64)
+
+        settings = {
+            'params': self.config['model']['params'],
+            'n_splits': tuning_config.get('n_splits', 5),
+            'seed': self.seed,
+            'inference_engine': self.inference_engine,
+            'latency_batch_size': tuning_config.get('latency_batch_size', 1),
+            'latency_repetitions': tuning_config.get(
+                'latency_repetitions', 50
+            ),
+        }
+        candidates = expand_search_space(tuning_config['search_space'])
+        results = search(
+            x, y, candidates, settings, tuning_config.get('n_workers', 4)
+        )
+        best = select_best(results, tuning_config.get('latency_budget_ms'))
+        logging.info(f"Selected candidate: {best}")
+        summary = {'results': results, 'best': best}
+
+        if results_path is None:
+            date = datetime.now().strftime('%Y%m%d_%H%M')
+            model_dir = self.base_path / self.config['paths']['model']
+            results_path = model_dir / f'tuning_{date}.json'
+        with open(results_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        logging.info(f"Tuning results saved to {results_path}")
+
+        self.config['model']['params'] = {
+            **self.config['model']['params'], **best['params']
+        }
+        if retrain:
+            self.model = None
+            self.retrain_and_save(data)
+        return summary
+
+    def retrain_incremental(
+            self,
+            data: pd.DataFrame,
+            changed: pd.DataFrame,
+            name: str = None
+    ) -> Dict[str, float]:
+        """
+        Grow the current model with trees trained on new or changed data,
+        test it, and save the results.
+
+        The full data is split as in ``retrain_and_save``: the model is
+        tested on the held-out split, and the changed rows in it are not
+        used for growing. Balanced class weights are computed on the
+        training split. The number of trees and whether the oldest ones are
+        dropped are configured under ``incremental`` in ``model.yaml``.
+
+        Args:
+            data (pd.DataFrame): The full, up to date dataset.
+            changed (pd.DataFrame): The new or changed rows of ``data``,
+            with the same index.
+            name (str, optional): File name of the model to grow. Defaults
+            to the current model.
+
+        Returns:
+            Dict[str, float]: Dictionary containing accuracy and ROC AUC
+            scores.
+        """
+        from sklearn.model_selection import train_test_split
+
+        logging.info("Starting incremental model retraining process")
+        if name is not None:
+            self.load_model(name)
+
+        incremental_config = self.config.get('incremental', {})
+        x = data[self.get_features_names()]
+        y = data[self.get_target_name()]
+
+        _, x_test, y_train, y_test = train_test_split(
+            x,
+            y,
+            test_size=self.train_config['test_size'],
+            random_state=self.train_config['random_state']
+        )
+        changed = changed.drop(index=x_test.index, errors='ignore')
+
+        random_state = self.get_incremental_seed()
+        logging.info(f"Growing the model with random state {random_state}")
+        self.grow(
+            changed[self.get_features_names()],
+            changed[self.get_target_name()],
+            n_new_trees=incremental_config.get('n_new_trees', 50),
+            drop_oldest=incremental_config.get('drop_oldest', True),
+            class_weight_target=y_train,
+            random_state=random_state
+        )
+        results = self.test(x_test, y_test)
+        self.save_model(
+            results,
+            label='incremental',
+            metadata={'random_state': random_state}
+        )
+        logging.info("Incremental model retraining and saving completed")
+        return results
+
+    def get_incremental_seed(self) -> int:
+        """
+        Random state for the new trees of an incremental run.
+
+        It is derived from the configured seed and the version that the
+        grown model gets in the registry, so every run seeds its trees
+        differently and reproducibly. Without a registry, fresh entropy is
+        used.
+        """
+        registry = self.get_registry()
+        entropy = None
+        if registry is not None:
+            entropy = [self.seed, registry.next_version()]
+        return int(np.random.SeedSequence(entropy).generate_state(1)[0])
+
+    def save_model(
+            self,
+            results: Dict[str, float] = None,
+            label: str = None,
+            metadata: Dict[str, Any] = None
+    ) -> str:
         """
         Save the model and results to a file.
 
+        Besides the pickle file, the formats listed in ``artifacts.formats``
+        are written: ``mmap`` saves the compiled node arrays in a directory
+        that ``load_model`` memory-maps.
+
         Args:
             results (Dict[str, float], optional): Dictionary containing model
             performance metrics.
+            label (str, optional): Label added to the name of the
+            artifacts, e.g. ``incremental``.
+            metadata (Dict[str, Any], optional): Training details recorded
+            in the registry.
+
+        Returns:
+            str: Name of the artifacts, without extension.
         """
         logging.info("Saving model")
         date = datetime.now().strftime('%Y%m%d_%H%M')
@@ -178,9 +673,40 @@ class ModelEngine:
         else:
             results_str = ''
 
-        name = f'{self.model_name}_{results_str}_{date}.pkl'
-        model_path = self.base_path / self.config['paths']['model'] / name
+        model_name = self.model_name
+        if label is not None:
+            model_name = f'{model_name}_{label}'
+        name = f'{model_name}_{results_str}_{date}'
+        model_dir = self.base_path / self.config['paths']['model']
+        formats = self.config.get('artifacts', {}).get('formats', ['pickle'])
+
+        artifacts = {}
+
+        if 'pickle' in formats:
+            artifacts['pickle'] = f'{name}.pkl'
+            model_path = model_dir / artifacts['pickle']
+            with open(model_path, 'wb') as f:
+                pickle.dump(self.model, f)
+            logging.info(f"Model saved to {model_path}")
+
+        if 'mmap' in formats:
+            artifacts['mmap'] = f'{name}.mmap'
+            compiled = self.compiled_model or CompiledForest.from_sklearn(
+                self.model
+            )
+            compiled.save(model_dir / artifacts['mmap'])
+
+        registry = self.get_registry()
+        if registry is not None:
+            registry.register(name, artifacts, results, metadata)
+        return name
 
-        with open(model_path, 'wb') as f:
-            pickle.dump(self.model, f)
-        logging.info(f"Model saved to {model_path}")
+    def get_registry(self) -> ModelRegistry:
+        """
+        Registry of model versions configured under ``registry``, or None if
+        it is disabled.
+        """
+        registry_config = self.config.get('registry', {})
+        if not registry_config.get('enabled', False):
+            return None
+        return ModelRegistry(self.base_path / registry_config['manifest'])
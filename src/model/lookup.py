@@ -0,0 +1,157 @@
+import sys
+import logging
+import itertools
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def grid_axis(spec: Any) -> np.ndarray:
+    """
+    Build the values of one grid axis from its configuration.
+
+    Args:
+        spec (Any): Either a list of values or a dictionary with ``start``,
+        ``stop`` (inclusive) and ``step`` keys.
+
+    Returns:
+        np.ndarray: Sorted values of the axis.
+    """
+    if isinstance(spec, dict):
+        values = np.arange(
+            spec['start'], spec['stop'] + spec['step'] / 2, spec['step']
+        )
+    else:
+        values = np.asarray(spec)
+    return np.unique(values.astype(np.float64))
+
+
+class LookupTable:
+    """
+    Dense table with the model prediction of every point of a discrete
+    feature grid.
+
+    Rows whose features all lie on the grid are answered with a vectorized
+    index lookup; the remaining rows still have to be sent to the model.
+    """
+
+    def __init__(
+            self,
+            features: List[str],
+            axes: List[np.ndarray],
+            table: np.ndarray,
+            fingerprint: str
+    ):
+        """
+        Initialize the LookupTable class.
+
+        Args:
+            features (List[str]): Names of the features, in model order.
+            axes (List[np.ndarray]): Sorted grid values of every feature.
+            table (np.ndarray): Predictions with one dimension per feature.
+            fingerprint (str): Fingerprint of the model that produced the
+            table.
+        """
+        self.features = list(features)
+        self.axes = axes
+        self.table = table
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(
+            cls,
+            predict: Callable[[pd.DataFrame], np.ndarray],
+            features: List[str],
+            grid: Dict[str, Any],
+            fingerprint: str
+    ):
+        """
+        Enumerate the grid and score it with the model.
+
+        Args:
+            predict (Callable[[pd.DataFrame], np.ndarray]): Model prediction
+            function.
+            features (List[str]): Names of the features, in model order.
+            grid (Dict[str, Any]): Axis specification of every feature.
+            fingerprint (str): Fingerprint of the model.
+
+        Returns:
+            LookupTable: Table with the prediction of every grid point.
+        """
+        axes = [grid_axis(grid[feature]) for feature in features]
+        points = pd.DataFrame(
+            list(itertools.product(*axes)), columns=features
+        )
+        logging.info(f"Scoring {len(points)} grid points")
+        predictions = np.asarray(predict(points))
+        table = predictions.reshape([len(axis) for axis in axes])
+        return cls(features, axes, table, fingerprint)
+
+    def save(self, path: Path) -> None:
+        """
+        Save the table as a ``.npz`` file.
+
+        Args:
+            path (Path): Destination of the table.
+        """
+        arrays = {f'axis_{i}': axis for i, axis in enumerate(self.axes)}
+        np.savez(
+            path,
+            table=self.table,
+            features=np.asarray(self.features),
+            fingerprint=np.asarray(self.fingerprint),
+            **arrays
+        )
+        logging.info(f"Lookup table saved to {path}")
+
+    @classmethod
+    def load(cls, path: Path):
+        """
+        Load a table saved with ``save``.
+
+        Args:
+            path (Path): Location of the table.
+
+        Returns:
+            LookupTable: Loaded table.
+        """
+        with np.load(path) as data:
+            features = data['features'].tolist()
+            axes = [data[f'axis_{i}'] for i in range(len(features))]
+            return cls(
+                features, axes, data['table'], str(data['fingerprint'])
+            )
+
+    def lookup(self, x: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up the predictions of the rows that lie on the grid.
+
+        Args:
+            x (Any): Array-like with the features in model order.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Predictions (undefined for rows
+            outside the grid) and a mask of the rows found in the grid.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        in_grid = np.ones(x.shape[0], dtype=bool)
+        indices = []
+        for column, axis in enumerate(self.axes):
+            values = x[:, column]
+            index = np.searchsorted(axis, values)
+            index = np.minimum(index, len(axis) - 1)
+            in_grid &= axis[index] == values
+            indices.append(index)
+
+        predictions = self.table[tuple(indices)]
+        return predictions, in_grid
+
+
+if __name__ == '__main__':
+    from src.model.engine import ModelEngine
+
+    logging.basicConfig(level=logging.INFO)
+    engine = ModelEngine()
+    engine.load_model(sys.argv[1])
+    engine.build_lookup_table(sys.argv[1])
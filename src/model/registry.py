@@ -0,0 +1,138 @@
+import os
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+# Artifact formats in order of preference for serving
+SERVING_FORMATS = ['mmap', 'pickle']
+
+
+class ModelRegistry:
+    """
+    JSON manifest of the saved model versions, with their artifacts and
+    evaluation metrics, and of the version that is currently active.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize the ModelRegistry.
+
+        Args:
+            path (Path): Location of the manifest. The artifacts are in the
+            same folder.
+        """
+        self.path = Path(path)
+
+    def load(self) -> Dict[str, Any]:
+        if not self.path.exists():
+            return {'active': None, 'versions': []}
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def save(self, manifest: Dict[str, Any]) -> None:
+        """
+        Atomically save the manifest.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def next_version(self) -> int:
+        """
+        Number of the version that the next registered model gets.
+        """
+        return max(
+            (entry['version'] for entry in self.list()), default=0
+        ) + 1
+
+    def register(
+            self,
+            name: str,
+            artifacts: Dict[str, str],
+            metrics: Dict[str, float] = None,
+            metadata: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Add a new version to the registry.
+
+        Args:
+            name (str): Name of the model.
+            artifacts (Dict[str, str]): File name of the artifact of every
+            format, relative to the folder of the manifest.
+            metrics (Dict[str, float], optional): Evaluation metrics.
+            metadata (Dict[str, Any], optional): Training details, such as
+            the random state of an incremental run.
+
+        Returns:
+            Dict[str, Any]: Entry of the new version.
+        """
+        manifest = self.load()
+        version = self.next_version()
+        entry = {
+            'version': version,
+            'name': name,
+            'artifacts': artifacts,
+            'metrics': {k: float(v) for k, v in (metrics or {}).items()},
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        if metadata is not None:
+            entry['metadata'] = metadata
+        manifest['versions'].append(entry)
+        self.save(manifest)
+        logging.info(f"Model {name} registered as version {version}")
+        return entry
+
+    def list(self) -> List[Dict[str, Any]]:
+        return self.load()['versions']
+
+    def get(self, version: Union[int, str]) -> Dict[str, Any]:
+        """
+        Get the entry of a version.
+
+        Args:
+            version (Union[int, str]): Version number, ``latest`` or
+            ``active``.
+
+        Returns:
+            Dict[str, Any]: Entry of the version.
+
+        Raises:
+            ValueError: If the version is not in the registry.
+        """
+        manifest = self.load()
+        if version == 'active':
+            version = manifest['active']
+        elif version == 'latest' and manifest['versions']:
+            version = manifest['versions'][-1]['version']
+
+        for entry in manifest['versions']:
+            if str(entry['version']) == str(version):
+                return entry
+        logging.error(f"Model version {version} not found in the registry")
+        raise ValueError(f"Model version {version} not found")
+
+    def set_active(self, version: int) -> None:
+        manifest = self.load()
+        manifest['active'] = version
+        self.save(manifest)
+        logging.info(f"Model version {version} is now active")
+
+    def get_artifact(self, entry: Dict[str, Any]) -> str:
+        """
+        File name of the preferred artifact of a version for serving.
+        """
+        for file_format in SERVING_FORMATS:
+            if file_format in entry['artifacts']:
+                return entry['artifacts'][file_format]
+        raise ValueError(f"Model version {entry['version']} has no artifacts")
+
+    def get_artifact_path(self, entry: Dict[str, Any]) -> Path:
+        """
+        Location of the preferred artifact of a version for serving, in the
+        folder of the manifest.
+        """
+        return self.path.parent / self.get_artifact(entry)
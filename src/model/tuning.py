@@ -0,0 +1,232 @@
+import time
+import logging
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Tuple
+
+from src.model.compiled import CompiledForest
+
+# Dataset and settings of each search process worker
+worker_arrays = {}
+worker_settings = {}
+
+
+def expand_search_space(space: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Enumerate every combination of the values of a search space.
+
+    Args:
+        space (Dict[str, List[Any]]): Candidate values of every parameter.
+
+    Returns:
+        List[Dict[str, Any]]: Parameters of every candidate.
+    """
+    names = list(space)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(space[name] for name in names))
+    ]
+
+
+def share_array(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, Dict]:
+    """
+    Copy an array into a new shared memory block.
+
+    Returns:
+        Tuple[shared_memory.SharedMemory, Dict]: The block, which the caller
+        must close and unlink, and the description needed to attach to it.
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[...] = array
+    spec = {
+        'name': block.name,
+        'shape': array.shape,
+        'dtype': array.dtype.str,
+    }
+    return block, spec
+
+
+def attach_array(spec: Dict) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    block = shared_memory.SharedMemory(name=spec['name'])
+    array = np.ndarray(spec['shape'], dtype=spec['dtype'], buffer=block.buf)
+    return block, array
+
+
+def init_worker(specs: Dict[str, Dict], settings: Dict[str, Any]) -> None:
+    """
+    Attach a search process worker to the shared dataset.
+
+    Args:
+        specs (Dict[str, Dict]): Shared memory description of ``x`` and
+        ``y``.
+        settings (Dict[str, Any]): Fixed model parameters, folds and latency
+        measurement settings.
+    """
+    worker_settings.update(settings)
+    for name, spec in specs.items():
+        # Keep the block referenced so that the buffer stays mapped
+        worker_arrays[name] = attach_array(spec)
+
+
+def measure_latency(model: Any, x: np.ndarray) -> float:
+    """
+    Median latency, in milliseconds, of one prediction call with the
+    inference engine used for serving.
+    """
+    if worker_settings['inference_engine'] == 'compiled':
+        model = CompiledForest.from_sklearn(model)
+    batch = x[:worker_settings['latency_batch_size']]
+    model.predict(batch)
+
+    timings = []
+    for _ in range(worker_settings['latency_repetitions']):
+        start = time.perf_counter()
+        model.predict(batch)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def evaluate_fold(params: Dict[str, Any], fold: int) -> Dict[str, float]:
+    """
+    Train a candidate on the training part of one fold in a search worker
+    and evaluate it on the rest.
+
+    Args:
+        params (Dict[str, Any]): Parameters of the candidate.
+        fold (int): Index of the fold.
+
+    Returns:
+        Dict[str, float]: Accuracy, ROC AUC and latency of the candidate.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import StratifiedKFold
+
+    _, x = worker_arrays['x']
+    _, y = worker_arrays['y']
+    splitter = StratifiedKFold(
+        n_splits=worker_settings['n_splits'],
+        shuffle=True,
+        random_state=worker_settings['seed']
+    )
+    train, test = list(splitter.split(x, y))[fold]
+
+    model = RandomForestClassifier(
+        **{**worker_settings['params'], **params, 'n_jobs': 1}
+    )
+    model.fit(x[train], y[train])
+    return {
+        'accuracy': accuracy_score(y[test], model.predict(x[test])),
+        'roc_auc': roc_auc_score(
+            y[test], model.predict_proba(x[test]), multi_class='ovr'
+        ),
+        'latency_ms': measure_latency(model, x[test]),
+    }
+
+
+def select_best(
+        results: List[Dict[str, Any]],
+        latency_budget_ms: float = None
+) -> Dict[str, Any]:
+    """
+    Select the candidate with the best ROC AUC within the latency budget.
+
+    If no candidate meets the budget, the fastest one is selected.
+
+    Args:
+        results (List[Dict[str, Any]]): Results of every candidate.
+        latency_budget_ms (float): Maximum latency of the selected
+        candidate, in milliseconds.
+
+    Returns:
+        Dict[str, Any]: Result of the selected candidate.
+    """
+    if latency_budget_ms is not None:
+        eligible = [
+            result for result in results
+            if result['latency_ms'] <= latency_budget_ms
+        ]
+        if not eligible:
+            logging.warning(
+                f"No candidate meets the latency budget of "
+                f"{latency_budget_ms} ms, selecting the fastest one"
+            )
+            return min(results, key=lambda result: result['latency_ms'])
+        results = eligible
+    return max(
+        results, key=lambda result: (result['roc_auc'], -result['latency_ms'])
+    )
+
+
+def search(
+        x: np.ndarray,
+        y: np.ndarray,
+        candidates: List[Dict[str, Any]],
+        settings: Dict[str, Any],
+        n_workers: int
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate every candidate with k-fold cross-validation on a process pool.
+
+    The dataset is copied once into shared memory, which every worker maps,
+    instead of being pickled with every task.
+
+    Args:
+        x (np.ndarray): Features.
+        y (np.ndarray): Labels.
+        candidates (List[Dict[str, Any]]): Parameters of every candidate.
+        settings (Dict[str, Any]): Fixed model parameters, ``n_splits``,
+        ``seed`` and latency measurement settings.
+        n_workers (int): Number of worker processes.
+
+    Returns:
+        List[Dict[str, Any]]: Parameters, mean and standard deviation of the
+        ROC AUC, mean accuracy and median latency of every candidate.
+    """
+    blocks = []
+    try:
+        specs = {}
+        for name, array in (('x', x), ('y', y)):
+            block, specs[name] = share_array(np.ascontiguousarray(array))
+            blocks.append(block)
+
+        tasks = [
+            (params, fold)
+            for params in candidates
+            for fold in range(settings['n_splits'])
+        ]
+        logging.info(
+            f"Evaluating {len(candidates)} candidates with "
+            f"{settings['n_splits']}-fold cross-validation on {n_workers} "
+            "workers"
+        )
+        with ProcessPoolExecutor(
+                max_workers=n_workers,
+                initializer=init_worker,
+                initargs=(specs, settings)
+        ) as pool:
+            scores = list(pool.map(evaluate_fold, *zip(*tasks)))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    results = []
+    n_splits = settings['n_splits']
+    for i, params in enumerate(candidates):
+        folds = scores[i * n_splits:(i + 1) * n_splits]
+        auc = [fold['roc_auc'] for fold in folds]
+        results.append({
+            'params': params,
+            'roc_auc': float(np.mean(auc)),
+            'roc_auc_std': float(np.std(auc)),
+            'accuracy': float(np.mean([fold['accuracy'] for fold in folds])),
+            'latency_ms': float(
+                np.median([fold['latency_ms'] for fold in folds])
+            ),
+        })
+        logging.info(f"Candidate {params}: {results[-1]}")
+    return results
@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict
+
+from src.data.data import Data, load_config as load_data_config
+from src.model.engine import ModelEngine
+
+# Model and preprocessing pipeline of each scoring process worker
+worker_engine = None
+worker_pipeline = None
+
+
+def init_worker(model_name: str) -> None:
+    """
+    Load the model once in a scoring process worker.
+
+    Args:
+        model_name (str): File name of the model in the models folder.
+    """
+    global worker_engine, worker_pipeline
+    worker_pipeline = Data(load_data_config()).get_preprocessing_pipeline()
+    worker_engine = ModelEngine()
+    worker_engine.load_model(model_name)
+    # Parallelism comes from the pool, so every worker uses a single thread
+    if hasattr(worker_engine.model, 'n_jobs'):
+        worker_engine.model.n_jobs = 1
+
+
+def score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Predict the price category of a chunk of listings in a scoring worker.
+
+    Listings with missing features get the ``Unknown`` category.
+
+    Args:
+        chunk (pd.DataFrame): Listings with the ``id`` column and the model
+        features.
+
+    Returns:
+        pd.DataFrame: DataFrame with the ``id`` and ``price_category``
+        columns.
+    """
+    chunk = worker_pipeline.map_categorical_features(chunk)
+    x = chunk[worker_engine.get_features_names()]
+    valid = x.notna().all(axis=1).to_numpy()
+
+    categories = pd.Series('Unknown', index=chunk.index, dtype=object)
+    if valid.any():
+        preds = worker_engine.predict(x[valid]).astype(int)
+        categories[valid] = [
+            worker_pipeline.get_category_name(pred) for pred in preds
+        ]
+    return pd.DataFrame({'id': chunk['id'], 'price_category': categories})
+
+
+class BatchScorer:
+    """
+    Scores a CSV file of listings in chunks on a pool of processes, writing
+    the predictions incrementally and in input order.
+
+    After every chunk, the number of scored rows and the size of the output
+    file are saved in a ``.progress`` file next to the output, together with
+    the input file and chunk size of the run, so that an interrupted run can
+    be resumed from the last completed chunk.
+    """
+
+    def __init__(
+            self,
+            model_name: str,
+            chunk_size: int = 50000,
+            n_workers: int = 4
+    ):
+        """
+        Initialize the BatchScorer.
+
+        Args:
+            model_name (str): File name of the model in the models folder.
+            chunk_size (int): Number of rows read and scored at once.
+            n_workers (int): Number of worker processes.
+        """
+        self.model_name = model_name
+        self.chunk_size = chunk_size
+        self.n_workers = n_workers
+
+    def get_progress_path(self, output_path: Path) -> Path:
+        return output_path.with_name(output_path.name + '.progress')
+
+    def get_run(self, input_path: Path) -> Dict[str, Any]:
+        """
+        Description of the input and settings of a run, which must match
+        for the run to be resumed.
+        """
+        stat = os.stat(input_path)
+        return {
+            'input': {
+                'path': str(Path(input_path).resolve()),
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+            },
+            'chunk_size': self.chunk_size,
+        }
+
+    def load_progress(
+            self,
+            input_path: Path,
+            output_path: Path
+    ) -> Dict[str, Any]:
+        """
+        Load the progress of a previous run and discard any output written
+        after its last completed chunk.
+
+        Args:
+            input_path (Path): Input file of the run.
+            output_path (Path): Output file of the run.
+
+        Returns:
+            Dict[str, Any]: Number of scored rows and bytes of output.
+
+        Raises:
+            ValueError: If the previous run had a different input file or
+            chunk size.
+        """
+        progress_path = self.get_progress_path(output_path)
+        if not progress_path.exists() or not output_path.exists():
+            return {'rows': 0, 'bytes': 0}
+
+        with open(progress_path, 'r') as f:
+            progress = json.load(f)
+        run = self.get_run(input_path)
+        previous = {key: progress.get(key) for key in run}
+        if previous != run:
+            logging.error(
+                f"Cannot resume: the previous run was {previous} and this "
+                f"one is {run}"
+            )
+            raise ValueError(
+                "The input file or chunk size changed since the previous run"
+            )
+
+        with open(output_path, 'r+b') as f:
+            f.truncate(progress['bytes'])
+        logging.info(f"Resuming after {progress['rows']} scored rows")
+        return progress
+
+    def reset_progress(self, output_path: Path) -> None:
+        self.get_progress_path(output_path).unlink(missing_ok=True)
+
+    def save_progress(self, output_path: Path, progress: Dict[str, Any]):
+        """
+        Atomically save the progress of the run.
+        """
+        progress_path = self.get_progress_path(output_path)
+        tmp_path = progress_path.with_name(progress_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(progress, f)
+        os.replace(tmp_path, progress_path)
+
+    def score(
+            self,
+            input_path: Path,
+            output_path: Path,
+            resume: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Score every listing of the input file.
+
+        Args:
+            input_path (Path): CSV file with the ``id`` column and the
+            model features.
+            output_path (Path): CSV file where the predictions are written.
+            resume (bool): Whether to continue a previous interrupted run
+            instead of starting from scratch. A run that does not resume
+            discards the progress of any previous one.
+
+        Returns:
+            Dict[str, Any]: Number of scored rows, elapsed seconds and rows
+            per second of this run.
+
+        Raises:
+            ValueError: If resuming a run with a different input file or
+            chunk size.
+        """
+        output_path = Path(output_path)
+        if resume:
+            progress = self.load_progress(input_path, output_path)
+        else:
+            self.reset_progress(output_path)
+            progress = {'rows': 0, 'bytes': 0}
+        run = self.get_run(input_path)
+        features = ModelEngine().get_features_names()
+        reader = pd.read_csv(
+            input_path,
+            usecols=['id'] + features,
+            chunksize=self.chunk_size,
+            skiprows=range(1, progress['rows'] + 1)
+        )
+
+        start = time.perf_counter()
+        rows = 0
+        mode = 'ab' if progress['bytes'] else 'wb'
+        with ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                initializer=init_worker,
+                initargs=(self.model_name,)
+        ) as pool, open(output_path, mode) as output:
+            pending = deque()
+            chunks = iter(reader)
+            exhausted = False
+            while pending or not exhausted:
+                # Keep every worker busy with a bounded number of chunks
+                while not exhausted and len(pending) < 2 * self.n_workers:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                    else:
+                        pending.append(pool.submit(score_chunk, chunk))
+                if not pending:
+                    break
+
+                result = pending.popleft().result()
+                header = progress['bytes'] == 0
+                output.write(
+                    result.to_csv(index=False, header=header).encode()
+                )
+                output.flush()
+                os.fsync(output.fileno())
+
+                rows += len(result)
+                progress = {
+                    'rows': progress['rows'] + len(result),
+                    'bytes': output.tell(),
+                    **run,
+                }
+                self.save_progress(output_path, progress)
+
+                elapsed = time.perf_counter() - start
+                logging.info(
+                    f"Scored {progress['rows']} rows "
+                    f"({rows / elapsed:.0f} rows/s)"
+                )
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            'rows': rows,
+            'seconds': elapsed,
+            'rows_per_second': rows / elapsed if elapsed > 0 else 0.0,
+        }
+        logging.info(f"Batch scoring completed: {stats}")
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score a CSV file of listings with a saved model."
+    )
+    parser.add_argument('--output', required=True, type=Path)
+    parser.add_argument(
+        '--input',
+        type=Path,
+        help="CSV file of listings. Defaults to the clean dataset."
+    )
+    parser.add_argument('--model', default='simple_classifier.pkl')
+    parser.add_argument('--resume', action='store_true')
+    args = parser.parse_args(argv)
+
+    scoring_config = ModelEngine().config.get('batch_scoring', {})
+    input_path = args.input or Data(load_data_config()).path_clean
+
+    scorer = BatchScorer(
+        args.model,
+        chunk_size=scoring_config.get('chunk_size', 50000),
+        n_workers=scoring_config.get('n_workers', 4)
+    )
+    stats = scorer.score(input_path, args.output, resume=args.resume)
+    print(
+        f"Scored {stats['rows']} rows in {stats['seconds']:.1f}s "
+        f"({stats['rows_per_second']:.0f} rows/s)"
+    )
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
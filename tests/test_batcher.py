@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+from app.classes.batcher import MicroBatcher
+
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.batches = []
+
+    def process_batch(self, items):
+        self.batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def test_coalesces_concurrent_requests(self):
+        batcher = MicroBatcher(
+            self.process_batch, max_batch_size=64, max_wait_ms=50
+        )
+        results = await asyncio.gather(
+            *[batcher.submit(i) for i in range(10)]
+        )
+        await batcher.close()
+
+        self.assertEqual(results, [i * 2 for i in range(10)])
+        self.assertEqual(len(self.batches), 1)
+
+    async def test_max_batch_size(self):
+        batcher = MicroBatcher(
+            self.process_batch, max_batch_size=4, max_wait_ms=50
+        )
+        results = await asyncio.gather(
+            *[batcher.submit(i) for i in range(10)]
+        )
+        await batcher.close()
+
+        self.assertEqual(results, [i * 2 for i in range(10)])
+        self.assertEqual([len(b) for b in self.batches], [4, 4, 2])
+
+    async def test_errors_are_propagated(self):
+        def failing_batch(items):
+            raise RuntimeError("model failure")
+
+        batcher = MicroBatcher(failing_batch, max_wait_ms=1)
+        with self.assertRaises(RuntimeError):
+            await batcher.submit(1)
+
+        # The worker keeps serving after a failed batch
+        batcher.process_batch = self.process_batch
+        self.assertEqual(await batcher.submit(3), 6)
+        await batcher.close()
+
+    async def check_concurrency(self, max_concurrency):
+        running, peak = 0, 0
+
+        async def slow_batch(items):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(
+            slow_batch, max_batch_size=2, max_wait_ms=1,
+            max_concurrency=max_concurrency
+        )
+        results = await asyncio.gather(
+            *[batcher.submit(i) for i in range(12)]
+        )
+        await batcher.close()
+
+        self.assertEqual(results, [i * 2 for i in range(12)])
+        return peak
+
+    async def test_concurrent_batches(self):
+        self.assertEqual(await self.check_concurrency(1), 1)
+        self.assertEqual(await self.check_concurrency(4), 4)
+
+    async def test_close_cancels_pending_callers(self):
+        async def endless_batch(items):
+            await asyncio.sleep(3600)
+
+        batcher = MicroBatcher(endless_batch, max_wait_ms=1)
+        caller = asyncio.create_task(batcher.submit(1))
+        await asyncio.sleep(0.01)
+        await batcher.close()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await caller
+
+
+if __name__ == '__main__':
+    unittest.main()
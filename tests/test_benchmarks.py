@@ -0,0 +1,116 @@
+import unittest
+from benchmarks.load_test import build_report, check_error_rate, summarize
+from benchmarks.serving import compare
+
+
+def result(p50_ms, state='warm', caches='uncached', batch_size=100):
+    row = {
+        'target': 'engine',
+        'state': state,
+        'batch_size': batch_size,
+        'p50_ms': p50_ms,
+        'p99_ms': p50_ms * 2,
+    }
+    if caches is not None:
+        row['caches'] = caches
+    return row
+
+
+class TestServingCompare(unittest.TestCase):
+    def test_regression(self):
+        baseline = [result(10.0), result(10.0, batch_size=1)]
+        regressions = compare(
+            [result(12.0), result(13.0, batch_size=1)], baseline, 0.25
+        )
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(
+            regressions[0].startswith('engine/uncached/warm/1 p50_ms: 13.00')
+        )
+        self.assertIn('p99_ms', regressions[1])
+        self.assertEqual(compare([result(12.5)], baseline, 0.25), [])
+
+    def test_skipped_results(self):
+        baseline = [
+            result(10.0, state='cold'),
+            result(10.0, caches='cached'),
+        ]
+        results = [
+            result(100.0, state='cold'),
+            result(100.0, caches='cached'),
+            # Not in the baseline
+            result(100.0, batch_size=1000),
+        ]
+        self.assertEqual(compare(results, baseline, 0.25), [])
+
+    def test_legacy_baseline(self):
+        # Results stored without caches were measured with the cache and
+        # lookup table of model.yaml, so they are not compared
+        baseline = [result(1.0, caches=None)]
+        self.assertEqual(compare([result(100.0)], baseline, 0.25), [])
+        self.assertEqual(
+            len(compare([result(100.0)], [result(1.0)], 0.25)), 2
+        )
+
+
+def record(time, latency, status=200, rows=1):
+    return {'time': time, 'latency': latency, 'status': status, 'rows': rows}
+
+
+class TestLoadTestReport(unittest.TestCase):
+    def test_summarize(self):
+        records = [
+            record(0.5, 0.010),
+            record(1.0, 0.020, rows=10),
+            record(1.5, 0.030, status=503),
+            # No response received
+            record(2.0, 0.040, status=0),
+        ]
+        summary = summarize(records, 2.0)
+
+        self.assertEqual(summary['requests'], 4)
+        self.assertEqual(summary['requests_per_second'], 2.0)
+        self.assertEqual(summary['rows_per_second'], 6.5)
+        self.assertEqual(summary['error_rate'], 0.5)
+        self.assertEqual(summary['statuses'], {'200': 2, '503': 1, '0': 1})
+        self.assertAlmostEqual(summary['p50_ms'], 25.0)
+        self.assertAlmostEqual(summary['max_ms'], 40.0)
+        self.assertEqual(summarize([], 1.0), {'requests': 0})
+
+    def test_build_report(self):
+        records = [
+            record(0.2, 0.01),
+            record(0.9, 0.01),
+            record(1.1, 0.01, status=0),
+            record(2.5, 0.01),
+        ]
+        report = build_report(records, interval=1.0)
+        timeline = report['timeline']
+
+        self.assertEqual([window['start'] for window in timeline], [0, 1, 2])
+        self.assertEqual(
+            [window['requests'] for window in timeline], [2, 1, 1]
+        )
+        self.assertEqual(timeline[1]['error_rate'], 1.0)
+        # The last window only lasts until the last completion, 0.5 s
+        self.assertEqual(timeline[2]['requests_per_second'], 2.0)
+        self.assertEqual(report['total']['requests_per_second'], 4 / 2.5)
+        self.assertEqual(report['total']['error_rate'], 0.25)
+
+        # Empty windows and runs are reported without statistics
+        report = build_report([record(0.5, 0.01), record(2.5, 0.01)], 1.0)
+        self.assertEqual(report['timeline'][1], {'start': 1.0, 'requests': 0})
+        self.assertEqual(build_report([], 1.0)['total'], {'requests': 0})
+
+    def test_check_error_rate(self):
+        report = build_report(
+            [record(0.5, 0.01), record(0.6, 0.01, status=0)], 1.0
+        )
+        self.assertEqual(check_error_rate(report, 0.0), 1)
+        self.assertEqual(check_error_rate(report, 0.5), 0)
+        # A run without any completed request fails
+        self.assertEqual(check_error_rate(build_report([], 1.0), 0.5), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import time
+import unittest
+from src.model.cache import PredictionCache
+
+
+class TestPredictionCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = PredictionCache(max_size=10)
+        cache.put_many([(1.0, 2.0)], [3])
+
+        found, missing = cache.get_many([(1.0, 2.0), (2.0, 2.0)])
+        self.assertEqual(found, {0: 3})
+        self.assertEqual(missing, [1])
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_lru_eviction(self):
+        cache = PredictionCache(max_size=2)
+        cache.put_many([(1,), (2,)], [1, 2])
+
+        # Access (1,) so that (2,) becomes the least recently used entry
+        cache.get_many([(1,)])
+        cache.put_many([(3,)], [3])
+
+        found, missing = cache.get_many([(1,), (2,), (3,)])
+        self.assertEqual(found, {0: 1, 2: 3})
+        self.assertEqual(missing, [1])
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_ttl(self):
+        cache = PredictionCache(max_size=10, ttl=0.01)
+        cache.put_many([(1,)], [1])
+        time.sleep(0.02)
+
+        found, missing = cache.get_many([(1,)])
+        self.assertEqual(found, {})
+        self.assertEqual(missing, [0])
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_clear(self):
+        cache = PredictionCache(max_size=10)
+        cache.put_many([(1,)], [1])
+        cache.clear()
+        self.assertEqual(cache.stats()['size'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
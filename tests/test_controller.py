@@ -0,0 +1,240 @@
+import json
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.classes import responses
+from app.classes.controller import APIController
+from app.classes.data_types import BatchInputData
+from app.utils import load_api_config
+from src.model.registry import ModelRegistry
+
+
+class TestAPIController(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.controller = APIController(load_api_config())
+
+    async def asyncTearDown(self):
+        await self.controller.close()
+
+    async def test_ready_after_warm_up(self):
+        with self.assertRaises(HTTPException) as context:
+            await self.controller.ready()
+        self.assertEqual(context.exception.status_code, 503)
+
+        await self.controller.warm_up()
+        self.assertEqual(
+            await self.controller.ready(), {"status": "ready"}
+        )
+
+    async def test_failed_warm_up(self):
+        with mock.patch.object(
+            self.controller, 'run_prediction', side_effect=RuntimeError
+        ):
+            task = asyncio.create_task(self.controller.warm_up())
+            task.add_done_callback(self.controller.on_warm_up_done)
+            with self.assertLogs('app.classes.controller', 'ERROR'):
+                await asyncio.wait([task])
+                # Done callbacks run on the next iteration of the loop
+                await asyncio.sleep(0)
+
+        with self.assertRaises(HTTPException) as context:
+            await self.controller.ready()
+        self.assertEqual(context.exception.detail, "Warm-up failed")
+
+    def test_warm_up_items(self):
+        items = self.controller.build_warm_up_items(20)
+        items += self.controller.build_warm_up_items(20, start=20)
+        rows = {tuple(row) for row in self.controller.feature_assembler
+                .assemble(items).tolist()}
+
+        # Every item is a different row, off the lookup table grid
+        self.assertEqual(len(rows), 40)
+        self.assertTrue(all(item.bathrooms % 0.5 for item in items))
+
+    async def test_batch_prediction(self):
+        items = self.controller.build_warm_up_items(10)
+        response = await self.controller.predict(BatchInputData(data=items))
+
+        self.assertEqual(
+            [result.id for result in response.results],
+            [item.id for item in items]
+        )
+        for result in response.results:
+            self.assertIn(
+                result.price_category,
+                ['Low', 'Medium', 'High', 'Very High']
+            )
+
+    async def test_encoded_batch_prediction(self):
+        items = self.controller.build_warm_up_items(50)
+        for item in items:
+            item.id = item.id * 1000003
+        expected = JSONResponse(jsonable_encoder(
+            await self.controller.predict(BatchInputData(data=items))
+        )).body
+
+        response = await self.controller.predict(
+            BatchInputData(data=items), encode=True
+        )
+        self.assertEqual(response.media_type, 'application/json')
+        self.assertEqual(response.body, expected)
+
+        # Same output without orjson
+        with mock.patch.object(responses, 'orjson', None):
+            response = await self.controller.predict(
+                BatchInputData(data=items), encode=True
+            )
+        self.assertEqual(response.body, expected)
+
+        # Ids that do not fit in 64 bits
+        items[0].id = 2 ** 64
+        items[1].id = -2 ** 70
+        expected = JSONResponse(jsonable_encoder(
+            await self.controller.predict(BatchInputData(data=items))
+        )).body
+        response = await self.controller.predict(
+            BatchInputData(data=items), encode=True
+        )
+        self.assertEqual(response.body, expected)
+        self.assertIn(b'"id":18446744073709551616', response.body)
+
+    async def test_predict_stream(self):
+        self.controller.api_config = dict(
+            self.controller.api_config, streaming={'chunk_size': 4}
+        )
+        items = self.controller.build_warm_up_items(10)
+        lines = [item.model_dump_json() for item in items]
+        lines.insert(5, '{"id": 1}')
+        body = ('\n'.join(lines) + '\n').encode()
+
+        async def stream():
+            # Chunks that split records in arbitrary places
+            for start in range(0, len(body), 100):
+                yield body[start:start + 100]
+
+        output = b''.join([
+            chunk async for chunk in self.controller.predict_stream(stream())
+        ])
+        records = [json.loads(line) for line in output.splitlines()]
+
+        self.assertEqual(len(records), 11)
+        self.assertEqual(records[5]['line'], 6)
+        self.assertIn('error', records[5])
+        results = records[:5] + records[6:]
+        self.assertEqual(
+            [result['id'] for result in results],
+            [item.id for item in items]
+        )
+
+    async def test_predict_stream_invalid_chunks(self):
+        self.controller.api_config = dict(
+            self.controller.api_config,
+            streaming={'chunk_size': 4, 'max_line_size': 1000}
+        )
+        item = self.controller.build_warm_up_items(1)[0].model_dump_json()
+        # A chunk without valid records, a line without newline that is
+        # longer than the limit and a valid record
+        lines = [b'{"id": 1}'] * 4 + [b'x' * 5000, item.encode()]
+        body = b'\n'.join(lines)
+
+        async def stream():
+            for start in range(0, len(body), 100):
+                yield body[start:start + 100]
+
+        output = b''.join([
+            chunk async for chunk in self.controller.predict_stream(stream())
+        ])
+        records = [json.loads(line) for line in output.splitlines()]
+
+        self.assertEqual(len(records), 6)
+        self.assertTrue(all('error' in record for record in records[:5]))
+        self.assertEqual(records[4]['line'], 5)
+        self.assertIn('longer than 1000 bytes', records[4]['error'])
+        self.assertEqual(records[5]['id'], 0)
+
+    async def test_swap_model(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # The artifacts are next to the manifest, not in paths.model
+            model_dir = self.controller.model.get_model_path('.').resolve()
+            for name in ('simple_classifier.pkl', 'simple_classifier.mmap'):
+                (Path(tmp_dir) / name).symlink_to(model_dir / name)
+            registry = ModelRegistry(Path(tmp_dir) / 'registry.json')
+            registry.register('pickle', {'pickle': 'simple_classifier.pkl'})
+            registry.register('mmap', {'mmap': 'simple_classifier.mmap'})
+            registry.register('missing', {'pickle': 'missing.pkl'})
+            self.controller.registry = registry
+
+            items = self.controller.build_warm_up_items(20)
+            before = await self.controller.predict(BatchInputData(data=items))
+            old_model = self.controller.model
+
+            # A prediction in flight while the model is swapped
+            in_flight = self.controller.run_prediction(items)
+            status, predictions = await asyncio.gather(
+                self.controller.swap_model(2), in_flight
+            )
+            self.assertEqual(
+                status, {'version': 2, 'model': 'simple_classifier.mmap'}
+            )
+            self.assertEqual(
+                predictions,
+                [result.price_category for result in before.results]
+            )
+
+            self.assertIsNot(self.controller.model, old_model)
+            self.assertEqual(
+                self.controller.model.model_file,
+                str(Path(tmp_dir) / 'simple_classifier.mmap')
+            )
+            self.assertEqual(old_model.model_file, 'simple_classifier.pkl')
+            self.assertEqual(registry.get('active')['version'], 2)
+
+            after = await self.controller.predict(BatchInputData(data=items))
+            self.assertEqual(after, before)
+
+            listing = await self.controller.list_models()
+            self.assertEqual(listing['serving']['version'], 2)
+            self.assertEqual(listing['serving']['model'],
+                             'simple_classifier.mmap')
+            self.assertEqual(len(listing['versions']), 3)
+
+            for version in ('7', 'latest'):
+                with self.assertRaises(HTTPException) as context:
+                    await self.controller.activate_model(version)
+                self.assertEqual(context.exception.status_code, 404)
+            self.assertEqual(self.controller.model_version, 2)
+
+    async def test_swap_model_failed_warm_up(self):
+        self.controller.api_config = dict(
+            self.controller.api_config,
+            executor={'type': 'process', 'max_workers': 1}
+        )
+        executor = mock.Mock(run=mock.AsyncMock(side_effect=RuntimeError))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_dir = self.controller.model.get_model_path('.').resolve()
+            (Path(tmp_dir) / 'simple_classifier.pkl').symlink_to(
+                model_dir / 'simple_classifier.pkl'
+            )
+            registry = ModelRegistry(Path(tmp_dir) / 'registry.json')
+            registry.register('pickle', {'pickle': 'simple_classifier.pkl'})
+            self.controller.registry = registry
+
+            with mock.patch.object(
+                self.controller, 'build_executor', return_value=executor
+            ):
+                with self.assertRaises(RuntimeError):
+                    await self.controller.swap_model(1)
+
+        # The new workers are stopped and the current ones keep serving
+        executor.shutdown.assert_called_once()
+        self.assertIsNot(self.controller.executor, executor)
+        self.assertIsNone(self.controller.model_version)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,11 @@
 import yaml
+import tempfile
 import unittest
 import numpy as np
 import pandas as pd
 from pathlib import Path
 from src.data.data import Data, load_config
+from src.data.amenities import AmenityEncoder
 
 
 def load_test_config():
@@ -58,17 +60,162 @@ class TestData(unittest.TestCase):
 
     def test_load_clean(self):
         clean_path = self.base_path / self.config['paths']['clean']
-        df_test = pd.read_csv(clean_path, index_col='Unnamed: 0').fillna(0)
+        df_test = pd.read_csv(clean_path, index_col='Unnamed: 0')
+        pipeline = self.data.preprocessing_pipeline
+        df_test = pipeline.apply_dtype_plan(df_test).astype(object)
+        df_test = df_test.where(df_test.notna(), 0)
 
         # Call the load_clean function
-        result = self.data.load_clean().fillna(0)
+        result = self.data.load_clean()
+        self.assertEqual(result['neighbourhood'].dtype, 'category')
+        self.assertEqual(result['accommodates'].dtype, np.uint8)
+        self.assertEqual(result['latitude'].dtype, np.float32)
+        self.assertEqual(result['TV'].dtype, np.uint8)
+        result = result.astype(object)
+        result = result.where(result.notna(), 0)
 
         equals = (result == df_test).all(axis=1).all()
         self.assertTrue(equals)
 
-        result = self.data.preprocessing_pipeline.map_categorical_features(
-            result
-        )
+        result = pipeline.map_categorical_features(self.data.load_clean())
 
         self.assertEqual(result['room_type'].dtype, np.int64)
         self.assertEqual(result['neighbourhood'].dtype, np.int64)
+
+    def test_load_clean_chunks(self):
+        expected = self.data.load_clean(map_categorical_features=True)
+
+        # Use a chunk size that does not divide the number of rows
+        chunks = list(self.data.load_clean_chunks(
+            map_categorical_features=True, chunk_size=7000
+        ))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= 7000 for chunk in chunks))
+
+        result = self.data.preprocessing_pipeline.concat_chunks(chunks)
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_clean_parallel(self):
+        raw = self.data.load_raw()
+        pipeline = self.data.preprocessing_pipeline
+        expected = pipeline.clean(raw.copy(), map_categorical_features=True)
+
+        result = pipeline.clean_parallel(
+            raw, n_workers=3, map_categorical_features=True
+        )
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_profile(self):
+        raw = self.data.load_raw()
+        pipeline = self.data.preprocessing_pipeline
+        expected = pipeline.clean(raw.copy())
+
+        result, report = pipeline.profile(raw, trace_memory=True)
+        pd.testing.assert_frame_equal(result, expected)
+
+        stages = report['stages']
+        self.assertEqual(
+            [stage['stage'] for stage in stages],
+            [name for name, _ in pipeline.get_stages()]
+        )
+        # Every stage starts from the output of the previous one
+        for previous, stage in zip(stages, stages[1:]):
+            self.assertEqual(stage['rows_in'], previous['rows_out'])
+            self.assertEqual(stage['memory_in'], previous['memory_out'])
+        self.assertTrue(all(stage['peak_allocated'] > 0 for stage in stages))
+        self.assertEqual(report['total']['rows_in'], len(raw))
+        self.assertEqual(report['total']['rows_out'], len(expected))
+
+
+class TestAmenityEncoder(unittest.TestCase):
+    def setUp(self):
+        self.amenities = pd.Series([
+            '["TV", "Wifi", "Kitchen"]',
+            '["Cable TV", "Wifi", "Wifi"]',
+            np.nan,
+            '[]',
+        ])
+
+    def test_exact_matching(self):
+        encoder = AmenityEncoder(vocabulary=['TV', 'Wifi', 'Cable TV'])
+        result = encoder.fit_transform(self.amenities)
+
+        expected = np.array([
+            [1, 1, 0],
+            [0, 1, 1],
+            [0, 0, 0],
+            [0, 0, 0],
+        ], dtype=np.uint8)
+        self.assertEqual(result.dtype, np.uint8)
+        np.testing.assert_array_equal(result.toarray(), expected)
+        self.assertEqual(
+            encoder.get_feature_names(), ['TV', 'Wifi', 'Cable_TV']
+        )
+
+    def test_fixed_vocabulary(self):
+        # A fixed vocabulary is kept by fit, whatever top_n is
+        encoder = AmenityEncoder(vocabulary=['Kitchen', 'TV'], top_n=1)
+        encoder.fit(self.amenities)
+        self.assertEqual(encoder.vocabulary, ['Kitchen', 'TV'])
+        self.assertEqual(
+            encoder.transform(self.amenities).toarray()[0].tolist(), [1, 1]
+        )
+
+    def test_top_n_vocabulary(self):
+        encoder = AmenityEncoder(top_n=2, sparse=False)
+        result = encoder.fit_transform(self.amenities)
+
+        # Wifi is the most frequent amenity and ties are sorted by name
+        self.assertEqual(encoder.vocabulary, ['Wifi', 'Cable TV'])
+        self.assertIsInstance(result, np.ndarray)
+        self.assertEqual(result.shape, (4, 2))
+        self.assertEqual(result[:, 0].tolist(), [1, 1, 0, 0])
+
+    def test_raw_data(self):
+        data = Data(load_config())
+        raw = data.load_raw()
+        pipeline = data.preprocessing_pipeline
+
+        result = pipeline.encode_amenities(raw)
+        self.assertEqual(result.shape[0], len(raw))
+        self.assertLessEqual(
+            result.shape[1], pipeline.amenities_encoding['top_n']
+        )
+
+
+class TestCleanDataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = load_config()
+        self.config['cache'] = {
+            'enabled': True, 'dir': self.tmp_dir.name, 'format': 'npz'
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        data = Data(self.config)
+        expected = data.load_clean(use_cache=False)
+
+        # The first load fills the cache and the second one reads it
+        pd.testing.assert_frame_equal(data.load_clean(), expected)
+        path = data.cache.get_path(data.get_fingerprint())
+        self.assertTrue(path.exists())
+        pd.testing.assert_frame_equal(data.load_clean(), expected)
+
+        result = data.load_clean(map_categorical_features=True)
+        self.assertEqual(result['room_type'].dtype, np.int64)
+
+    def test_invalidation(self):
+        data = Data(self.config)
+        data.load_clean()
+        fingerprint = data.get_fingerprint()
+
+        self.config['preprocessing']['min_price'] += 1
+        data = Data(self.config)
+        self.assertNotEqual(data.get_fingerprint(), fingerprint)
+
+        data.load_clean()
+        files = list(Path(self.tmp_dir.name).iterdir())
+        self.assertEqual(files, [data.cache.get_path(data.get_fingerprint())])
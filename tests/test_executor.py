@@ -0,0 +1,110 @@
+import time
+import asyncio
+import unittest
+from app.classes.controller import APIController
+from app.classes.data_types import BatchInputData
+from app.classes.executor import InferenceExecutor, ExecutorBusyError
+from app.utils import load_api_config
+
+
+def slow_square(x, delay=0.5):
+    # Simulates a CPU-bound evaluation of a large batch
+    time.sleep(delay)
+    return x * x
+
+
+class TestInferenceExecutor(unittest.IsolatedAsyncioTestCase):
+    async def heartbeat(self, stop):
+        # Largest gap between ticks of a task scheduled every 10 ms
+        max_gap = 0
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            max_gap = max(max_gap, now - last)
+            last = now
+        return max_gap
+
+    async def check_event_loop_responsive(self, executor):
+        stop = asyncio.Event()
+        heartbeat = asyncio.create_task(self.heartbeat(stop))
+        result = await executor.run(3)
+        stop.set()
+        max_gap = await heartbeat
+        executor.shutdown()
+
+        self.assertEqual(result, 9)
+        self.assertLess(max_gap, 0.2)
+
+    async def test_thread_pool_keeps_event_loop_responsive(self):
+        executor = InferenceExecutor(slow_square, 'thread', max_workers=1)
+        await self.check_event_loop_responsive(executor)
+
+    async def test_process_pool_keeps_event_loop_responsive(self):
+        executor = InferenceExecutor(slow_square, 'process', max_workers=1)
+        await self.check_event_loop_responsive(executor)
+
+    async def test_queue_limit(self):
+        executor = InferenceExecutor(
+            slow_square, 'thread', max_workers=1, max_queue_size=1
+        )
+        tasks = [asyncio.create_task(executor.run(i)) for i in range(2)]
+        await asyncio.sleep(0)
+
+        with self.assertRaises(ExecutorBusyError):
+            await executor.run(2)
+
+        self.assertEqual(await asyncio.gather(*tasks), [0, 1])
+        executor.shutdown()
+
+    def test_invalid_type(self):
+        with self.assertRaises(ValueError):
+            InferenceExecutor(slow_square, 'gpu')
+
+
+class TestControllerExecutor(unittest.IsolatedAsyncioTestCase):
+    async def welcome_loop(self, controller, stop):
+        # Largest gap between calls of the / handler scheduled every 10 ms
+        max_gap, calls = 0, 0
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.01)
+            await controller.welcome()
+            now = time.perf_counter()
+            max_gap = max(max_gap, now - last)
+            last = now
+            calls += 1
+        return max_gap, calls
+
+    async def check_welcome_served(self, executor_type):
+        controller = APIController(dict(
+            load_api_config(),
+            executor={'type': executor_type, 'max_workers': 1},
+            warm_up={'batch_size': 8, 'repetitions': 1}
+        ))
+        await controller.warm_up()
+        batch = BatchInputData(data=controller.build_warm_up_items(20000))
+        # The first response of this size is slower to build on the loop
+        await controller.predict(batch, encode=True)
+
+        stop = asyncio.Event()
+        welcome = asyncio.create_task(self.welcome_loop(controller, stop))
+        # The predictions of this batch take hundreds of milliseconds
+        response = await controller.predict(batch, encode=True)
+        stop.set()
+        max_gap, calls = await welcome
+        await controller.close()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(calls, 5)
+        self.assertLess(max_gap, 0.2)
+
+    async def test_thread_executor_serves_welcome(self):
+        await self.check_welcome_served('thread')
+
+    async def test_process_executor_serves_welcome(self):
+        await self.check_welcome_served('process')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+import pandas as pd
+from app.classes.data_types import InputData, Neighbourhood, RoomType
+from app.classes.features import FeatureAssembler
+from src.data.data import PreprocessingPipeline, load_config
+from src.model.engine import load_config as load_model_config
+
+
+class TestFeatureAssembler(unittest.TestCase):
+    def setUp(self):
+        self.pipeline = PreprocessingPipeline(load_config())
+        self.features = load_model_config()['features']
+        self.assembler = FeatureAssembler(
+            self.features,
+            {
+                'room_type': self.pipeline.mapping_room_type,
+                'neighbourhood': self.pipeline.mapping_neighbourhood,
+            },
+            initial_size=2
+        )
+
+        rng = np.random.default_rng(0)
+        neighbourhoods = list(Neighbourhood)
+        room_types = list(RoomType)[::-1]
+        self.items = [
+            InputData(
+                id=i,
+                neighbourhood=neighbourhoods[i % len(neighbourhoods)],
+                room_type=room_types[i % len(room_types)],
+                accommodates=int(rng.integers(1, 10)),
+                bathrooms=float(rng.integers(0, 8)) / 2,
+                bedrooms=int(rng.integers(1, 5)),
+                beds=int(rng.integers(1, 5)),
+                tv=int(rng.integers(0, 2)),
+                elevator=int(rng.integers(0, 2)),
+                internet=int(rng.integers(0, 2)),
+                latitude=40.7,
+                longitude=-73.9
+            )
+            for i in range(20)
+        ]
+
+    def dataframe_features(self, items):
+        input_df = pd.DataFrame([item.dict() for item in items])
+        input_df = self.pipeline.map_categorical_features(input_df)
+        return input_df[self.features].to_numpy(dtype=np.float64)
+
+    def test_matches_dataframe_path(self):
+        np.testing.assert_array_equal(
+            self.assembler.assemble(self.items),
+            self.dataframe_features(self.items)
+        )
+
+    def test_buffer_reuse(self):
+        # The buffer grows for large batches and is reused for small ones
+        self.assembler.assemble(self.items)
+        x = self.assembler.assemble(self.items[:3])
+        self.assertEqual(x.shape, (3, len(self.features)))
+        np.testing.assert_array_equal(
+            x, self.dataframe_features(self.items[:3])
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import io
+import logging
+import unittest
+import threading
+from app.classes.logs import LogSampler, SampledLogging, request_sampler
+from app.classes.metrics import Metrics
+
+
+class TestLogSampler(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('test_logs')
+        self.logger.setLevel(logging.INFO)
+
+    def test_sampling(self):
+        sampler = LogSampler(rate=0.1, seed=0)
+        with self.assertLogs(self.logger) as logs:
+            for i in range(1000):
+                sampler.info(self.logger, f"Request {i}")
+            # Errors are logged directly and are never sampled
+            self.logger.error("Request failed")
+
+        written = len(logs.records) - 1
+        self.assertTrue(50 < written < 150)
+        self.assertEqual(logs.records[-1].getMessage(), "Request failed")
+        self.assertEqual(sampler.pop_counts(), {'test_logs': [1000, written]})
+        self.assertEqual(sampler.pop_counts(), {})
+
+    def test_rates(self):
+        sampler = LogSampler(rate=0.0)
+        with self.assertNoLogs(self.logger):
+            sampler.info(self.logger, "Request")
+
+        sampler.rate = 1.0
+        with self.assertLogs(self.logger) as logs:
+            sampler.info(self.logger, "Request")
+        self.assertEqual(logs.output, ['INFO:test_logs:Request'])
+
+        # Disabled records are neither sampled nor counted
+        sampler.pop_counts()
+        self.logger.setLevel(logging.WARNING)
+        sampler.info(self.logger, "Request")
+        self.assertEqual(sampler.pop_counts(), {})
+
+
+class TestSampledLogging(unittest.TestCase):
+    def setUp(self):
+        root = logging.getLogger()
+        self.root_state = root.handlers[:], root.level
+        self.stream = io.StringIO()
+        self.sampled_logging = SampledLogging(
+            {'sample_rate': 1.0, 'summary_interval_s': 3600},
+            stream=self.stream
+        )
+        self.logger = logging.getLogger('test_logs')
+        self.logger.setLevel(logging.INFO)
+        # Threads that wrote the records
+        self.threads = []
+        self.sampled_logging.stream_handler.addFilter(
+            lambda record: self.threads.append(threading.current_thread())
+            or True
+        )
+
+    def tearDown(self):
+        self.sampled_logging.stop()
+        root = logging.getLogger()
+        root.handlers[:], level = self.root_state
+        root.setLevel(level)
+        request_sampler.pop_counts()
+
+    def test_queue(self):
+        self.sampled_logging.start()
+        self.sampled_logging.start()
+        self.assertEqual(
+            logging.getLogger().handlers, [self.sampled_logging.queue_handler]
+        )
+
+        request_sampler.info(self.logger, "Request")
+        try:
+            raise ValueError("Invalid input")
+        except ValueError:
+            self.logger.exception("Prediction failed")
+        self.sampled_logging.stop()
+        self.sampled_logging.stop()
+
+        # Records are written by the listener thread
+        self.assertEqual(len(self.threads), 3)
+        self.assertNotIn(threading.current_thread(), self.threads)
+
+        lines = self.stream.getvalue().splitlines()
+        self.assertEqual(lines[0], "INFO:test_logs: Request")
+        self.assertEqual(lines[1], "ERROR:test_logs: Prediction failed")
+        self.assertEqual(lines[2], "Traceback (most recent call last):")
+        self.assertEqual(lines[4], '    raise ValueError("Invalid input")')
+        self.assertEqual(lines[-2], "ValueError: Invalid input")
+        self.assertEqual(
+            lines[-1],
+            "INFO:app.classes.logs: Per-request log records since the last "
+            "summary: test_logs: 1 (1 written)"
+        )
+
+    def test_request_summary(self):
+        # Requests before the logging starts are not summarized
+        metrics = Metrics()
+        metrics.observe_request('predict', 200, 0.002)
+        sampled_logging = SampledLogging(
+            {'sample_rate': 0.0}, stream=self.stream, metrics=metrics
+        )
+        self.assertIsNone(sampled_logging.summarize_requests())
+
+        for _ in range(97):
+            metrics.observe_request('predict', 200, 0.002)
+        metrics.observe_request('predict', 422, 0.0002)
+        metrics.observe_request('predict_batch', 500, 0.02)
+        metrics.observe_request('welcome', 200, 0.0002)
+        with self.assertLogs('app.classes.logs') as logs:
+            sampled_logging.log_summary()
+        self.assertEqual(logs.output, [
+            "INFO:app.classes.logs:Requests since the last summary: 100 "
+            "(2 errors, 2.00%), latency mean 2.14 ms, p50 <= 2.5 ms, "
+            "p99 <= 2.5 ms"
+        ])
+
+        # The next summary only covers the new requests
+        self.assertIsNone(sampled_logging.summarize_requests())
+        metrics.observe_request('predict', 200, 0.002)
+        self.assertEqual(
+            sampled_logging.summarize_requests(),
+            "1 (0 errors, 0.00%), latency mean 2.00 ms, p50 <= 2.5 ms, "
+            "p99 <= 2.5 ms"
+        )
+        # The summary of the fixture has no metrics
+        self.assertIsNone(self.sampled_logging.summarize_requests())
+
+    def test_direct_before_start_and_after_stop(self):
+        self.logger.warning("Before start")
+        self.sampled_logging.start()
+        self.sampled_logging.stop()
+        self.logger.warning("After stop")
+
+        self.assertEqual(self.threads, [threading.current_thread()] * 2)
+        self.assertEqual(
+            self.stream.getvalue().splitlines(),
+            [
+                "WARNING:test_logs: Before start",
+                "WARNING:test_logs: After stop"
+            ]
+        )
+        self.assertEqual(
+            logging.getLogger().handlers,
+            [self.sampled_logging.stream_handler]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
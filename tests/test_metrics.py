@@ -0,0 +1,84 @@
+import unittest
+from app.classes.metrics import Counter, Histogram, Metrics, \
+    MetricsMiddleware, bucket_quantile
+
+
+async def endpoint(scope, receive, send):
+    # Minimal ASGI app standing in for a routed endpoint
+    scope['endpoint'] = endpoint
+    scope.setdefault('state', {})['handler_start'] = 0.0
+    scope['state']['handler_end'] = 0.0
+    await send({'type': 'http.response.start', 'status': 422})
+    await send({'type': 'http.response.body', 'body': b'{}'})
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    def test_histogram(self):
+        histogram = Histogram('latency', 'Latency.', [0.1, 1.0], ('stage',))
+        for value in [0.05, 0.1, 0.5, 2.0]:
+            histogram.observe(value, ('inference',))
+
+        lines = histogram.render()
+        self.assertEqual(lines[1], '# TYPE latency histogram')
+        self.assertEqual(lines[2:], [
+            'latency_bucket{stage="inference",le="0.1"} 2',
+            'latency_bucket{stage="inference",le="1.0"} 3',
+            'latency_bucket{stage="inference",le="+Inf"} 4',
+            'latency_sum{stage="inference"} 2.65',
+            'latency_count{stage="inference"} 4',
+        ])
+
+        histogram.observe(0.5, ('features',))
+        counts, total = histogram.merged()
+        self.assertEqual(counts, [2, 2, 1])
+        self.assertAlmostEqual(total, 3.15)
+        self.assertEqual(bucket_quantile([0.1, 1.0], counts, 0.4), 0.1)
+        self.assertEqual(bucket_quantile([0.1, 1.0], counts, 0.5), 1.0)
+        self.assertEqual(
+            bucket_quantile([0.1, 1.0], counts, 0.99), float('inf')
+        )
+
+    def test_counter(self):
+        counter = Counter('requests_total', 'Requests.', ('status',))
+        counter.inc(1, (200,))
+        counter.inc(2, (200,))
+        counter.inc(1, ('a"b',))
+        self.assertEqual(counter.render()[2:], [
+            'requests_total{status="200"} 3',
+            'requests_total{status="a\\"b"} 1',
+        ])
+        self.assertEqual(counter.total(), 4)
+
+    def test_from_config(self):
+        self.assertIsNone(Metrics.from_config({}))
+        metrics = Metrics.from_config(
+            {'enabled': True, 'batch_size_buckets': [1, 10]}
+        )
+        self.assertEqual(metrics.batch_size.buckets, [1, 10])
+
+    async def test_middleware(self):
+        metrics = Metrics()
+        app = MetricsMiddleware(endpoint, metrics)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await app({'type': 'http'}, None, send)
+        self.assertEqual(len(sent), 2)
+
+        text = metrics.render()
+        self.assertIn(
+            'api_requests_total{endpoint="endpoint",status="422"} 1', text
+        )
+        self.assertIn('api_errors_total{status="422"} 1', text)
+        self.assertIn(
+            'api_stage_duration_seconds_count{stage="validation"} 1', text
+        )
+        self.assertIn(
+            'api_stage_duration_seconds_count{stage="serialization"} 1', text
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,15 @@
 import yaml
 import unittest
 import os
+import warnings
+import shutil
+import tempfile
+import numpy as np
 from pathlib import Path
 from src.model.engine import ModelEngine
+from src.model.compiled import CompiledForest
+from src.model.lookup import LookupTable
+from src.model.compaction import compact
 from src.data.data import Data, load_config
 from sklearn.model_selection import train_test_split
 
@@ -24,8 +31,13 @@ class TestModelEngine(unittest.TestCase):
         cls.original_files = set(
             file.name for file in cls.model_path.glob('*.pkl')
         )
+        cls.original_artifacts = set(
+            file.name for file in cls.model_path.glob('*.mmap')
+        )
 
         cls.model_engine = ModelEngine()
+        registry = cls.model_engine.get_registry()
+        cls.registry_manifest = registry.load() if registry else None
 
         # Load test data
         data_config = load_config()
@@ -89,10 +101,199 @@ class TestModelEngine(unittest.TestCase):
         res = self.model_engine.test(self.x_test, self.y_test)
         self.check_results(res)
 
+    def test_compiled_model(self):
+        self.model_engine.load_model(TEST_CONFIG['model_to_load'])
+        compiled = CompiledForest.from_sklearn(self.model_engine.model)
+
+        expected = self.model_engine.model.predict_proba(self.x_test)
+        np.testing.assert_allclose(
+            compiled.predict_proba(self.x_test), expected
+        )
+        np.testing.assert_array_equal(
+            compiled.predict(self.x_test),
+            self.model_engine.model.predict(self.x_test)
+        )
+        np.testing.assert_array_equal(
+            compiled.predict(self.x_test[:1]),
+            self.model_engine.model.predict(self.x_test[:1])
+        )
+
+    def test_prediction_cache(self):
+        self.model_engine.load_model(TEST_CONFIG['model_to_load'])
+        self.assertIsNotNone(self.model_engine.cache)
+
+        expected = self.model_engine.model.predict(self.x_test)
+        first = self.model_engine.predict(self.x_test)
+        second = self.model_engine.predict(self.x_test)
+        np.testing.assert_array_equal(first, expected)
+        np.testing.assert_array_equal(second, expected)
+
+        stats = self.model_engine.cache.stats()
+        self.assertEqual(stats['hits'], len(self.x_test))
+
+        self.model_engine.load_model(TEST_CONFIG['model_to_load'])
+        self.assertEqual(self.model_engine.cache.stats()['size'], 0)
+
+    def test_mmap_artifact(self):
+        self.model_engine.load_model(TEST_CONFIG['model_to_load'])
+        compiled = CompiledForest.from_sklearn(self.model_engine.model)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            compiled.save(tmp_dir)
+            loaded = CompiledForest.load(tmp_dir)
+
+            self.assertIsInstance(loaded.value, np.memmap)
+            self.assertFalse(loaded.value.flags.writeable)
+            np.testing.assert_array_equal(
+                loaded.predict(self.x_test),
+                self.model_engine.model.predict(self.x_test)
+            )
+            del loaded
+
+    def test_lookup_table(self):
+        self.model_engine.load_model(TEST_CONFIG['model_to_load'])
+        features = self.model_engine.get_features_names()
+        grid = self.model_engine.config['inference']['lookup_table']['grid']
+        table = LookupTable.build(
+            self.model_engine.predict_model,
+            features,
+            grid,
+            self.model_engine.model_fingerprint
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'table.lut.npz'
+            table.save(path)
+            table = LookupTable.load(path)
+        self.assertEqual(
+            table.fingerprint, self.model_engine.model_fingerprint
+        )
+
+        # Artifacts of the same model in different formats have their own
+        # table
+        self.assertEqual(
+            self.model_engine.get_lookup_table_path('model.pkl').name,
+            'model.pkl.lut.npz'
+        )
+        self.assertNotEqual(
+            self.model_engine.get_lookup_table_path('model.pkl'),
+            self.model_engine.get_lookup_table_path('model.mmap')
+        )
+
+        predictions, in_grid = table.lookup(self.x_test)
+        self.assertTrue(in_grid.mean() > 0.99)
+        np.testing.assert_array_equal(
+            predictions[in_grid],
+            self.model_engine.model.predict(self.x_test[in_grid])
+        )
+
+    def test_compaction(self):
+        self.model_engine.load_model(TEST_CONFIG['model_to_load'])
+        forest = self.model_engine.compiled_model
+        x_test = self.x_test.to_numpy(dtype=np.float32)
+
+        # Keeping every tree whole gives the same forest
+        np.testing.assert_array_equal(
+            forest.subset(range(forest.n_estimators)).predict_proba(x_test),
+            forest.predict_proba(x_test)
+        )
+
+        compact_forest, scores = compact(
+            self.model_engine,
+            self.x_test,
+            self.y_test,
+            accuracy_tolerance=0.01,
+            auc_tolerance=0.01,
+            max_depth=10
+        )
+        self.assertLess(compact_forest.n_estimators, forest.n_estimators)
+        self.assertLessEqual(compact_forest.max_depth, 10)
+        for name in ('accuracy', 'roc_auc'):
+            self.assertGreaterEqual(
+                scores['after'][name], scores['before'][name] - 0.01
+            )
+
     def test_retrain_and_save(self):
         results = self.model_engine.retrain_and_save(self.df_clean)
         self.check_results(results)
 
+    def test_incremental_retraining(self):
+        engine = self.model_engine
+        engine.load_model(TEST_CONFIG['model_to_load'])
+        n_trees = len(engine.model.estimators_)
+        x_new, y_new = self.x_train[:5000], self.y_train[:5000]
+
+        # Balanced class weights come from the full training target, so
+        # sklearn does not warn about presets with warm_start
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UserWarning)
+            engine.grow(
+                x_new, y_new, n_new_trees=10,
+                class_weight_target=self.y_train
+            )
+        self.assertEqual(len(engine.model.estimators_), n_trees + 10)
+        self.assertFalse(engine.model.warm_start)
+        self.assertEqual(engine.model.class_weight, 'balanced')
+
+        # Dropping the oldest trees keeps the size and the newest trees
+        newest = engine.model.estimators_[-10:]
+        engine.grow(
+            x_new, y_new, n_new_trees=10, drop_oldest=True,
+            class_weight_target=self.y_train
+        )
+        self.assertEqual(len(engine.model.estimators_), n_trees + 10)
+        self.assertIs(engine.model.estimators_[-20], newest[0])
+
+        # Without a new random state, a forest that keeps its size seeds the
+        # new trees as in the previous run
+        seeds = [tree.random_state for tree in engine.model.estimators_[-10:]]
+        engine.grow(
+            x_new, y_new, n_new_trees=10, drop_oldest=True,
+            class_weight_target=self.y_train
+        )
+        self.assertEqual(seeds, [
+            tree.random_state for tree in engine.model.estimators_[-10:]
+        ])
+        random_state = engine.model.random_state
+        engine.grow(
+            x_new, y_new, n_new_trees=10, drop_oldest=True,
+            class_weight_target=self.y_train, random_state=12345
+        )
+        self.assertEqual(engine.model.random_state, random_state)
+        self.assertFalse(set(seeds) & set(
+            tree.random_state for tree in engine.model.estimators_[-10:]
+        ))
+
+        # The compiled engine is rebuilt from the grown forest
+        np.testing.assert_array_equal(
+            engine.predict(self.x_test),
+            engine.model.predict(self.x_test)
+        )
+
+        with self.assertRaises(ValueError):
+            engine.grow(
+                x_new, np.zeros(len(x_new), dtype=int), n_new_trees=10
+            )
+
+        # The grown model is tested on the held-out split of the full data
+        changed = self.df_clean.loc[self.x_train.index[:5000]]
+        results = engine.retrain_incremental(self.df_clean, changed)
+        self.assertEqual(results, engine.test(self.x_test, self.y_test))
+        self.assertTrue(any(
+            'incremental' in file.name
+            for file in self.model_path.glob('*.pkl')
+        ))
+
+        # Every run gets its own random state, recorded in the registry
+        registry = engine.get_registry()
+        if registry is not None:
+            entry = registry.get('latest')
+            self.assertIn('incremental', entry['name'])
+            self.assertNotEqual(
+                entry['metadata']['random_state'],
+                engine.get_incremental_seed()
+            )
+
     @classmethod
     def tearDownClass(cls):
         # Remove files generated during tests
@@ -102,6 +303,20 @@ class TestModelEngine(unittest.TestCase):
         for file_name in files_to_remove:
             os.remove(cls.model_path / file_name)
 
+        current_artifacts = set(
+            file.name for file in cls.model_path.glob('*.mmap')
+        )
+        for dir_name in current_artifacts - cls.original_artifacts:
+            shutil.rmtree(cls.model_path / dir_name)
+
+        # Forget the versions registered during tests
+        registry = ModelEngine().get_registry()
+        if registry is not None:
+            if cls.registry_manifest['versions']:
+                registry.save(cls.registry_manifest)
+            elif registry.path.exists():
+                registry.path.unlink()
+
         print("Generated files removed.")
 
 
@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from pathlib import Path
+from src.model.registry import ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        path = Path(self.tmp_dir.name) / 'registry.json'
+        self.registry = ModelRegistry(path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_register(self):
+        self.assertEqual(self.registry.list(), [])
+        self.assertEqual(self.registry.next_version(), 1)
+
+        first = self.registry.register(
+            'model_a', {'pickle': 'model_a.pkl'}, {'accuracy': 0.6}
+        )
+        second = self.registry.register(
+            'model_b', {'pickle': 'model_b.pkl', 'mmap': 'model_b.mmap'},
+            metadata={'random_state': 42}
+        )
+        self.assertEqual(first['version'], 1)
+        self.assertEqual(second['version'], 2)
+        self.assertEqual(self.registry.next_version(), 3)
+        self.assertEqual(first['metrics'], {'accuracy': 0.6})
+        self.assertNotIn('metadata', first)
+        self.assertEqual(
+            self.registry.get(2)['metadata'], {'random_state': 42}
+        )
+
+        self.assertEqual(self.registry.get(1)['name'], 'model_a')
+        self.assertEqual(self.registry.get('2')['name'], 'model_b')
+        self.assertEqual(self.registry.get('latest')['name'], 'model_b')
+
+        # The memory-mappable artifact is preferred for serving
+        self.assertEqual(
+            self.registry.get_artifact(second), 'model_b.mmap'
+        )
+        self.assertEqual(self.registry.get_artifact(first), 'model_a.pkl')
+
+    def test_active(self):
+        self.registry.register('model_a', {'pickle': 'model_a.pkl'})
+        with self.assertRaises(ValueError):
+            self.registry.get('active')
+
+        self.registry.set_active(1)
+        self.assertEqual(self.registry.get('active')['version'], 1)
+
+        with self.assertRaises(ValueError):
+            self.registry.get(3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import yaml
+import json
+import tempfile
+import unittest
+import pandas as pd
+from pathlib import Path
+from src.data.data import Data, load_config
+from src.model.engine import ModelEngine
+from src.scoring.batch import BatchScorer
+
+
+def load_test_config():
+    config_path = Path(__file__).parent / 'test_config.yaml'
+    with open(config_path, 'r') as file:
+        return yaml.safe_load(file)
+
+
+TEST_CONFIG = load_test_config()
+
+
+class InterruptingScorer(BatchScorer):
+    # Stops the run after a number of completed chunks
+    def __init__(self, *args, n_chunks: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.n_chunks = n_chunks
+
+    def save_progress(self, output_path, progress):
+        super().save_progress(output_path, progress)
+        self.n_chunks -= 1
+        if self.n_chunks == 0:
+            raise KeyboardInterrupt
+
+
+class TestBatchScorer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        data = Data(load_config())
+        cls.pipeline = data.get_preprocessing_pipeline()
+        cls.listings = pd.read_csv(data.path_clean, nrows=2000)
+
+        engine = ModelEngine()
+        engine.load_model(TEST_CONFIG['model_to_load'])
+        x = cls.pipeline.map_categorical_features(cls.listings.copy())
+        preds = engine.predict(x[engine.get_features_names()]).astype(int)
+        cls.expected = pd.DataFrame({
+            'id': cls.listings['id'],
+            'price_category': [
+                cls.pipeline.get_category_name(pred) for pred in preds
+            ],
+        })
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name)
+        self.scorer = BatchScorer(
+            TEST_CONFIG['model_to_load'], chunk_size=300, n_workers=2
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_score(self):
+        input_path = self.path / 'listings.csv'
+        output_path = self.path / 'predictions.csv'
+        self.listings.to_csv(input_path, index=False)
+
+        stats = self.scorer.score(input_path, output_path)
+
+        self.assertEqual(stats['rows'], len(self.listings))
+        self.assertTrue(stats['rows_per_second'] > 0)
+        pd.testing.assert_frame_equal(pd.read_csv(output_path), self.expected)
+
+    def interrupt(self, input_path, output_path):
+        # Interrupted run: only the first 3 chunks of 300 rows were scored,
+        # and part of a fourth chunk was written after the saved progress
+        scorer = InterruptingScorer(
+            TEST_CONFIG['model_to_load'], chunk_size=300, n_workers=2,
+            n_chunks=3
+        )
+        with self.assertRaises(KeyboardInterrupt):
+            scorer.score(input_path, output_path)
+        with open(output_path, 'a') as f:
+            f.write('123,Lo')
+
+    def test_resume(self):
+        input_path = self.path / 'listings.csv'
+        output_path = self.path / 'predictions.csv'
+        self.listings.to_csv(input_path, index=False)
+        self.interrupt(input_path, output_path)
+
+        stats = self.scorer.score(input_path, output_path, resume=True)
+
+        self.assertEqual(stats['rows'], len(self.listings) - 900)
+        pd.testing.assert_frame_equal(pd.read_csv(output_path), self.expected)
+
+        progress_path = output_path.with_name('predictions.csv.progress')
+        with open(progress_path, 'r') as f:
+            self.assertEqual(json.load(f)['rows'], len(self.listings))
+
+    def test_resume_stale_progress(self):
+        input_path = self.path / 'listings.csv'
+        output_path = self.path / 'predictions.csv'
+        self.listings.to_csv(input_path, index=False)
+        self.interrupt(input_path, output_path)
+
+        # A different input or chunk size cannot resume the run
+        self.listings[:1000].to_csv(input_path, index=False)
+        with self.assertRaises(ValueError):
+            self.scorer.score(input_path, output_path, resume=True)
+        self.listings.to_csv(input_path, index=False)
+        with self.assertRaises(ValueError):
+            BatchScorer(TEST_CONFIG['model_to_load'], chunk_size=500).score(
+                input_path, output_path, resume=True
+            )
+
+        # A new run discards the previous progress before scoring anything
+        with self.assertRaises(FileNotFoundError):
+            self.scorer.score(self.path / 'missing.csv', output_path)
+        self.assertFalse(
+            output_path.with_name('predictions.csv.progress').exists()
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import tempfile
+import unittest
+import numpy as np
+from pathlib import Path
+from src.data.data import Data, load_config
+from src.model.engine import ModelEngine
+from src.model.tuning import expand_search_space, select_best
+
+
+class TestTuning(unittest.TestCase):
+    def test_expand_search_space(self):
+        candidates = expand_search_space(
+            {'n_estimators': [10, 20], 'max_depth': [None, 5, 10]}
+        )
+        self.assertEqual(len(candidates), 6)
+        self.assertIn({'n_estimators': 20, 'max_depth': None}, candidates)
+
+    def test_select_best(self):
+        results = [
+            {'params': {'a': 1}, 'roc_auc': 0.9, 'latency_ms': 10.0},
+            {'params': {'a': 2}, 'roc_auc': 0.8, 'latency_ms': 2.0},
+            {'params': {'a': 3}, 'roc_auc': 0.7, 'latency_ms': 1.0},
+        ]
+        self.assertEqual(select_best(results)['params'], {'a': 1})
+        self.assertEqual(select_best(results, 5)['params'], {'a': 2})
+        # The fastest candidate is selected if none meets the budget
+        self.assertEqual(select_best(results, 0.5)['params'], {'a': 3})
+
+    def test_tune(self):
+        engine = ModelEngine()
+        engine.config['tuning'] = {
+            'n_splits': 2,
+            'n_workers': 2,
+            'latency_budget_ms': None,
+            'latency_repetitions': 5,
+            'search_space': {'n_estimators': [5, 10], 'max_depth': [4]},
+        }
+        data = Data(load_config()).load_clean(map_categorical_features=True)
+        data = data.dropna(axis=0).sample(3000, random_state=0)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results_path = Path(tmp_dir) / 'tuning.json'
+            summary = engine.tune(
+                data, retrain=False, results_path=results_path
+            )
+            with open(results_path, 'r') as f:
+                saved = json.load(f)
+
+        self.assertEqual(saved, summary)
+        self.assertEqual(len(summary['results']), 2)
+        for result in summary['results']:
+            self.assertTrue(0 <= result['roc_auc'] <= 1)
+            self.assertTrue(0 <= result['accuracy'] <= 1)
+            self.assertGreater(result['latency_ms'], 0)
+
+        best = max(summary['results'], key=lambda result: result['roc_auc'])
+        self.assertEqual(summary['best'], best)
+        self.assertEqual(
+            engine.config['model']['params']['n_estimators'],
+            best['params']['n_estimators']
+        )
+        self.assertTrue(np.isfinite(best['roc_auc_std']))
+
+
+if __name__ == '__main__':
+    unittest.main()